@@ -0,0 +1,457 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import os
+import glob
+import tempfile
+import time
+import socket
+import logging
+import statistics
+import itertools
+from ActionBase import ActionBase
+from toyssl import SSLConnection
+from toyssl.msg import Protocol, CipherSuiteDirectory, CipherSuiteNegotiator
+from toyssl.msg.handshake import ClientHelloPkt, ClientHelloView, peek_client_hello, ServerHelloPkt, CertificatePkt, ServerKeyExchangePkt, ServerHelloDonePkt, ClientKeyExchangePkt
+from toyssl.msg.handshake.HelloExtension import BaseHelloExtension, HelloExtensionSignatureAlgs, HelloExtensionServerName, HelloExtensionALPN
+from toyssl.msg.Enums import SSLVersion, CipherSuite, CompressionMethod, KeyExchangeAlgorithm, ExtensionType, SignatureAlgorithm, HashAlgorithm, SupportedGroups
+from toyssl.msg.MsgBuffer import MsgBuffer
+from toyssl.msg.ReserializeCheck import reserialize_check
+from toyssl.msg.Schema import HandshakeSchema
+from toyssl.crypto.KexParams import DHModPKexParams
+from toyssl.x509 import X509Certificate, CertificateCache, certificate_cache, TrustStore, TrustStoreSnapshot, ChainVerifier, SignatureVerifier
+from toyssl.x509.PEMEncoder import pem_readfile
+from toyssl.crypto.Random import secure_rand, secure_rand_int
+
+class _NullHandler(object):
+	def tx_packet(self, layered_pkt):
+		pass
+
+	def rx_packet(self, layered_pkt):
+		pass
+
+class ActionBenchmark(ActionBase):
+	def run(self):
+		self._log.setLevel(logging.WARNING)
+		available = sorted(name[7:] for name in dir(self) if name.startswith("_bench_"))
+		if len(self._args.benchmark) == 0:
+			selected = available
+		else:
+			selected = self._args.benchmark
+			unknown = set(selected) - set(available)
+			if len(unknown) > 0:
+				raise Exception("Unknown benchmark(s) %s, available are: %s" % (", ".join(sorted(unknown)), ", ".join(available)))
+		for name in selected:
+			getattr(self, "_bench_" + name)()
+
+	@staticmethod
+	def _report(name, durations, unit = "ms", scale = 1000):
+		print("%-40s n = %-6d median %8.3f %s   mean %8.3f %s   min %8.3f %s" % (name, len(durations), statistics.median(durations) * scale, unit, statistics.mean(durations) * scale, unit, min(durations) * scale, unit))
+
+	@staticmethod
+	def _server_flight():
+		server_hello = ServerHelloPkt(SSLVersion.ProtocolTLSv1_0)
+		server_hello.set_compression_method(CompressionMethod.null)
+		server_hello.set_cipher_suite(CipherSuite.TLS_DHE_RSA_WITH_AES_128_CBC_SHA)
+
+		certificate = CertificatePkt()
+		certificate.add_cert(secure_rand(1200))
+
+		p = secure_rand_int(2 ** 2048) | (1 << 2047) | 1
+		kex_params = DHModPKexParams(p, 2)
+		server_kex = ServerKeyExchangePkt(KeyExchangeAlgorithm.DHE_RSA)
+		server_kex.set_kex_params(kex_params)
+		server_kex.set_kex_session(kex_params.new_session().setYs(secure_rand_int(p)))
+		server_kex.set_signature(MsgBuffer(secure_rand(256)))
+		return [ server_hello, certificate, server_kex, ServerHelloDonePkt() ]
+
+	def _bench_handshake_flight(self):
+		"""Latency of the server's response to a ClientHello on loopback,
+		sending the four messages separately and as one flight."""
+		listener = socket.socket()
+		listener.bind(("127.0.0.1", 0))
+		listener.listen(1)
+		client = socket.create_connection(listener.getsockname())
+		(server_sock, peer) = listener.accept()
+		listener.close()
+
+		connection = SSLConnection(Protocol())
+		connection.set_handler(_NullHandler())
+		connection.set_peer_socket(server_sock)
+
+		flight = self._server_flight()
+		msg_lengths = [ len(pkt.reserialize()) for pkt in flight ]
+		expect_bytes = {
+			"separate":	sum(msg_lengths) + 5 * len(msg_lengths),
+			"flight":	sum(msg_lengths) + 5 * ((sum(msg_lengths) + 16383) // 16384),
+		}
+
+		for mode in [ "separate", "flight" ]:
+			durations = [ ]
+			for i in range(self._args.iterations):
+				t0 = time.perf_counter()
+				if mode == "flight":
+					connection.begin_flight()
+				for pkt in flight:
+					connection.send_pkt(pkt)
+				connection.flush()
+				remaining = expect_bytes[mode]
+				while remaining > 0:
+					remaining -= len(client.recv(remaining))
+				durations.append(time.perf_counter() - t0)
+			self._report("handshake_flight (%s, %d bytes)" % (mode, expect_bytes[mode]), durations)
+
+		client.close()
+		connection.close()
+
+	def _bench_certificate_message(self):
+		"""Cost of producing the Certificate message for a three certificate
+		chain, encoding it for every handshake versus once per chain."""
+		chain = [ secure_rand(1500) for i in range(3) ]
+		protocol = Protocol()
+		preencoded = CertificatePkt()
+		for cert in chain:
+			preencoded.add_cert(cert)
+		preencoded.preencode()
+
+		for mode in [ "encode", "preencoded" ]:
+			durations = [ ]
+			for i in range(self._args.iterations):
+				t0 = time.perf_counter()
+				if mode == "encode":
+					pkt = CertificatePkt()
+					for cert in chain:
+						pkt.add_cert(cert)
+				else:
+					pkt = preencoded
+				protocol.serialize_message(pkt)
+				durations.append(time.perf_counter() - t0)
+			self._report("certificate_message (%s)" % (mode), durations, unit = "us", scale = 1e6)
+
+	def _bench_reserialize_check(self):
+		"""Serialization cost of the server's handshake flight depending on
+		whether every message is parsed again before being sent."""
+		flight = self._server_flight()
+		protocol = Protocol()
+		(mode, sample_interval) = (reserialize_check.mode, reserialize_check.sample_interval)
+		for (check_mode, check_interval) in [ ("always", None), ("sampled", 10), ("off", None) ]:
+			reserialize_check.configure(check_mode, check_interval)
+			durations = [ ]
+			for i in range(self._args.iterations):
+				t0 = time.perf_counter()
+				for pkt in flight:
+					protocol.serialize_message(pkt)
+				durations.append(time.perf_counter() - t0)
+			label = check_mode if (check_interval is None) else ("%s 1/%d" % (check_mode, check_interval))
+			self._report("reserialize_check (%s)" % (label), durations, unit = "us", scale = 1e6)
+		reserialize_check.configure(mode, sample_interval)
+
+	@staticmethod
+	def _codec_samples():
+		client_hello = ClientHelloPkt(SSLVersion.ProtocolTLSv1_2)
+		for cipher_suite in list(CipherSuite)[:40]:
+			client_hello.add_cipher_suite(cipher_suite)
+		client_hello.add_compression_method(CompressionMethod.null)
+		client_hello.add_extension(HelloExtensionSignatureAlgs().add_algorithm(SignatureAlgorithm.RSA, HashAlgorithm.sha256).add_algorithm(SignatureAlgorithm.ECDSA, HashAlgorithm.sha256))
+		client_hello.add_extension(BaseHelloExtension(ExtensionType.heartbeat, MsgBuffer(b"\x01")))
+
+		(server_hello, certificate, server_kex, server_hello_done) = ActionBenchmark._server_flight()
+		certificate.add_cert(secure_rand(1400))
+		certificate.add_cert(secure_rand(1100))
+
+		client_kex = MsgBuffer()
+		client_kex.add_uint8(int(ClientKeyExchangePkt.packet_type()))
+		client_kex.add_uint24(258)
+		client_kex.add_opaque(2, secure_rand(256))
+		client_kex = ClientKeyExchangePkt.parse(client_kex)
+
+		return [ ("ClientHello", client_hello), ("ServerHello", server_hello), ("Certificate", certificate), ("ServerKeyExchange", server_kex), ("ClientKeyExchange", client_kex) ]
+
+	def _bench_handshake_codec(self):
+		"""Serialization and parsing of the handshake messages, with markers
+		for the connection log (annotated) and without (fast)."""
+		annotate = HandshakeSchema.annotate
+		for (name, pkt) in self._codec_samples():
+			data = pkt.serialize().data
+			for (mode, operation) in itertools.product([ "annotated", "fast" ], [ "serialize", "parse" ]):
+				HandshakeSchema.annotate = (mode == "annotated")
+				durations = [ ]
+				for i in range(self._args.iterations):
+					t0 = time.perf_counter()
+					if operation == "serialize":
+						pkt.serialize()
+					else:
+						pkt.parse(MsgBuffer(data))
+					durations.append(time.perf_counter() - t0)
+				self._report("handshake_codec (%s %s, %s)" % (name, operation, mode), durations, unit = "us", scale = 1e6)
+		HandshakeSchema.annotate = annotate
+
+	@staticmethod
+	def _large_client_hello():
+		client_hello = ClientHelloPkt(SSLVersion.ProtocolTLSv1_2)
+		for cipher_suite in list(CipherSuite)[:120]:
+			client_hello.add_cipher_suite(cipher_suite)
+		client_hello.add_compression_method(CompressionMethod.null)
+		client_hello.add_extension(HelloExtensionSignatureAlgs().add_algorithm(SignatureAlgorithm.RSA, HashAlgorithm.sha256).add_algorithm(SignatureAlgorithm.ECDSA, HashAlgorithm.sha256))
+		opaque_exttypes = [ exttype for exttype in ExtensionType if exttype not in [ ExtensionType.signature_algorithms, ExtensionType.supported_groups, ExtensionType.ec_point_formats ] ]
+		for exttype in opaque_exttypes[:15]:
+			client_hello.add_extension(BaseHelloExtension(exttype, MsgBuffer(secure_rand(16))))
+		return client_hello
+
+	def _bench_client_hello_lazy(self):
+		"""Decoding a ClientHello with 120 cipher suites and 16 extensions,
+		fully versus lazily with access to a few fields only."""
+		data = self._large_client_hello().serialize().data
+		annotate = HandshakeSchema.annotate
+		accessors = [
+			("full parse, annotated",		lambda: ClientHelloPkt.parse(MsgBuffer(data))),
+			("full parse, fast",			lambda: ClientHelloPkt.parse(MsgBuffer(data))),
+			("view, version",				lambda: ClientHelloView(data).proto_version),
+			("view, version + extension",	lambda: ClientHelloView(data).get_extension(ExtensionType.signature_algorithms)),
+			("view, cipher suite ids",		lambda: ClientHelloView(data).cipher_suite_ids),
+			("view, cipher suites",			lambda: ClientHelloView(data).cipher_suites),
+		]
+		for (name, accessor) in accessors:
+			HandshakeSchema.annotate = name.endswith("annotated")
+			durations = [ ]
+			for i in range(self._args.iterations):
+				t0 = time.perf_counter()
+				accessor()
+				durations.append(time.perf_counter() - t0)
+			self._report("client_hello_lazy (%s)" % (name), durations, unit = "us", scale = 1e6)
+		HandshakeSchema.annotate = annotate
+
+	def _bench_peek_client_hello(self):
+		"""Throughput of extracting SNI, ALPN, versions and cipher suites from
+		the first record of a connection, as an L4 routing front-end would."""
+		client_hello = ClientHelloPkt(SSLVersion.ProtocolTLSv1_2)
+		for cipher_suite in list(CipherSuite)[:40]:
+			client_hello.add_cipher_suite(cipher_suite)
+		client_hello.add_compression_method(CompressionMethod.null)
+		client_hello.add_extension(HelloExtensionServerName("backend17.example.com"))
+		client_hello.add_extension(HelloExtensionALPN().add_protocol(b"h2").add_protocol(b"http/1.1"))
+		client_hello.add_extension(BaseHelloExtension(ExtensionType.supported_versions, MsgBuffer(b"\x04\x03\x04\x03\x03")))
+		client_hello.add_extension(HelloExtensionSignatureAlgs().add_algorithm(SignatureAlgorithm.RSA, HashAlgorithm.sha256).add_algorithm(SignatureAlgorithm.ECDSA, HashAlgorithm.sha256))
+		message = client_hello.serialize().data
+		record = bytes([ 0x16, 0x03, 0x01 ]) + len(message).to_bytes(2, "big") + message
+
+		annotate = HandshakeSchema.annotate
+		extractors = [
+			("full parse, annotated",	lambda: ClientHelloPkt.parse(MsgBuffer(record[5:]))),
+			("full parse, fast",		lambda: ClientHelloPkt.parse(MsgBuffer(record[5:]))),
+			("view",					lambda: ClientHelloView(record[5:]).get_extension(ExtensionType.server_name)),
+			("peek",					lambda: peek_client_hello(record)),
+		]
+		for (name, extractor) in extractors:
+			HandshakeSchema.annotate = name.endswith("annotated")
+			t0 = time.perf_counter()
+			for i in range(self._args.iterations):
+				extractor()
+			duration = time.perf_counter() - t0
+			print("%-40s n = %-6d %10.0f hellos/s   %8.3f us/hello" % ("peek_client_hello (%s)" % (name), self._args.iterations, self._args.iterations / duration, duration / self._args.iterations * 1e6))
+		HandshakeSchema.annotate = annotate
+
+	def _bench_cipher_suite_directory(self):
+		"""Building the client's cipher suite list as initiate_handshake()
+		does, and evaluating the predicate based filters."""
+		queries = [
+			("kwfilter",		lambda: CipherSuiteDirectory().kwfilter(sig_alg = "RSA", kex_alg = "DH", kex_pfs = True, cipher_name = "AES", cipher_keylen = 128, cipher_opmode = "CBC")),
+			("kwfilter, list",	lambda: list(CipherSuiteDirectory().kwfilter(sig_alg = "RSA", kex_alg = "DH", kex_pfs = True, cipher_name = "AES", cipher_keylen = 128, cipher_opmode = "CBC"))),
+			("filter_secure",	lambda: CipherSuiteDirectory().filter_secure()),
+		]
+		for (name, query) in queries:
+			durations = [ ]
+			for i in range(self._args.iterations):
+				t0 = time.perf_counter()
+				query()
+				durations.append(time.perf_counter() - t0)
+			self._report("cipher_suite_directory (%s)" % (name), durations, unit = "us", scale = 1e6)
+
+	def _bench_cipher_suite_negotiation(self):
+		"""Server side selection from a client offer of 120 suites, compared to
+		walking the server preference list and searching the offer."""
+		offered = self._large_client_hello().cipher_suites
+		preference = [ csuite.csid for csuite in CipherSuiteDirectory() ][::-1]
+		negotiator = CipherSuiteNegotiator(preference, groups = [ SupportedGroups.secp256r1 ])
+		negotiator.select(offered)
+		negotiator.select(offered, prefer_cheap = True)
+		selectors = [
+			("preference scan",	lambda: next((csid for csid in preference if csid in offered), None)),
+			("rank table",		lambda: negotiator.select(offered, client_groups = [ SupportedGroups.secp256r1 ])),
+			("rank table, cheap",	lambda: negotiator.select(offered, client_groups = [ SupportedGroups.secp256r1 ], prefer_cheap = True)),
+		]
+		for (name, selector) in selectors:
+			durations = [ ]
+			for i in range(self._args.iterations):
+				t0 = time.perf_counter()
+				selector()
+				durations.append(time.perf_counter() - t0)
+			self._report("cipher_suite_negotiation (%s)" % (name), durations, unit = "us", scale = 1e6)
+
+	@staticmethod
+	def _system_certificates(certdir = "/etc/ssl/certs"):
+		"""DER data of the CA certificates installed on this system that
+		X509Certificate can parse."""
+		certificates = [ ]
+		for filename in sorted(glob.glob(os.path.join(certdir, "*.pem"))):
+			try:
+				der = pem_readfile(filename, "CERTIFICATE")
+				X509Certificate.fromderobj(der)
+			except Exception:
+				continue
+			certificates.append(der)
+		return certificates
+
+	def _bench_certificate_cache(self):
+		"""Obtaining a parsed certificate for the same DER data again and
+		accessing the fields a client uses during the handshake, as done for
+		every handshake with a known server. Parsing itself is a lazy scan, so
+		the decoding of the fields is what the cache saves."""
+		certificates = self._system_certificates()[:20]
+		if len(certificates) == 0:
+			print("certificate_cache: no system certificates found, skipped")
+			return
+		cache = CertificateCache()
+		for (name, parse) in [ ("parse", X509Certificate.fromderobj), ("cached", cache.get) ]:
+			durations = [ ]
+			for i in range(self._args.iterations):
+				der = certificates[i % len(certificates)]
+				t0 = time.perf_counter()
+				certificate = parse(der)
+				(certificate.publickey, certificate.subject, certificate.issuer, certificate.valid_to)
+				durations.append(time.perf_counter() - t0)
+			self._report("certificate_cache (%s)" % (name), durations, unit = "us", scale = 1e6)
+
+	def _bench_x509_parse(self):
+		"""Parsing the system CA certificates and accessing the commonly used
+		fields, once and five times."""
+		certificates = self._system_certificates()
+		if len(certificates) == 0:
+			print("x509_parse: no system certificates found, skipped")
+			return
+		for accesses in [ 0, 1, 5 ]:
+			durations = [ ]
+			for i in range(self._args.iterations):
+				der = certificates[i % len(certificates)]
+				t0 = time.perf_counter()
+				certificate = X509Certificate.fromderobj(der)
+				for j in range(accesses):
+					(certificate.subject, certificate.issuer, certificate.publickey, certificate.valid_from, certificate.valid_to)
+				durations.append(time.perf_counter() - t0)
+			self._report("x509_parse (%d certificates, %d accesses)" % (len(certificates), accesses), durations, unit = "us", scale = 1e6)
+
+	def _bench_certificate_chain(self):
+		"""Parsing a received Certificate message with a five certificate chain
+		and decoding the leaf certificate only, as the client does."""
+		chain = self._system_certificates()[:5]
+		if len(chain) == 0:
+			print("certificate_chain: no system certificates found, skipped")
+			return
+		pkt = CertificatePkt()
+		for cert in chain:
+			pkt.add_cert(cert)
+		data = pkt.serialize().data
+
+		annotate = HandshakeSchema.annotate
+		HandshakeSchema.annotate = False
+		try:
+			durations = [ ]
+			for i in range(self._args.iterations):
+				certificate_cache.clear()
+				t0 = time.perf_counter()
+				received = CertificatePkt.parse(MsgBuffer(data))
+				received.get_x509(0).publickey
+				durations.append(time.perf_counter() - t0)
+			self._report("certificate_chain (%d certificates)" % (len(chain)), durations, unit = "us", scale = 1e6)
+		finally:
+			HandshakeSchema.annotate = annotate
+
+	def _bench_chain_verification(self):
+		"""Finding the issuer of a certificate among the system CA certificates
+		by index versus by scanning, and verifying an issuer signature for the
+		first time versus again."""
+		store = TrustStore()
+		for der in self._system_certificates():
+			store.add_der(der)
+		subjects = list(store)
+		if len(subjects) == 0:
+			print("chain_verification: no system certificates found, skipped")
+			return
+
+		for mode in [ "index", "scan" ]:
+			durations = [ ]
+			for i in range(self._args.iterations):
+				certificate = subjects[i % len(subjects)]
+				t0 = time.perf_counter()
+				if mode == "index":
+					store.find_issuers(certificate)
+				else:
+					[ candidate for candidate in store if candidate.raw_subject == certificate.raw_issuer ]
+				durations.append(time.perf_counter() - t0)
+			self._report("chain_verification (issuer lookup, %s, %d certificates)" % (mode, len(store)), durations, unit = "us", scale = 1e6)
+
+		# Roots self-signed with a rejected algorithm (e.g., SHA-1) are not verified at all
+		signed = [ certificate for certificate in subjects if SignatureVerifier.is_supported(certificate.signature_alg_oid) ]
+		memoizing = ChainVerifier(store, signature_verifier = SignatureVerifier())
+		for certificate in signed:
+			memoizing.signature_valid(certificate, certificate)
+		for mode in [ "computed", "memoized" ]:
+			durations = [ ]
+			for i in range(self._args.iterations):
+				certificate = signed[i % len(signed)]
+				verifier = ChainVerifier(store, signature_verifier = SignatureVerifier()) if (mode == "computed") else memoizing
+				t0 = time.perf_counter()
+				verifier.signature_valid(certificate, certificate)
+				durations.append(time.perf_counter() - t0)
+			self._report("chain_verification (self signature, %s, %d certificates)" % (mode, len(signed)), durations, unit = "us", scale = 1e6)
+
+	def _bench_trust_store_load(self):
+		"""Loading the system CA certificates from their PEM files versus from
+		a trust store snapshot, as done at every client start."""
+		filenames = sorted(glob.glob("/etc/ssl/certs/*.pem"))
+		if len(filenames) == 0:
+			print("trust_store_load: no system certificates found, skipped")
+			return
+		store = TrustStore()
+		for der in self._system_certificates():
+			store.add_der(der)
+		(fd, snapshot_filename) = tempfile.mkstemp(suffix = ".bin")
+		os.close(fd)
+		try:
+			TrustStoreSnapshot.write(snapshot_filename, store)
+			for mode in [ "pem", "snapshot" ]:
+				durations = [ ]
+				for i in range(self._args.iterations):
+					t0 = time.perf_counter()
+					if mode == "pem":
+						loaded = TrustStore()
+						for filename in filenames:
+							try:
+								loaded.add_pem_file(filename)
+							except Exception:
+								pass
+					else:
+						loaded = TrustStoreSnapshot(snapshot_filename)
+						loaded.close()
+					durations.append(time.perf_counter() - t0)
+				self._report("trust_store_load (%s, %d certificates)" % (mode, len(store)), durations, unit = "ms", scale = 1e3)
+		finally:
+			os.unlink(snapshot_filename)
@@ -0,0 +1,41 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import glob
+import os
+from ActionBase import ActionBase
+from toyssl.x509 import TrustStore, TrustStoreSnapshot
+
+class ActionCASnapshot(ActionBase):
+	def run(self):
+		store = TrustStore()
+		for name in self._args.source:
+			if os.path.isdir(name):
+				filenames = sorted(glob.glob(os.path.join(name, "*.pem")) + glob.glob(os.path.join(name, "*.crt")))
+			else:
+				filenames = [ name ]
+			for filename in filenames:
+				try:
+					store.add_pem_file(filename)
+				except Exception as e:
+					self._log.warning("Skipping %s: %s" % (filename, str(e)))
+		TrustStoreSnapshot.write(self._args.output, store)
+		self._log.info("Wrote %d certificates to %s" % (len(store), self._args.output))
@@ -30,14 +30,18 @@ from toyssl.msg.handshake import ClientHelloPkt
 from toyssl.msg.Enums import SSLVersion, CipherSuite, CompressionMethod, SignatureAlgorithm, HashAlgorithm, ExtensionType, HandshakeType
 from toyssl.msg.MsgBuffer import MsgBuffer
 from toyssl.msg import Protocol
+from toyssl.msg.ReserializeCheck import reserialize_check
+from toyssl.msg.Schema import HandshakeSchema
 from toyssl.msg import CipherSuiteDirectory
-from toyssl.x509 import X509Certificate
+from toyssl.x509 import TrustStore, TrustStoreSnapshot, ChainVerifier, SPKIPins
 from toyssl.log.ExplainedStep import ExplainedSteps, ExplainedValueStep
 
 class ClientHandler(object):
-	def __init__(self, conn, logger):
+	def __init__(self, conn, logger, chain_verifier = None, spki_pins = None):
 		self._conn = conn
 		self._log = logger
+		self._chain_verifier = chain_verifier
+		self._spki_pins = spki_pins
 		self._msgs = {
 			"client": collections.defaultdict(list),
 			"server": collections.defaultdict(list),
@@ -72,9 +76,19 @@ class ClientHandler(object):
 
 		if ptype is HandshakeType.ServerHello:
 			self._srandom = pkt.random
+		elif (ptype is HandshakeType.Certificate) and (self._spki_pins is not None):
+			# A pinned key replaces chain validation entirely
+			if not self._spki_pins.matches(pkt.get_x509(0)):
+				raise Exception("Server public key does not match any of the %d pinned SPKI hashes." % (len(self._spki_pins)))
+			self._log.debug("Server public key matches SPKI pin, skipping certificate chain verification")
+		elif (ptype is HandshakeType.Certificate) and (self._chain_verifier is not None):
+			chain = [ pkt.get_x509(index) for index in range(pkt.cert_count) ]
+			result = self._chain_verifier.verify(chain)
+			if not result.valid:
+				raise Exception("Server certificate chain verification failed: %s" % (result.reason))
+			self._log.debug("Server certificate chain verified: %s" % (" <- ".join(str(certificate.subject) for certificate in result.chain)))
 		elif ptype is HandshakeType.ServerKeyExchange:
-			server_cert_der = self._msgs["server"][HandshakeType.Certificate][0].get_cert(0)
-			server_cert = X509Certificate.fromderobj(server_cert_der)
+			server_cert = self._msgs["server"][HandshakeType.Certificate][0].get_x509(0)
 
 			signed_kex_params = MsgBuffer()
 			signed_kex_params += self._msgs["client"][HandshakeType.ClientHello][0].random
@@ -95,9 +109,21 @@ class ClientHandler(object):
 
 class ActionClient(ActionBase):
 	def run(self):
+		reserialize_check.configure(self._args.reserialize_check, self._args.reserialize_sample)
+		HandshakeSchema.annotate = (self._args.codec == "annotated")
 		proto = Protocol()
 		connection = SSLConnection(proto)
-		handler = ClientHandler(connection, self._log)
+		chain_verifier = None
+		if (self._args.ca_file is not None) and (self._args.ca_snapshot is not None):
+			raise Exception("Only one of --ca-file and --ca-snapshot may be given.")
+		elif self._args.ca_file is not None:
+			chain_verifier = ChainVerifier(TrustStore().add_pem_file(self._args.ca_file))
+		elif self._args.ca_snapshot is not None:
+			chain_verifier = ChainVerifier(TrustStoreSnapshot(self._args.ca_snapshot))
+		spki_pins = None
+		if self._args.pin_spki is not None:
+			spki_pins = SPKIPins(self._args.pin_spki)
+		handler = ClientHandler(connection, self._log, chain_verifier, spki_pins)
 		connection.set_handler(handler)
 		socket_conn = socket.create_connection((self._args.host, self._args.port), timeout = 0.5)
 		connection.set_peer_socket(socket_conn)
@@ -23,22 +23,25 @@ import time
 import socket
 import collections
 from ActionBase import ActionBase
-from toyssl.msg import Protocol
+from toyssl.msg import Protocol, CipherSuiteNegotiator
+from toyssl.msg.ReserializeCheck import reserialize_check
+from toyssl.msg.Schema import HandshakeSchema
 from toyssl.msg.MsgBuffer import MsgBuffer
 from toyssl import SSLConnection
-from toyssl.msg.handshake import ServerHelloPkt, CertificatePkt, ServerKeyExchangePkt, ServerHelloDonePkt
+from toyssl.msg.handshake import ServerHelloPkt, ServerKeyExchangePkt, ServerHelloDonePkt
 from toyssl.msg.Enums import SSLVersion, CipherSuite, CompressionMethod, SignatureAlgorithm, HashAlgorithm, ExtensionType, HandshakeType, KeyExchangeAlgorithm, ChangeCipherSpecType
-from toyssl.x509.PEMEncoder import pem_readfile
-from toyssl.crypto.KexParams import DHModPKexParams
-from toyssl.x509.PrivateKey import PrivateKey
+from toyssl.x509.CredentialStore import CredentialStore
+from toyssl.x509.SNICredentialStore import SNICredentialStore
 from toyssl.crypto.PreMasterSecret import PreMasterSecret
 from toyssl.crypto.Enums import PMSCalcLabel, PMSPRF
 from toyssl.log.ExplainedStep import ExplainedSteps, ExplainedValueStep
 
 class ServerHandler(object):
-	def __init__(self, conn, logger):
+	def __init__(self, conn, logger, credential_store, negotiator):
 		self._conn = conn
 		self._log = logger
+		self._credential_store = credential_store
+		self._negotiator = negotiator
 		self._msgs = {
 			"client": collections.defaultdict(list),
 			"server": collections.defaultdict(list),
@@ -54,22 +57,28 @@ class ServerHandler(object):
 		pkt = layered_pkt.application
 
 		if layered_pkt.application.packet_type() is HandshakeType.ClientHello:
+			# The whole response is sent as one flight
+			self._conn.begin_flight()
+			servername = pkt.get_extension(ExtensionType.server_name)
+			credentials = self._credential_store.get(None if (servername is None) else servername.hostname)
+			supported_groups = pkt.get_extension(ExtensionType.supported_groups)
+			cipher_suite = self._negotiator.select(pkt.cipher_suites, key_types = [ credentials.private_key.keytype.upper() ], client_groups = None if (supported_groups is None) else supported_groups.groups)
+			if cipher_suite is None:
+				raise Exception("No cipher suite in common with the client.")
+			self._log.debug("Negotiated cipher suite %s" % (cipher_suite.name))
+
 			# Issue a server hello as a response
 			rsp = ServerHelloPkt(SSLVersion.ProtocolTLSv1_0)
 			rsp.set_compression_method(CompressionMethod.null)
-			rsp.set_cipher_suite(CipherSuite.TLS_DHE_RSA_WITH_AES_128_CBC_SHA)
+			rsp.set_cipher_suite(cipher_suite)
 			self._conn.send_pkt(rsp)
 
 			# Then send the server certificate
-			server_cert = pem_readfile("server.crt", "CERTIFICATE")
-			rsp = CertificatePkt()
-			rsp.add_cert(server_cert)
-			self._conn.send_pkt(rsp)
+			self._conn.send_pkt(credentials.certificate_pkt)
 
 			# Then prepare the server key exchange
 			explanation = ExplainedSteps("Server key exchange")
-			dh_params = pem_readfile("dhp.pem", "DH PARAMETERS")
-			kex_params = DHModPKexParams.parse(dh_params)
+			kex_params = credentials.dh_params
 			rsp = ServerKeyExchangePkt(KeyExchangeAlgorithm.DHE_RSA)
 			rsp.set_kex_params(kex_params)
 			rsp.set_kex_session(kex_params.new_session().randomize())
@@ -80,8 +89,7 @@ class ServerHandler(object):
 			signed_kex_params += self._msgs["server"][HandshakeType.ServerHello][0].random
 			signed_kex_params += rsp.get_signedpayload()
 			signed_kex_params.hexdump()
-			priv_key = PrivateKey.from_der(pem_readfile("server.key", "PRIVATE KEY"))
-			signature = priv_key.sign_md5sha1(signed_kex_params.data)
+			signature = credentials.private_key.sign_md5sha1(signed_kex_params.data)
 			rsp.set_signature(signature)
 
 			# Explain it first
@@ -93,6 +101,7 @@ class ServerHandler(object):
 			# Then send the ServerHelloDone
 			rsp = ServerHelloDonePkt()
 			self._conn.send_pkt(rsp)
+			self._conn.flush()
 
 		elif layered_pkt.application.packet_type() is ChangeCipherSpecType.ChangeCipherSpec:
 			explanation = ExplainedSteps("Key agreement")
@@ -118,9 +127,21 @@ class ServerHandler(object):
 
 class ActionServer(ActionBase):
 	def run(self):
+		reserialize_check.configure(self._args.reserialize_check, self._args.reserialize_sample)
+		HandshakeSchema.annotate = (self._args.codec == "annotated")
+		credential_store = CredentialStore("server.crt", "server.key", "dhp.pem")
+		self._log.info("Loaded credentials in %.1f ms" % (credential_store.load_time * 1000))
+		if self._args.sni_dir is not None:
+			credential_store = SNICredentialStore(default = credential_store, cache_size = self._args.sni_cache_size).add_directory(self._args.sni_dir, "dhp.pem")
+			self._log.info("Serving %d server names from %s" % (len(credential_store), self._args.sni_dir))
+
+		# Only ephemeral DH with RSA signatures over TLS 1.0 is implemented so
+		# far; all of these suites cost the same, so ranking by cost is moot
+		negotiator = CipherSuiteNegotiator.tls10_dhe_rsa()
+
 		proto = Protocol()
 		connection = SSLConnection(proto)
-		handler = ServerHandler(connection, self._log)
+		handler = ServerHandler(connection, self._log, credential_store, negotiator)
 		connection.set_handler(handler)
 
 		base = socket.socket()
@@ -0,0 +1,157 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import sys
+import os
+import time
+import json
+import hashlib
+import concurrent.futures
+from ActionBase import ActionBase
+from toyssl.x509 import X509Certificate, CertificateChecker, CertificateReader
+from toyssl.utils import LRUCache
+
+def scan_certificate(der, derhash):
+	"""Parses and checks a single certificate. Returns a JSON serializable
+	dictionary; failures are reported in the result instead of raised."""
+	result = { "sha256": derhash }
+	try:
+		certificate = X509Certificate.fromderobj(der, derhash = derhash)
+		result["subject"] = str(certificate.subject)
+		result["issuer"] = str(certificate.issuer)
+		result["valid_from"] = certificate.valid_from.isoformat()
+		result["valid_to"] = certificate.valid_to.isoformat()
+		result["checks"] = [ { "code": check.code, "text": check.text, "level": check.level } for check in CertificateChecker(certificate).check() ]
+	except Exception as e:
+		result["error"] = "%s: %s" % (e.__class__.__name__, str(e))
+	return result
+
+def scan_chunk(chunk):
+	"""Worker function: scans a list of (index, source, der, derhash) tuples
+	and returns the encoded JSONL lines so that the parent process does not
+	have to serialize them."""
+	lines = [ ]
+	for (index, source, der, derhash) in chunk:
+		result = scan_certificate(der, derhash)
+		result["index"] = index
+		result["source"] = source
+		lines.append(json.dumps(result, sort_keys = True))
+	return lines
+
+class ActionX509Scan(ActionBase):
+	def _inputs(self):
+		for filename in (self._args.input or [ "-" ]):
+			if filename == "-":
+				yield ("-", sys.stdin.buffer)
+			else:
+				with open(filename, "rb") as f:
+					yield (filename, f)
+
+	def _chunks(self):
+		"""Reads all inputs and yields chunks of certificates that have not
+		been seen before. Only the DER hashes of the 'dedup_window' most
+		recently seen certificates are remembered for deduplication, so that
+		memory stays bounded for arbitrarily large inputs."""
+		seen = LRUCache(self._args.dedup_window) if (self._args.dedup_window > 0) else None
+		chunk = [ ]
+		index = 0
+		for (source, f) in self._inputs():
+			reader = CertificateReader(f, self._args.format)
+			for der in reader:
+				digest = hashlib.sha256(der).digest()
+				if seen is not None:
+					if seen.get(digest) is not None:
+						self._duplicates += 1
+						continue
+					seen.put(digest, True)
+				chunk.append((index, source, der, digest.hex()))
+				index += 1
+				if len(chunk) >= self._args.chunk_size:
+					yield chunk
+					chunk = [ ]
+			self._decode_errors += reader.errors
+		if len(chunk) > 0:
+			yield chunk
+
+	def _emit(self, lines):
+		for line in lines:
+			self._output.write(line)
+			self._output.write("\n")
+		self._scanned += len(lines)
+
+	def _run_serial(self):
+		for chunk in self._chunks():
+			self._emit(scan_chunk(chunk))
+
+	def _run_parallel(self, jobs):
+		"""Keeps at most 'window' chunks submitted but not yet written, so that
+		memory stays bounded independently of the size of the corpus. In
+		ordered mode, chunks that complete early wait until all chunks that
+		precede them have been written."""
+		window = jobs * self._args.window
+		pending = { }
+		completed = { }
+		next_emit = 0
+		with concurrent.futures.ProcessPoolExecutor(max_workers = jobs) as executor:
+			chunks = enumerate(self._chunks())
+			exhausted = False
+			while (not exhausted) or (len(pending) > 0) or (len(completed) > 0):
+				while (not exhausted) and (len(pending) + len(completed) < window):
+					try:
+						(chunkno, chunk) = next(chunks)
+					except StopIteration:
+						exhausted = True
+						break
+					pending[executor.submit(scan_chunk, chunk)] = chunkno
+
+				if len(pending) > 0:
+					(done, not_done) = concurrent.futures.wait(pending, return_when = concurrent.futures.FIRST_COMPLETED)
+					for future in done:
+						chunkno = pending.pop(future)
+						if self._args.unordered:
+							self._emit(future.result())
+						else:
+							completed[chunkno] = future.result()
+
+				while next_emit in completed:
+					self._emit(completed.pop(next_emit))
+					next_emit += 1
+
+	def run(self):
+		self._duplicates = 0
+		self._decode_errors = 0
+		self._scanned = 0
+		jobs = self._args.jobs or os.cpu_count() or 1
+		if self._args.dedup_window < 0:
+			raise Exception("Deduplication window must not be negative, not %d." % (self._args.dedup_window))
+
+		t0 = time.time()
+		self._output = sys.stdout if (self._args.output is None) else open(self._args.output, "w")
+		try:
+			if jobs == 1:
+				self._run_serial()
+			else:
+				self._run_parallel(jobs)
+		finally:
+			if self._output is not sys.stdout:
+				self._output.close()
+		t = time.time() - t0
+		self._log.info("Scanned %d certificates in %.1f seconds (%.0f/s) using %d process(es), %d duplicates skipped, %d undecodable inputs." % (self._scanned, t, self._scanned / t if (t > 0) else 0, jobs, self._duplicates, self._decode_errors))
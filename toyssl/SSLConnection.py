@@ -19,19 +19,25 @@
 #
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
+import os
+import time
+import queue
 import socket
 import threading
 
 from toyssl.msg.BufferFifo import BufferFifo
 from toyssl.msg.MsgBuffer import MsgBuffer
-from toyssl.log import ConnectionLogger
+from toyssl.msg.RecordWriter import RecordWriter
+from toyssl.msg.Enums import ContentType
+from toyssl.log import ConnectionLogger, ConnectionStats
 
 class _SocketRXThread(threading.Thread):
-	def __init__(self, conn, callback):
+	def __init__(self, conn, callback, eof_callback):
 		threading.Thread.__init__(self)
 		self._quit = False
 		self._conn = conn
 		self._callback = callback
+		self._eof_callback = eof_callback
 
 	def close(self):
 		self._quit = True
@@ -39,25 +45,44 @@ class _SocketRXThread(threading.Thread):
 	def run(self):
 		while not self._quit:
 			try:
-				data = self._conn.recv(4096)
+				data = self._conn.recv(65536)
 			except socket.timeout:
 				continue
+			except OSError:
+				break
 			if len(data) > 0:
 				self._callback(data)
+			else:
+				break
+		self._eof_callback()
 
 class SSLConnection(object):
-	def __init__(self, protocol):
+	_IOV_MAX = os.sysconf("SC_IOV_MAX")
+
+	def __init__(self, protocol, send_timeout = 30):
 		self._conn = None
+		self._send_timeout = send_timeout
 		self._rxthread = None
 		self._rxbuffer = BufferFifo()
 		self._protocol = protocol
 		self._handler = None
 		self._connlog = ConnectionLogger()
+		self._stats = ConnectionStats()
+		self._recordwriter = RecordWriter(self._protocol, self.tx_to_peer_iov, stats = self._stats)
+		self._appdata = queue.Queue()
 
 	@property
 	def log(self):
 		return self._connlog
 
+	@property
+	def stats(self):
+		return self._stats
+
+	@property
+	def recordwriter(self):
+		return self._recordwriter
+
 	def set_handler(self, handler):
 		self._handler = handler
 
@@ -68,25 +93,105 @@ class SSLConnection(object):
 			next_pkt = self._rxbuffer.getrecordlayerpkt()
 			if next_pkt is None:
 				return
+			self._stats.count("rx_records")
+			# Plaintext length, as recorded for tx_record_size by the RecordWriter
+			self._stats.histogram("rx_record_size").add(self._protocol.rx_engine.opened_length(len(next_pkt)))
+			if next_pkt[0] == ContentType.ApplicationData:
+				(opened, plaintext) = self._protocol.rx_engine.open(next_pkt)
+				self._appdata.put(plaintext)
+				continue
 			next_pkt = MsgBuffer(next_pkt)
-			layered_pkt = self._protocol.parse(next_pkt)
-			self._connlog.rx_packet(layered_pkt)
-			self._handler.rx_packet(layered_pkt)
+			for layered_pkt in self._protocol.parse(next_pkt):
+				self._connlog.rx_packet(layered_pkt)
+				self._handler.rx_packet(layered_pkt)
+
+	def rx_eof(self):
+		self._appdata.put(None)
 
 	def tx_to_peer(self, data):
 		self._conn.send(data)
 
+	def tx_to_peer_iov(self, iovecs):
+		"""Sends all buffers with as few sendmsg() calls as possible. Partial
+		sends are continued at the exact byte they stopped. Socket timeouts
+		are retried until the peer has not accepted any data for
+		'send_timeout' seconds, then the socket.timeout is raised."""
+		iovecs = [ memoryview(iovec) for iovec in iovecs if len(iovec) > 0 ]
+		index = 0
+		last_progress = time.monotonic()
+		while index < len(iovecs):
+			try:
+				sent = self._conn.sendmsg(iovecs[index : index + self._IOV_MAX])
+			except socket.timeout:
+				if time.monotonic() - last_progress >= self._send_timeout:
+					raise
+				continue
+			last_progress = time.monotonic()
+			while (index < len(iovecs)) and (sent >= len(iovecs[index])):
+				sent -= len(iovecs[index])
+				index += 1
+			if sent > 0:
+				iovecs[index] = iovecs[index][sent : ]
+
 	def set_peer_socket(self, conn):
 		self._conn = conn
-		self._rxthread = _SocketRXThread(self._conn, self.rx_from_peer)
+		self._rxthread = _SocketRXThread(self._conn, self.rx_from_peer, self.rx_eof)
 		self._rxthread.start()
 
+	def begin_flight(self):
+		"""All packets sent until the next flush() are packed into shared
+		records and written with a single system call."""
+		self._recordwriter.begin_flight()
+		return self
+
 	def send_pkt(self, pkt):
-		layered_pkt = self._protocol.serialize(pkt)
+		"""Sends a protocol message. Messages that exceed the maximum record
+		size are fragmented across records directly from the serialized
+		buffer."""
+		layered_pkt = self._protocol.serialize_message(pkt)
 		self._handler.tx_packet(layered_pkt)
 		self._connlog.tx_packet(layered_pkt)
-		self.tx_to_peer(layered_pkt.data.data)
+		self._recordwriter.add_message(self._protocol.content_type_of(pkt), layered_pkt.data.view)
+
+	def write(self, data):
+		"""Sends application data. Takes any object supporting the buffer
+		protocol, large buffers are fragmented into records without being
+		copied. Small writes are coalesced until flush() is called."""
+		self._recordwriter.write(data)
+		return self
+
+	def flush(self):
+		self._recordwriter.flush()
+		return self
+
+	def read(self, timeout = None):
+		"""Generator that yields chunks of decrypted application data as they
+		arrive. It ends when the peer closes the connection or, if a timeout
+		is given, when no data arrived for that many seconds."""
+		while True:
+			try:
+				chunk = self._appdata.get(timeout = timeout)
+			except queue.Empty:
+				return
+			if chunk is None:
+				# Keep the EOF marker for subsequent readers
+				self._appdata.put(None)
+				return
+			yield chunk
+
+	def close(self):
+		if self._conn is None:
+			# Never connected, there is nobody to send pending data to
+			return
+		self.flush()
+		try:
+			self._conn.shutdown(socket.SHUT_RDWR)
+		except OSError:
+			pass
+		if self._rxthread is not None:
+			self._rxthread.close()
+			self._rxthread.join()
+		self._conn.close()
 
 	def explain(self, explanation):
 		self._connlog.explain(explanation)
-
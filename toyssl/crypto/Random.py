@@ -19,11 +19,11 @@
 #
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
+import os
+
 def secure_rand(length):
-	f = open("/dev/urandom", "rb")
-	data = f.read(length)
+	data = os.urandom(length)
 	assert(len(data) == length)
-	f.close()
 	return data
 
 
@@ -0,0 +1,229 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import struct
+import collections
+from Crypto.Cipher import AES
+
+_OpenedRecord = collections.namedtuple("OpenedRecord", [ "content_type", "ssl_version", "length" ])
+
+class _BaseRecordEngine(object):
+	"""A record engine protects (seals) outgoing and verifies (opens)
+	incoming TLS records. Sealing and opening always operate on the full
+	record including the 5 byte record layer header and write into a buffer
+	that is supplied by the caller."""
+	HEADER_LENGTH = 5
+	_MAX_SEQNO = (1 << 64) - 1
+
+	def __init__(self):
+		self._seqno = 0
+
+	@property
+	def seqno(self):
+		return self._seqno
+
+	@property
+	def overhead(self):
+		"""Number of bytes that protection adds to the plaintext, not
+		counting the record layer header."""
+		raise Exception(NotImplemented)
+
+	@staticmethod
+	def _parts(plaintext):
+		"""The plaintext of a record may be given as a list of buffers which
+		are concatenated, e.g., when the record spans several messages."""
+		if isinstance(plaintext, (list, tuple)):
+			return plaintext
+		return [ plaintext ]
+
+	@staticmethod
+	def _plaintext_length(plaintext):
+		if isinstance(plaintext, (list, tuple)):
+			return sum(len(part) for part in plaintext)
+		return len(plaintext)
+
+	def sealed_length(self, plaintext_length):
+		return self.HEADER_LENGTH + self.overhead + plaintext_length
+
+	def opened_length(self, record_length):
+		return record_length - self.HEADER_LENGTH - self.overhead
+
+	def _next_seqno(self):
+		if self._seqno >= self._MAX_SEQNO:
+			raise Exception("Record sequence number exhausted, renegotiation would be required.")
+		seqno = self._seqno
+		self._seqno += 1
+		return seqno
+
+	@staticmethod
+	def _parse_header(record):
+		if len(record) < _BaseRecordEngine.HEADER_LENGTH:
+			raise Exception("Record of %d bytes is too short to contain a record layer header." % (len(record)))
+		(content_type, ssl_version, length) = struct.unpack_from(">BHH", record, 0)
+		if length != len(record) - _BaseRecordEngine.HEADER_LENGTH:
+			raise Exception("Record layer header announces %d bytes of payload, but %d bytes are present." % (length, len(record) - _BaseRecordEngine.HEADER_LENGTH))
+		return (content_type, ssl_version, length)
+
+	def seal_into(self, content_type, ssl_version, plaintext, output):
+		"""Writes the protected record into 'output', which needs to be large
+		enough to hold sealed_length() bytes of the plaintext length. Returns
+		the number of bytes written."""
+		raise Exception(NotImplemented)
+
+	def open_into(self, record, output):
+		"""Verifies the complete record and writes the plaintext into
+		'output', which needs to be at least opened_length(len(record)) bytes
+		long."""
+		raise Exception(NotImplemented)
+
+	def seal(self, content_type, ssl_version, plaintext):
+		"""Returns a list of buffers which, when sent in order, form the
+		protected record."""
+		output = bytearray(self.sealed_length(self._plaintext_length(plaintext)))
+		self.seal_into(content_type, ssl_version, plaintext, output)
+		return [ output ]
+
+	def open(self, record):
+		"""Returns a tuple of the record header information and a buffer that
+		contains the plaintext of the record."""
+		output = bytearray(self.opened_length(len(record)))
+		opened = self.open_into(record, output)
+		return (opened, output)
+
+class NullRecordEngine(_BaseRecordEngine):
+	"""Record engine of the TLS_NULL_WITH_NULL_NULL state, i.e., before the
+	first ChangeCipherSpec. Records are passed through unprotected."""
+
+	@property
+	def overhead(self):
+		return 0
+
+	def seal_into(self, content_type, ssl_version, plaintext, output):
+		self._next_seqno()
+		length = self._plaintext_length(plaintext)
+		struct.pack_into(">BHH", output, 0, content_type, ssl_version, length)
+		output = memoryview(output)
+		offset = self.HEADER_LENGTH
+		for part in self._parts(plaintext):
+			output[offset : offset + len(part)] = part
+			offset += len(part)
+		return offset
+
+	def open_into(self, record, output):
+		(content_type, ssl_version, length) = self._parse_header(record)
+		self._next_seqno()
+		memoryview(output)[: length] = memoryview(record)[self.HEADER_LENGTH : ]
+		return _OpenedRecord(content_type = content_type, ssl_version = ssl_version, length = length)
+
+	def seal(self, content_type, ssl_version, plaintext):
+		# No need to touch the plaintext at all, it can be sent directly after
+		# the header.
+		self._next_seqno()
+		return [ struct.pack(">BHH", content_type, ssl_version, self._plaintext_length(plaintext)) ] + list(self._parts(plaintext))
+
+	def open(self, record):
+		(content_type, ssl_version, length) = self._parse_header(record)
+		self._next_seqno()
+		opened = _OpenedRecord(content_type = content_type, ssl_version = ssl_version, length = length)
+		return (opened, memoryview(record)[self.HEADER_LENGTH : ])
+
+class AESGCMRecordEngine(_BaseRecordEngine):
+	"""AES-GCM AEAD record protection as of RFC5288. The 12 byte nonce
+	consists of the 4 byte implicit salt (client_write_IV or server_write_IV
+	of the key block) followed by an 8 byte explicit part which is
+	transmitted in front of the ciphertext. The explicit part is the record
+	sequence number, which is guaranteed to never repeat for one key. The
+	additional authenticated data is seq_num || type || version || length
+	with the length being the one of the plaintext."""
+	_EXPLICIT_NONCE_LENGTH = 8
+	_TAG_LENGTH = 16
+
+	def __init__(self, key, salt):
+		_BaseRecordEngine.__init__(self)
+		assert(len(key) in [ 16, 32 ])
+		assert(len(salt) == 4)
+		self._key = bytes(key)
+		self._nonce = bytearray(12)
+		self._nonce[0 : 4] = salt
+		self._aad = bytearray(13)
+
+	@property
+	def keylen(self):
+		return len(self._key) * 8
+
+	@property
+	def overhead(self):
+		return self._EXPLICIT_NONCE_LENGTH + self._TAG_LENGTH
+
+	def _new_cipher(self, seqno, content_type, ssl_version, plaintext_length):
+		struct.pack_into(">QBHH", self._aad, 0, seqno, content_type, ssl_version, plaintext_length)
+		cipher = AES.new(self._key, AES.MODE_GCM, nonce = self._nonce, mac_len = self._TAG_LENGTH)
+		cipher.update(self._aad)
+		return cipher
+
+	def seal_into(self, content_type, ssl_version, plaintext, output):
+		length = self._plaintext_length(plaintext)
+		sealed_length = self.sealed_length(length)
+		if len(output) < sealed_length:
+			raise Exception("Output buffer of %d bytes too small to hold %d bytes of sealed record." % (len(output), sealed_length))
+		seqno = self._next_seqno()
+		struct.pack_into(">Q", self._nonce, 4, seqno)
+
+		output = memoryview(output)
+		ct_start = self.HEADER_LENGTH + self._EXPLICIT_NONCE_LENGTH
+		ct_end = ct_start + length
+		struct.pack_into(">BHHQ", output, 0, content_type, ssl_version, sealed_length - self.HEADER_LENGTH, seqno)
+
+		cipher = self._new_cipher(seqno, content_type, ssl_version, length)
+		for part in self._parts(plaintext):
+			cipher.encrypt(part, output = output[ct_start : ct_start + len(part)])
+			ct_start += len(part)
+		output[ct_end : sealed_length] = cipher.digest()
+		return sealed_length
+
+	def open_into(self, record, output):
+		(content_type, ssl_version, length) = self._parse_header(record)
+		plaintext_length = self.opened_length(len(record))
+		if plaintext_length < 0:
+			raise Exception("Record of %d bytes is too short to be a GCM protected record." % (len(record)))
+		if len(output) < plaintext_length:
+			raise Exception("Output buffer of %d bytes too small to hold %d bytes of plaintext." % (len(output), plaintext_length))
+
+		record = memoryview(record)
+		ct_start = self.HEADER_LENGTH + self._EXPLICIT_NONCE_LENGTH
+		ct_end = ct_start + plaintext_length
+		self._nonce[4 : 12] = record[self.HEADER_LENGTH : ct_start]
+
+		seqno = self._seqno
+		cipher = self._new_cipher(seqno, content_type, ssl_version, plaintext_length)
+		plaintext = memoryview(output)[: plaintext_length]
+		cipher.decrypt(record[ct_start : ct_end], output = plaintext)
+		try:
+			cipher.verify(record[ct_end : ])
+		except ValueError:
+			# Do not leave unauthenticated plaintext in the caller's buffer
+			plaintext[:] = bytes(plaintext_length)
+			raise Exception("GCM authentication tag mismatch, record #%d is forged or corrupt." % (seqno))
+		self._next_seqno()
+		return _OpenedRecord(content_type = content_type, ssl_version = ssl_version, length = plaintext_length)
+
+	def __str__(self):
+		return "AESGCMRecordEngine<AES-%d, seqno %d>" % (self.keylen, self.seqno)
@@ -0,0 +1,96 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import collections
+
+class Histogram(object):
+	"""Histogram with power-of-two bucket boundaries. A value is counted in
+	the smallest bucket 2^n that is greater or equal to it."""
+	def __init__(self):
+		self._buckets = collections.Counter()
+		self._count = 0
+		self._total = 0
+
+	@staticmethod
+	def bucket_of(value):
+		if value <= 0:
+			return 0
+		return 1 << (value - 1).bit_length()
+
+	def add(self, value):
+		self._buckets[self.bucket_of(value)] += 1
+		self._count += 1
+		self._total += value
+		return self
+
+	@property
+	def count(self):
+		return self._count
+
+	@property
+	def total(self):
+		return self._total
+
+	@property
+	def mean(self):
+		return (self._total / self._count) if (self._count > 0) else 0
+
+	@property
+	def buckets(self):
+		return sorted(self._buckets.items())
+
+	def dump(self, name = None):
+		if name is not None:
+			print("%s: %d values, mean %.1f" % (name, self.count, self.mean))
+		for (bucket, count) in self.buckets:
+			print("    <= %-8d %d" % (bucket, count))
+
+	def __str__(self):
+		return "Histogram<%s>" % (", ".join("<=%d: %d" % (bucket, count) for (bucket, count) in self.buckets))
+
+class ConnectionStats(object):
+	def __init__(self):
+		self._counters = collections.Counter()
+		self._histograms = collections.defaultdict(Histogram)
+
+	def count(self, name, value = 1):
+		self._counters[name] += value
+		return self
+
+	def histogram(self, name):
+		return self._histograms[name]
+
+	@property
+	def counters(self):
+		return dict(self._counters)
+
+	@property
+	def histograms(self):
+		return dict(self._histograms)
+
+	def dump(self):
+		for (name, value) in sorted(self._counters.items()):
+			print("%s: %d" % (name, value))
+		for (name, histogram) in sorted(self._histograms.items()):
+			histogram.dump(name)
+
+	def __str__(self):
+		return "ConnectionStats<%d counters, %d histograms>" % (len(self._counters), len(self._histograms))
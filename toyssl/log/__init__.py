@@ -20,3 +20,4 @@
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
 from .ConnectionLogger import ConnectionLogger
+from .ConnectionStats import ConnectionStats
@@ -38,7 +38,7 @@ class BufferFifo(object):
 			self._data.seek(3)
 			expect_length = self._data.get_uint16()
 
-			if len(self._data) > expect_length:
+			if len(self._data) >= expect_length + 5:
 				(head, self._data) = self._data.cut_head(expect_length + 5)
 				return head
 
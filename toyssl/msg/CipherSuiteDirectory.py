@@ -22,6 +22,7 @@
 import re
 import collections
 from .Enums import CipherSuite
+from toyssl.utils import LRUCache
 
 def _dict_by_identifier(obj_list):
 	return { obj.identifier: obj for obj in obj_list }
@@ -93,6 +94,7 @@ class VerboseCipherSuite(object):
 	}
 
 	_CACHE = { }
+	_REGEX = None
 
 	def __init__(self, ciphersuite_id):
 		assert(isinstance(ciphersuite_id, CipherSuite))
@@ -108,8 +110,7 @@ class VerboseCipherSuite(object):
 		self._auth_vector_len = None
 
 		if not self._pseudo_suite:
-			regex = self._cipher_suite_regex
-			result = regex.match(str(self._csid))
+			result = self._cipher_suite_regex().match(self._csid.name)
 			if result is not None:
 				result = result.groupdict()
 				self._key_exchange = self._CIPHER_SUITE_COMPONENTS["key_exchange"].get(result["key_exchange"])
@@ -153,8 +154,9 @@ class VerboseCipherSuite(object):
 		non-negotiable pseudo cipher suite."""
 		return self._pseudo_suite
 	
-	def _cipher_suite_regex_part(self, partname, optional = False):
-		elements = self._CIPHER_SUITE_COMPONENTS[partname].values()
+	@classmethod
+	def _cipher_suite_regex_part(cls, partname, optional = False):
+		elements = cls._CIPHER_SUITE_COMPONENTS[partname].values()
 		part = "_(?P<%s>" % (partname)
 		part += "|".join(element.identifier for element in elements)
 		part += ")"
@@ -162,16 +164,19 @@ class VerboseCipherSuite(object):
 			part = "(%s)?" % (part)
 		return part
 
-	@property
-	def _cipher_suite_regex(self):
-		regex = r"^CipherSuite\.TLS"
-		regex += self._cipher_suite_regex_part("key_exchange")
-		regex += self._cipher_suite_regex_part("sig_algorithm", optional = True)
+	@classmethod
+	def _cipher_suite_regex(cls):
+		if cls._REGEX is not None:
+			return cls._REGEX
+		regex = r"^TLS"
+		regex += cls._cipher_suite_regex_part("key_exchange")
+		regex += cls._cipher_suite_regex_part("sig_algorithm", optional = True)
 		regex += "_WITH"
-		regex += self._cipher_suite_regex_part("cipher")
-		regex += self._cipher_suite_regex_part("prf")
+		regex += cls._cipher_suite_regex_part("cipher")
+		regex += cls._cipher_suite_regex_part("prf")
 		regex += "$"
-		return re.compile(regex)
+		cls._REGEX = re.compile(regex)
+		return cls._REGEX
 
 	def negotiate(self):
 		if self._pseudo_suite:
@@ -186,50 +191,150 @@ class VerboseCipherSuite(object):
 		return cls._CACHE[ciphersuite_id]
 
 	def __str__(self):
-		return "%s<Pseudo=%s, KEx = %s, Sig = %s, Cipher = %s, PRF = %s>" % (self.csid, self._pseudo_suite, self.key_exchange, self.sig_algorithm, self.cipher, self.prf)
+		return "%s<Pseudo=%s, KEx = %s, Sig = %s, Cipher = %s, PRF = %s>" % (self.csid.name, self._pseudo_suite, self.key_exchange, self.sig_algorithm, self.cipher, self.prf)
+
+class _CipherSuiteIndex(object):
+	"""Assigns every CipherSuite a bit position in enum order and records,
+	for every distinct cipher suite component (key exchange, signature
+	algorithm, cipher, PRF), the bitmask of all suites that use it. A set
+	of cipher suites is then a plain integer and queries on components are
+	bitwise operations that evaluate their predicate once per distinct
+	component instead of once per suite."""
+	_COMPONENTS = ( "key_exchange", "sig_algorithm", "cipher", "prf" )
+
+	def __init__(self):
+		self._suites = [ VerboseCipherSuite.getsuite(csid) for csid in CipherSuite ]
+		self._bits = { }
+		self._all = 0
+		self._components = { component: collections.defaultdict(int) for component in self._COMPONENTS }
+		for (bitno, csuite) in enumerate(self._suites):
+			bit = 1 << bitno
+			self._bits[csuite.csid] = bit
+			if not csuite.is_pseudo_suite:
+				self._all |= bit
+			for component in self._COMPONENTS:
+				element = getattr(csuite, component)
+				if element is not None:
+					self._components[component][element] |= bit
+		self._queries = LRUCache(256)
+
+	@property
+	def all(self):
+		return self._all
+
+	@property
+	def queries(self):
+		return self._queries
+
+	def mask_of(self, csids):
+		mask = 0
+		for csid in csids:
+			mask |= self._bits[csid]
+		return mask
+
+	def component_mask(self, component, filterfnc):
+		mask = 0
+		for (element, element_mask) in self._components[component].items():
+			if filterfnc(element):
+				mask |= element_mask
+		return mask
+
+	def attribute_mask(self, component, attribute, value):
+		"""Mask of all suites whose component has the given attribute value.
+		These are cached by the caller's query key, so this is only
+		computed on the first query."""
+		return self.component_mask(component, lambda element: getattr(element, attribute) == value)
+
+	def suites(self, mask):
+		suites = self._suites
+		while mask:
+			lowbit = mask & -mask
+			yield suites[lowbit.bit_length() - 1]
+			mask ^= lowbit
+
+	def __str__(self):
+		return "CipherSuiteIndex<%d suites>" % (len(self._suites))
 
 class CipherSuiteDirectory(object):
+	"""Immutable set of cipher suites. Internally this is a bitmask over the
+	process-wide _CipherSuiteIndex, so directories are cheap to create and
+	compound filters are bitwise ANDs. Iteration yields VerboseCipherSuite
+	objects in CipherSuite order."""
+	_INDEX = None
+
+	_KWFILTER_ATTRIBUTES = {
+		"cipher_name":		("cipher", "cipher"),
+		"cipher_keylen":	("cipher", "keylen"),
+		"cipher_opmode":	("cipher", "opmode"),
+		"kex_alg":			("key_exchange", "algorithm"),
+		"kex_pfs":			("key_exchange", "pfs"),
+		"sig_alg":			("sig_algorithm", "algorithm"),
+		"prf":				("prf", "identifier"),
+	}
+
 	def __init__(self, csids = None):
+		index = self._get_index()
 		if csids is not None:
-			self._csuites = { csid: VerboseCipherSuite.getsuite(csid) for csid in csids }
+			self._mask = index.mask_of(csids)
 		else:
-			self._csuites = { }
-			for csid in CipherSuite:
-				csuite = VerboseCipherSuite.getsuite(csid)
-				if not csuite.is_pseudo_suite:
-					self._csuites[csid] = csuite
+			self._mask = index.all
 
-	def filter(self, filterfnc):
-		return CipherSuiteDirectory(csuite.csid for csuite in self if filterfnc(csuite))
-	
-	def filter_cipher(self, filterfnc):		
-		return self.filter(lambda csuite: (csuite.cipher is not None) and filterfnc(csuite.cipher))
-	
-	def filter_kex(self, filterfnc):		
-		return self.filter(lambda csuite: (csuite.key_exchange is not None) and filterfnc(csuite.key_exchange))
-	
-	def filter_prf(self, filterfnc):		
-		return self.filter(lambda csuite: (csuite.prf is not None) and filterfnc(csuite.prf))
-
-	def filter_sig_algorithm(self, filterfnc):		
-		return self.filter(lambda csuite: (csuite.sig_algorithm is not None) and filterfnc(csuite.sig_algorithm))
-
-	def kwfilter(self, cipher_name = None, cipher_keylen = None, cipher_opmode = None, kex_alg = None, kex_pfs = None, sig_alg = None):
-		directory = self
-		if cipher_name is not None:
-			directory = directory.filter_cipher(lambda cipher: cipher.cipher == cipher_name)
-		if cipher_keylen is not None:
-			directory = directory.filter_cipher(lambda cipher: cipher.keylen == cipher_keylen)
-		if cipher_opmode is not None:
-			directory = directory.filter_cipher(lambda cipher: cipher.opmode == cipher_opmode)
-		if sig_alg is not None:
-			directory = directory.filter_sig_algorithm(lambda sig: sig.algorithm == sig_alg)
-		if kex_alg is not None:
-			directory = directory.filter_kex(lambda kex: kex.algorithm == kex_alg)
-		if kex_pfs is not None:
-			directory = directory.filter_kex(lambda kex: kex.pfs == kex_pfs)
+	@classmethod
+	def _get_index(cls):
+		if cls._INDEX is None:
+			cls._INDEX = _CipherSuiteIndex()
+		return cls._INDEX
+
+	@classmethod
+	def _from_mask(cls, mask):
+		directory = cls.__new__(cls)
+		directory._mask = mask
 		return directory
 
+	def filter(self, filterfnc):
+		return self._from_mask(self._get_index().mask_of(csuite.csid for csuite in self if filterfnc(csuite)))
+
+	def _filter_component(self, component, filterfnc):
+		return self._from_mask(self._mask & self._get_index().component_mask(component, filterfnc))
+
+	def filter_cipher(self, filterfnc):
+		return self._filter_component("cipher", filterfnc)
+
+	def filter_kex(self, filterfnc):
+		return self._filter_component("key_exchange", filterfnc)
+
+	def filter_prf(self, filterfnc):
+		return self._filter_component("prf", filterfnc)
+
+	def filter_sig_algorithm(self, filterfnc):
+		return self._filter_component("sig_algorithm", filterfnc)
+
+	def kwfilter(self, cipher_name = None, cipher_keylen = None, cipher_opmode = None, kex_alg = None, kex_pfs = None, sig_alg = None, prf = None):
+		"""All given criteria must hold. Each criterion is a precomputed mask
+		and results are cached by query."""
+		criteria = (("cipher_name", cipher_name), ("cipher_keylen", cipher_keylen), ("cipher_opmode", cipher_opmode), ("kex_alg", kex_alg), ("kex_pfs", kex_pfs), ("sig_alg", sig_alg), ("prf", prf))
+		criteria = tuple((key, value) for (key, value) in criteria if value is not None)
+		index = self._get_index()
+		query = (self._mask, criteria)
+		mask = index.queries.get(query)
+		if mask is None:
+			mask = self._mask
+			for criterion in criteria:
+				mask &= self._criterion_mask(index, criterion)
+			index.queries.put(query, mask)
+		return self._from_mask(mask)
+
+	def _criterion_mask(self, index, criterion):
+		# Single criteria on the full directory share the query cache
+		query = (index.all, (criterion, ))
+		mask = index.queries.get(query)
+		if mask is None:
+			(key, value) = criterion
+			(component, attribute) = self._KWFILTER_ATTRIBUTES[key]
+			mask = index.attribute_mask(component, attribute, value)
+			index.queries.put(query, mask)
+		return mask
+
 	def filter_secure(self):
 		secure_ciphers = self
 		secure_ciphers = secure_ciphers.filter_cipher(lambda cipher: cipher.keylen >= 128)
@@ -238,14 +343,29 @@ class CipherSuiteDirectory(object):
 		secure_ciphers = secure_ciphers.filter_sig_algorithm(lambda sig_algorithm: sig_algorithm.identifier in [ "ECDSA", "ECC" ])
 		return secure_ciphers
 
+	def __and__(self, other):
+		return self._from_mask(self._mask & other._mask)
+
+	def __or__(self, other):
+		return self._from_mask(self._mask | other._mask)
+
+	def __contains__(self, csid):
+		return (self._get_index().mask_of([ csid ]) & self._mask) != 0
+
 	def __iter__(self):
-		return iter(self._csuites.values())
+		return self._get_index().suites(self._mask)
 
 	def __len__(self):
-		return len(self._csuites)
+		return bin(self._mask).count("1")
+
+	def __eq__(self, other):
+		return isinstance(other, CipherSuiteDirectory) and (self._mask == other._mask)
+
+	def __hash__(self):
+		return hash(self._mask)
 
 	def dump(self):
-		for (csid, suite) in self._csuites.items():
+		for suite in self:
 			print(suite)
 
 	def __str__(self):
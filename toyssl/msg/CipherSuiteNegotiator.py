@@ -0,0 +1,157 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import collections
+from .CipherSuiteDirectory import VerboseCipherSuite
+from .Enums import CipherSuite
+
+_SuiteRequirements = collections.namedtuple("SuiteRequirements", [ "key_type", "needs_ec_group", "cost" ])
+
+class CipherSuiteNegotiator(object):
+	"""Selects the cipher suite for a ClientHello according to a server
+	preference list. The preference is compiled into rank tables indexed by
+	the 16 bit cipher suite ID (lower rank is better; suites that are not
+	acceptable have no rank), so that selection is a single pass over the
+	client's offer with one list access per offered suite.
+
+	Suites are only acceptable when the server holds a key of the type the
+	suite authenticates with (e.g., "RSA" for TLS_DHE_RSA_*) and, for
+	ECDH(E) key exchange, when the client supports one of the server's
+	elliptic curve groups. Clients that do not send a supported_groups
+	extension are assumed to support all groups (RFC4492 Sect. 4).
+
+	With 'prefer_cheap', suites are ranked by their estimated CPU cost for
+	the server's side of the handshake first and by preference second,
+	which operators can enable while the server is CPU bound."""
+
+	# Rough relative server CPU cost of the handshake operations
+	_KEX_COST = { "ECDH": 1, "DH": 8, "RSA": 4 }
+	_SIG_COST = { "ECDSA": 1, "DSS": 2, "RSA": 4 }
+	_STATIC_KEY_TYPES = { "DH": "DH", "ECDH": "ECDH" }
+	_NO_RANK = 1 << 32
+
+	# What the server handler implements: ephemeral DH signed with RSA inside
+	# a TLS 1.0 ServerHello, keys derived with the MD5/SHA1 PRF. Ordered
+	# explicitly, strongest first, so neither enum order nor the directory
+	# contents can sneak in 3DES, DES, export or TLS 1.2-only suites.
+	TLS10_DHE_RSA_SUITES = (
+		CipherSuite.TLS_DHE_RSA_WITH_AES_128_CBC_SHA,
+		CipherSuite.TLS_DHE_RSA_WITH_AES_256_CBC_SHA,
+	)
+
+	def __init__(self, preference, groups = None, prefer_cheap = False):
+		self._preference = [ csuite.csid if isinstance(csuite, VerboseCipherSuite) else csuite for csuite in preference ]
+		self._groups = frozenset(groups) if (groups is not None) else frozenset()
+		self._prefer_cheap = prefer_cheap
+		self._requirements = { csid: self._get_requirements(VerboseCipherSuite.getsuite(csid)) for csid in self._preference }
+		self._ec_suites = [ False ] * 65536
+		for (csid, requirements) in self._requirements.items():
+			self._ec_suites[csid] = (requirements is not None) and requirements.needs_ec_group
+		self._rank_tables = { }
+
+	@classmethod
+	def tls10_dhe_rsa(cls, prefer_cheap = False):
+		return cls(cls.TLS10_DHE_RSA_SUITES, prefer_cheap = prefer_cheap)
+
+	@property
+	def preference(self):
+		return list(self._preference)
+
+	@property
+	def prefer_cheap(self):
+		return self._prefer_cheap
+
+	@prefer_cheap.setter
+	def prefer_cheap(self, value):
+		self._prefer_cheap = value
+
+	@classmethod
+	def _get_requirements(cls, csuite):
+		kex = csuite.key_exchange
+		sig = csuite.sig_algorithm
+		if (kex is None) or (csuite.cipher is None) or csuite.is_pseudo_suite:
+			# Not decomposed by VerboseCipherSuite, never selected
+			return None
+		if kex.identifier.endswith("_anon") or (kex.algorithm in [ "PSK", "KRB5" ]):
+			key_type = None
+		elif (sig is None) or (not kex.pfs and (kex.algorithm in cls._STATIC_KEY_TYPES)):
+			# Certificate key is used for the key exchange itself (RSA, static DH/ECDH)
+			key_type = cls._STATIC_KEY_TYPES.get(kex.algorithm, kex.algorithm)
+		else:
+			key_type = sig.algorithm
+
+		cost = cls._KEX_COST.get(kex.algorithm, 2)
+		if kex.pfs and (sig is not None):
+			cost += cls._SIG_COST.get(sig.algorithm, 2)
+		if csuite.cipher.aead or (csuite.cipher.opmode == "STRM"):
+			cost += 1
+		else:
+			cost += 2
+		return _SuiteRequirements(key_type = key_type, needs_ec_group = (kex.algorithm == "ECDH"), cost = cost)
+
+	def _compile(self, key_types, prefer_cheap):
+		rank_table = [ self._NO_RANK ] * 65536
+		count = len(self._preference)
+		for (index, csid) in enumerate(self._preference):
+			requirements = self._requirements[csid]
+			if requirements is None:
+				continue
+			if (requirements.key_type is not None) and (requirements.key_type not in key_types):
+				continue
+			if prefer_cheap:
+				rank_table[csid] = (requirements.cost * count) + index
+			else:
+				rank_table[csid] = index
+		return rank_table
+
+	def rank_table(self, key_types, prefer_cheap = False):
+		"""Returns the compiled rank table for a set of server key types. Tables
+		are compiled on first use for every distinct set."""
+		key = (frozenset(key_types), prefer_cheap)
+		rank_table = self._rank_tables.get(key)
+		if rank_table is None:
+			rank_table = self._compile(key[0], prefer_cheap)
+			self._rank_tables[key] = rank_table
+		return rank_table
+
+	def select(self, offered, key_types = ( "RSA", ), client_groups = None, prefer_cheap = None):
+		"""Returns the best acceptable suite of the offered ones (CipherSuite
+		members or plain IDs) or None if there is none."""
+		if prefer_cheap is None:
+			prefer_cheap = self._prefer_cheap
+		rank_table = self.rank_table(key_types, prefer_cheap)
+		ec_possible = (client_groups is None) or (not self._groups.isdisjoint(client_groups))
+		ec_suites = self._ec_suites
+		best = None
+		best_rank = self._NO_RANK
+		for csid in offered:
+			rank = rank_table[csid]
+			if rank < best_rank:
+				if ec_suites[csid] and not ec_possible:
+					continue
+				best = csid
+				best_rank = rank
+		if best is None:
+			return None
+		return CipherSuite(best)
+
+	def __str__(self):
+		return "CipherSuiteNegotiator<%d suites, %d groups, prefer_cheap = %s>" % (len(self._preference), len(self._groups), self._prefer_cheap)
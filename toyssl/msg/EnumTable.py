@@ -0,0 +1,119 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+class UnknownEnumValue(int):
+	"""Wire value that has no member in the enum it was decoded as. Behaves
+	like the plain integer, so it can be compared, hashed and serialized
+	again, but also has the 'name' and 'value' attributes of a member so
+	that it can be logged like one."""
+	__slots__ = ( )
+	enumtype = None
+
+	@property
+	def name(self):
+		return "unknown(0x%x)" % (self)
+
+	@property
+	def value(self):
+		return int(self)
+
+	def __repr__(self):
+		return "<%s.%s>" % (self.enumtype.__name__, self.name)
+
+	def __str__(self):
+		return "%s.%s" % (self.enumtype.__name__, self.name)
+
+class EnumTable(object):
+	"""Decodes integer wire values into members of an IntEnum by indexing a
+	precomputed list that covers the whole 8 or 16 bit value range of the
+	registry. Calling an IntEnum with a value is comparatively slow and
+	raises ValueError for values it does not know (e.g., GREASE values or
+	newly assigned code points), which would abort parsing of the whole
+	message. Instead, unknown values decode to an UnknownEnumValue
+	subclass specific to the enum; those are only created when such a
+	value is actually seen and then kept in the table."""
+	_TABLES = { }
+
+	def __init__(self, enumtype):
+		self._enumtype = enumtype
+		self._unknown = type("Unknown" + enumtype.__name__, (UnknownEnumValue, ), { "__slots__": ( ), "enumtype": enumtype })
+		size = 256 if (max(enumtype) < 256) else 65536
+		self._table = [ None ] * size
+		for member in enumtype:
+			self._table[member] = member
+
+	@classmethod
+	def get(cls, enumtype):
+		table = cls._TABLES.get(enumtype)
+		if table is None:
+			table = cls(enumtype)
+			cls._TABLES[enumtype] = table
+		return table
+
+	@property
+	def enumtype(self):
+		return self._enumtype
+
+	def _decode_unknown(self, value):
+		if not 0 <= value < len(self._table):
+			return self._unknown(value)
+		member = self._unknown(value)
+		self._table[value] = member
+		return member
+
+	def __call__(self, value):
+		try:
+			member = self._table[value]
+		except IndexError:
+			member = None
+		if member is None:
+			member = self._decode_unknown(value)
+		return member
+
+	def decode_all(self, values):
+		"""Decodes an iterable of wire values into a list."""
+		table = self._table
+		try:
+			members = [ table[value] for value in values ]
+		except IndexError:
+			members = [ None ] * len(values)
+		if None in members:
+			members = [ self(value) for value in values ]
+		return members
+
+	def is_member(self, value):
+		"""True for members of the enum and for unknown values that were
+		decoded by this table."""
+		return isinstance(value, (self._enumtype, self._unknown))
+
+	def __len__(self):
+		return len(self._table)
+
+	def __str__(self):
+		return "EnumTable<%s, %d entries>" % (self._enumtype.__name__, len(self._table))
+
+def enum_table(enumtype):
+	return EnumTable.get(enumtype)
+
+def is_enum_value(value, enumtype):
+	"""Relaxed isinstance() check that also accepts unknown values that were
+	decoded as enumtype."""
+	return isinstance(value, enumtype) or (isinstance(value, UnknownEnumValue) and (value.enumtype is enumtype))
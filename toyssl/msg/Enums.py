@@ -320,6 +320,7 @@ class ExtensionType(enum.IntEnum):
 	encrypt_then_mac = 22 	# [RFC7366]
 	extended_master_secret = 23 # (TEMPORARY - registered 2014-09-26, expires 2015-09-26) 	[draft-ietf-tls-session-hash]
 	SessionTicketTLS = 35 	# [RFC4507]
+	supported_versions = 43 	# [RFC8446]
 	renegotiation_info = 65281 	# [RFC5746]
 
 class HashAlgorithm(enum.IntEnum):
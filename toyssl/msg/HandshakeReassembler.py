@@ -0,0 +1,98 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import collections
+from .MsgBuffer import MsgBuffer
+
+class HandshakeReassembler(object):
+	"""Reassembles handshake messages from the payload of handshake records.
+	A record may contain several handshake messages and a handshake message
+	may be fragmented across several records. Record payloads are only
+	referenced while a message is incomplete; every byte is copied exactly
+	once, namely when the complete message is cut out of the fragments."""
+	_HEADER_LENGTH = 4
+
+	def __init__(self, max_message_length = 1024 * 1024):
+		self._max_message_length = max_message_length
+		self._fragments = collections.deque()
+		self._buffered = 0
+
+	@property
+	def buffered(self):
+		"""Number of bytes that belong to incomplete messages."""
+		return self._buffered
+
+	def put(self, fragment):
+		fragment = memoryview(fragment)
+		if len(fragment) > 0:
+			self._fragments.append(fragment)
+			self._buffered += len(fragment)
+		return self
+
+	def _peek_header(self):
+		first = self._fragments[0]
+		if len(first) >= self._HEADER_LENGTH:
+			return first[: self._HEADER_LENGTH]
+		header = bytearray()
+		for fragment in self._fragments:
+			header += fragment[: self._HEADER_LENGTH - len(header)]
+			if len(header) == self._HEADER_LENGTH:
+				break
+		return header
+
+	def _cut(self, length):
+		message = bytearray(length)
+		offset = 0
+		while offset < length:
+			fragment = self._fragments[0]
+			chunk = min(len(fragment), length - offset)
+			message[offset : offset + chunk] = fragment[: chunk]
+			offset += chunk
+			if chunk == len(fragment):
+				self._fragments.popleft()
+			else:
+				self._fragments[0] = fragment[chunk : ]
+		self._buffered -= length
+		return message
+
+	def get(self):
+		"""Returns the next complete handshake message (including its 4 byte
+		header) as a MsgBuffer or None if no complete message is buffered."""
+		if self._buffered < self._HEADER_LENGTH:
+			return None
+		header = self._peek_header()
+		length = (header[1] << 16) | (header[2] << 8) | header[3]
+		if length > self._max_message_length:
+			raise Exception("Handshake message of type %d announces %d bytes, more than the permitted maximum of %d bytes." % (header[0], length, self._max_message_length))
+		if self._buffered < self._HEADER_LENGTH + length:
+			return None
+		return MsgBuffer.wrap(self._cut(self._HEADER_LENGTH + length))
+
+	def __iter__(self):
+		"""Iterates over all complete messages that are buffered."""
+		while True:
+			message = self.get()
+			if message is None:
+				break
+			yield message
+
+	def __str__(self):
+		return "HandshakeReassembler<%d fragments, %d bytes>" % (len(self._fragments), self._buffered)
@@ -60,19 +60,36 @@ class MsgBuffer(object):
 
 		assert(self._endian == "BE")
 
+	@staticmethod
+	def wrap(buffer, **kwargs):
+		"""Creates a MsgBuffer that takes ownership of the given bytearray
+		instead of copying it."""
+		assert(isinstance(buffer, bytearray))
+		msgbuf = MsgBuffer(**kwargs)
+		msgbuf._buffer = buffer
+		if kwargs.get("markers") is None:
+			msgbuf._markers = MarkerNode(0, len(buffer))
+		return msgbuf
+
 	@property
 	def markers(self):
 		return self._markers
 
 	def cut_head(self, pos):
 		head = self._buffer[:pos]
-		self._buffer = self._buffer[pos:]
+		del self._buffer[:pos]
 		return (head, self)
 
 	@property
 	def data(self):
 		return bytes(self._buffer)
 
+	@property
+	def view(self):
+		"""Zero-copy view of the buffer. The buffer cannot grow while a view
+		is held."""
+		return memoryview(self._buffer)
+
 	@property
 	def tailbuffer(self):
 		return bytes(self._buffer[self._pos : ])
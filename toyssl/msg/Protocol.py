@@ -24,44 +24,85 @@ import logging
 
 from .MsgBuffer import MsgBuffer
 from .RecordLayerPkt import RecordLayerPkt
+from .HandshakeReassembler import HandshakeReassembler
 from .handshake import parse_handshake_pkt, ClientHelloPkt, ServerHelloPkt, CertificatePkt, ServerKeyExchangePkt, ServerHelloDonePkt
-from .changecipherspec import parse_changecipherspec_pkt
+from .changecipherspec import parse_changecipherspec_pkt, ChangeCipherSpecBasePkt
 from .Enums import SSLVersion, ContentType, HandshakeType
+from toyssl.crypto.RecordEngine import NullRecordEngine
 
 _LayeredPacket = collections.namedtuple("LayeredPacket", [ "record", "application", "data" ])
 
 class Protocol(object):
 	def __init__(self):
 		self._log = logging.getLogger("toyssl")
-		self._rx_engine = None
-		self._tx_engine = None
+		self._rx_engine = NullRecordEngine()
+		self._tx_engine = NullRecordEngine()
+		self._reassembler = HandshakeReassembler()
+
+	@property
+	def reassembler(self):
+		return self._reassembler
+
+	@property
+	def record_version(self):
+		return SSLVersion.ProtocolTLSv1_0
+
+	@property
+	def rx_engine(self):
+		return self._rx_engine
+
+	@property
+	def tx_engine(self):
+		return self._tx_engine
 
 	def set_crypto_engine(self, rx_engine, tx_engine):
 		self._rx_engine = rx_engine
 		self._tx_engine = tx_engine
 		return self
 
+	@staticmethod
+	def content_type_of(app_layer):
+		if isinstance(app_layer, ChangeCipherSpecBasePkt):
+			return ContentType.ChangeCipherSpec
+		return ContentType.Handshake
+
+	def serialize_message(self, app_layer):
+		"""Serializes only the message itself. The record layer is created
+		later on when the message is written out as part of a flight."""
+		msgbuf = app_layer.reserialize()
+		layered = _LayeredPacket(record = None, application = app_layer, data = msgbuf)
+		return layered
+
 	def serialize(self, app_layer):
 		#record_layer = RecordLayerPkt(ContentType.Handshake, SSLVersion.ProtocolTLSv1_2, app_layer.reserialize())
-		record_layer = RecordLayerPkt(ContentType.Handshake, SSLVersion.ProtocolTLSv1_0, app_layer.reserialize())
+		record_layer = RecordLayerPkt(self.content_type_of(app_layer), self.record_version, app_layer.reserialize())
 		msgbuf = record_layer.serialize()
 		layered = _LayeredPacket(record = record_layer, application = app_layer, data = msgbuf)
 		return layered
 
 	def parse(self, data):
+		"""Parses one record layer packet and returns a list of all messages
+		that could be completed by it. Handshake messages may be coalesced
+		within a single record or fragmented across several, so this list may
+		be empty or contain multiple entries."""
 		assert(isinstance(data, MsgBuffer))
 		record_layer = RecordLayerPkt.parse(data)
 		self._log.debug("Parsing record layer packet with content type %s from %d bytes buffer" % (str(record_layer.contenttype), len(data)))
 
+		layered_pkts = [ ]
 		if record_layer.contenttype == ContentType.Handshake:
-			app_layer = parse_handshake_pkt(record_layer.payload)
-			assert(not isinstance(app_layer, tuple))
+			self._reassembler.put(record_layer.payload.view)
+			for msgbuf in self._reassembler:
+				app_layer = parse_handshake_pkt(msgbuf)
+				assert(not isinstance(app_layer, tuple))
+				layered_pkts.append(_LayeredPacket(record = record_layer, application = app_layer, data = msgbuf))
 		elif record_layer.contenttype == ContentType.ChangeCipherSpec:
+			if self._reassembler.buffered > 0:
+				raise Exception("ChangeCipherSpec received while %d bytes of a fragmented handshake message are pending." % (self._reassembler.buffered))
 			app_layer = parse_changecipherspec_pkt(record_layer.payload)
 			assert(not isinstance(app_layer, tuple))
+			layered_pkts.append(_LayeredPacket(record = record_layer, application = app_layer, data = data))
 		else:
 			self._log.error("Unknown record type packet: %s" % (str(record_layer)))
 			raise Exception(NotImplemented)
-
-		layered = _LayeredPacket(record = record_layer, application = app_layer, data = data)
-		return layered
+		return layered_pkts
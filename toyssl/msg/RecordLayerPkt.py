@@ -21,14 +21,17 @@
 
 from .Enums import ContentType, SSLVersion
 from .MsgBuffer import MsgBuffer
+from .EnumTable import enum_table, is_enum_value
 
 class RecordLayerPkt(object):
+	MAX_FRAGMENT_LENGTH = 16384
+
 	def __init__(self, content_type, ssl_version, payload):
 		self._content_type = content_type
 		self._ssl_version = ssl_version
 		self._payload = payload
-		assert(isinstance(self._content_type, ContentType))
-		assert(isinstance(self._ssl_version, SSLVersion))
+		assert(is_enum_value(self._content_type, ContentType))
+		assert(is_enum_value(self._ssl_version, SSLVersion))
 		assert(isinstance(payload, MsgBuffer))
 
 	@property
@@ -40,6 +43,8 @@ class RecordLayerPkt(object):
 		return self._payload
 
 	def serialize(self):
+		if len(self._payload) > self.MAX_FRAGMENT_LENGTH:
+			raise Exception("Record payload of %d bytes exceeds maximum fragment length of %d bytes, message needs to be fragmented by the RecordWriter." % (len(self._payload), self.MAX_FRAGMENT_LENGTH))
 		msg = MsgBuffer()
 		with msg.new_marker("ContentType") as marker:
 			msg.add_uint8(int(self._content_type))
@@ -54,11 +59,11 @@ class RecordLayerPkt(object):
 	def parse(msg):
 		assert(isinstance(msg, MsgBuffer))
 		with msg.new_marker("ContentType") as marker:
-			content_type = ContentType(msg.get_uint8())
+			content_type = enum_table(ContentType)(msg.get_uint8())
 			marker.add_comment(content_type.name)
 
 		with msg.new_marker("SSLVersion") as marker:
-			ssl_version = SSLVersion(msg.get_uint16())
+			ssl_version = enum_table(SSLVersion)(msg.get_uint16())
 			marker.add_comment(ssl_version.name)
 
 		with msg.new_marker("RecordPayload"):
@@ -0,0 +1,220 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import time
+import itertools
+from .Enums import ContentType
+from .RecordLayerPkt import RecordLayerPkt
+from toyssl.log import ConnectionStats
+
+class RecordWriter(object):
+	"""Turns outgoing payload into protected records and hands them to the
+	transport as a list of buffers (scatter/gather). Payload is never copied
+	on its way through the writer, records reference slices of the buffers
+	they were created from. The only exception are small application data
+	writes, which are coalesced into a common record so that writing many
+	tiny chunks does not result in many tiny records.
+
+	Application data records are sized dynamically: a new or idle
+	connection starts out with records that fit into a single TCP segment,
+	so the peer can decrypt the first bytes as soon as the first segment
+	arrives. After 'boost_after_bytes' have been written, records grow to
+	the maximum size to minimize per-record overhead. When the connection
+	was idle for 'idle_timeout' seconds, it falls back to small records."""
+	MAX_FRAGMENT_LENGTH = RecordLayerPkt.MAX_FRAGMENT_LENGTH
+
+	def __init__(self, protocol, sendmsg_fnc, coalesce_threshold = 2048, stats = None):
+		self._protocol = protocol
+		self._sendmsg_fnc = sendmsg_fnc
+		self._coalesce_threshold = coalesce_threshold
+		self._coalesce = bytearray()
+		self._iovecs = [ ]
+		self._flight = None
+		self._stats = stats if (stats is not None) else ConnectionStats()
+		self._small_record_length = 1400
+		self._boost_after_bytes = 1024 * 1024
+		self._idle_timeout = 1.0
+		self._bytes_since_idle = 0
+		self._last_activity = None
+
+	@property
+	def stats(self):
+		return self._stats
+
+	def configure_record_sizing(self, small_record_length = 1400, boost_after_bytes = 1024 * 1024, idle_timeout = 1.0):
+		"""Sets the wire size of records used on new or idle connections, the
+		number of bytes after which maximum sized records are used and the
+		idle time after which the writer falls back to small records. Setting
+		'boost_after_bytes' to zero always uses maximum sized records."""
+		self._small_record_length = small_record_length
+		self._boost_after_bytes = boost_after_bytes
+		self._idle_timeout = idle_timeout
+		return self
+
+	@property
+	def app_fragment_length(self):
+		"""Current maximum plaintext length of application data records."""
+		if self._bytes_since_idle >= self._boost_after_bytes:
+			return self.MAX_FRAGMENT_LENGTH
+		overhead = self._protocol.tx_engine.sealed_length(0)
+		return max(1, min(self.MAX_FRAGMENT_LENGTH, self._small_record_length - overhead))
+
+	def _check_idle(self):
+		now = time.monotonic()
+		if (self._last_activity is not None) and (now - self._last_activity > self._idle_timeout):
+			if self._bytes_since_idle >= self._boost_after_bytes:
+				self._stats.count("record_size_fallbacks")
+			self._bytes_since_idle = 0
+		self._last_activity = now
+
+	@property
+	def pending_bytes(self):
+		"""Application data which has been coalesced but not yet put into a
+		record."""
+		return len(self._coalesce)
+
+	@staticmethod
+	def _byteview(data):
+		view = memoryview(data)
+		if (view.ndim != 1) or (view.format != "B"):
+			view = view.cast("B")
+		return view
+
+	def add_records(self, content_type, data):
+		"""Queues 'data' as one or more records of the given content type.
+		'data' may also be a list of buffers which are treated as one
+		contiguous stream, i.e., several messages share a record and a
+		message may span several records. Records are at most
+		MAX_FRAGMENT_LENGTH bytes long and reference the given buffers
+		directly, so they must not be modified until the next flush()."""
+		if not isinstance(data, (list, tuple)):
+			data = [ data ]
+		fragment = [ ]
+		fragment_length = 0
+		for view in data:
+			view = self._byteview(view)
+			offset = 0
+			while offset < len(view):
+				part = view[offset : offset + self.MAX_FRAGMENT_LENGTH - fragment_length]
+				fragment.append(part)
+				fragment_length += len(part)
+				offset += len(part)
+				if fragment_length == self.MAX_FRAGMENT_LENGTH:
+					self._add_record(content_type, fragment, fragment_length)
+					(fragment, fragment_length) = ([ ], 0)
+		if fragment_length > 0:
+			self._add_record(content_type, fragment, fragment_length)
+		return self
+
+	def _add_record(self, content_type, fragment, fragment_length):
+		self._iovecs += self._protocol.tx_engine.seal(content_type, self._protocol.record_version, fragment)
+		self._stats.count("tx_records")
+		self._stats.histogram("tx_record_size").add(fragment_length)
+
+	def _add_app_records(self, data):
+		view = self._byteview(data)
+		offset = 0
+		while offset < len(view):
+			fragment_length = self.app_fragment_length
+			fragment = view[offset : offset + fragment_length]
+			self._add_record(ContentType.ApplicationData, fragment, len(fragment))
+			offset += len(fragment)
+			boosted = self._bytes_since_idle >= self._boost_after_bytes
+			self._bytes_since_idle += len(fragment)
+			if (not boosted) and (self._bytes_since_idle >= self._boost_after_bytes):
+				self._stats.count("record_size_boosts")
+		return self
+
+	def _emit_coalesced(self):
+		if len(self._coalesce) > 0:
+			# Hand over the buffer to the records, they reference it until the
+			# next flush.
+			(coalesced, self._coalesce) = (self._coalesce, bytearray())
+			self._add_app_records(coalesced)
+
+	@property
+	def in_flight(self):
+		return self._flight is not None
+
+	def begin_flight(self):
+		"""Starts collecting a flight of messages. Until flush() is called,
+		messages passed to add_message() are only queued. On flush(), they
+		are packed into as few records as possible and sent at once.
+		Application data coalesced so far is put into records first, so that
+		it goes out ahead of the flight."""
+		if self._flight is None:
+			self._emit_coalesced()
+			self._flight = [ ]
+		return self
+
+	def add_message(self, content_type, data):
+		"""Sends a single protocol message, or queues it when a flight is in
+		progress."""
+		if self._flight is not None:
+			self._flight.append((content_type, data))
+			return self
+		return self.add_records(content_type, data).send()
+
+	def _emit_flight(self):
+		if self._flight is not None:
+			(flight, self._flight) = (self._flight, None)
+			for (content_type, messages) in itertools.groupby(flight, key = lambda message: message[0]):
+				self.add_records(content_type, [ data for (msgtype, data) in messages ])
+			self._stats.count("tx_flights")
+
+	def write(self, data):
+		"""Writes application data. Large buffers are fragmented into records
+		and sent right away. Small writes are collected and only sent once a
+		full record has been accumulated or flush() is called. A flight that
+		is in progress is sent first, application data never overtakes the
+		handshake messages queued before it."""
+		if self._flight is not None:
+			self.flush()
+		self._check_idle()
+		view = self._byteview(data)
+		if len(view) < self._coalesce_threshold:
+			self._coalesce += view
+			if len(self._coalesce) < self.app_fragment_length:
+				return self
+			self._emit_coalesced()
+		else:
+			self._emit_coalesced()
+			self._add_app_records(view)
+		return self.send()
+
+	def send(self):
+		"""Sends all queued records, but keeps coalesced application data
+		that has not filled up a record yet."""
+		if len(self._iovecs) > 0:
+			(iovecs, self._iovecs) = (self._iovecs, [ ])
+			self._sendmsg_fnc(iovecs)
+		return self
+
+	def flush(self):
+		"""Sends everything, including a pending flight and coalesced
+		application data."""
+		self._check_idle()
+		self._emit_flight()
+		self._emit_coalesced()
+		return self.send()
+
+	def __str__(self):
+		return "RecordWriter<%d queued buffers, %d bytes pending>" % (len(self._iovecs), self.pending_bytes)
@@ -0,0 +1,101 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import logging
+from toyssl.log import ConnectionStats
+
+class ReserializeCheck(object):
+	"""Decides whether a freshly serialized packet is parsed again as a
+	sanity check before it is sent. The check is either always performed,
+	never performed or performed for every n-th packet only. A packet that
+	cannot be parsed or that does not serialize to identical bytes after
+	parsing counts as a mismatch; mismatches are logged and counted, but the
+	packet is still sent."""
+	MODES = ( "off", "always", "sampled" )
+
+	def __init__(self, mode = "always", sample_interval = 100):
+		self._log = logging.getLogger("toyssl")
+		self._stats = ConnectionStats()
+		self._mode = None
+		self._sample_interval = None
+		self._sample_counter = 0
+		self.configure(mode, sample_interval)
+
+	def configure(self, mode, sample_interval = None):
+		if mode not in self.MODES:
+			raise Exception("Unknown reserialization check mode '%s', must be one of %s." % (mode, ", ".join(self.MODES)))
+		if sample_interval is not None:
+			if sample_interval < 1:
+				raise Exception("Reserialization check sample interval must be at least 1, not %d." % (sample_interval))
+			self._sample_interval = sample_interval
+		self._mode = mode
+		self._sample_counter = 0
+		return self
+
+	@property
+	def mode(self):
+		return self._mode
+
+	@property
+	def sample_interval(self):
+		return self._sample_interval
+
+	@property
+	def stats(self):
+		return self._stats
+
+	def _should_check(self):
+		if self._mode == "always":
+			return True
+		elif self._mode == "sampled":
+			self._sample_counter += 1
+			if self._sample_counter >= self._sample_interval:
+				self._sample_counter = 0
+				return True
+		return False
+
+	def verify(self, pkt, msgbuf):
+		"""Checks the serialization 'msgbuf' of 'pkt' if the policy asks for
+		it. Returns True if the check was performed and succeeded."""
+		if not self._should_check():
+			self._stats.count("skipped")
+			return False
+
+		self._stats.count("checks")
+		msgbuf.markers.clear()
+		try:
+			reparsed = pkt.parse(msgbuf)
+			mismatch = (reparsed.serialize().data != msgbuf.data)
+			error = "different serialization after parsing"
+		except Exception as e:
+			mismatch = True
+			error = "%s: %s" % (e.__class__.__name__, str(e))
+		if mismatch:
+			self._stats.count("mismatches")
+			self._log.error("Reserialization check of %s failed, %s" % (str(pkt), error))
+		return not mismatch
+
+	def __str__(self):
+		if self._mode == "sampled":
+			return "ReserializeCheck<sampled 1 in %d>" % (self._sample_interval)
+		return "ReserializeCheck<%s>" % (self._mode)
+
+reserialize_check = ReserializeCheck()
@@ -0,0 +1,674 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import struct
+import collections
+from .MsgBuffer import MsgBuffer
+from .EnumTable import enum_table
+
+def _itemcount(fmt):
+	return len(struct.unpack(fmt, bytes(struct.calcsize(fmt))))
+
+def _label_of(name):
+	return "".join(part[:1].upper() + part[1:] for part in name.split("_"))
+
+def _bytes_of(data):
+	if isinstance(data, MsgBuffer):
+		return data.view
+	return data
+
+class _CodeGenerator(object):
+	"""Accumulates the source code of a single generated function. Constants
+	that the generated code refers to are passed in via its namespace."""
+	def __init__(self):
+		self._lines = [ ]
+		self._indent = 0
+		self._varcnt = 0
+		self._namespace = {
+			"_unpack_from":		struct.unpack_from,
+			"_pack":			struct.pack,
+			"_bytes_of":		_bytes_of,
+			"_MsgBuffer":		MsgBuffer,
+		}
+
+	def var(self, prefix = "v"):
+		self._varcnt += 1
+		return "%s%d" % (prefix, self._varcnt)
+
+	def const(self, value):
+		name = self.var("_c")
+		self._namespace[name] = value
+		return name
+
+	def line(self, text):
+		self._lines.append(("\t" * self._indent) + text)
+
+	def block(self, text):
+		self.line(text)
+		return self
+
+	def __enter__(self):
+		self._indent += 1
+		return self
+
+	def __exit__(self, *args):
+		self._indent -= 1
+
+	def raise_truncated(self, condition, what):
+		with self.block("if %s:" % (condition)):
+			self.line("raise Exception(%r)" % ("Truncated data while decoding %s." % (what)))
+
+	@property
+	def source(self):
+		return "\n".join(self._lines) + "\n"
+
+	def compile(self, funcname):
+		exec(self.source, self._namespace)
+		return self._namespace[funcname]
+
+class _Field(object):
+	"""Base of all schema fields. Fields that have a fixed size set
+	'fixed_format' to their struct format (without byte order) so that runs
+	of them can be decoded and encoded with a single struct call."""
+	fixed_format = None
+
+	def __init__(self, name, label = None):
+		self._name = name
+		self._label = label or _label_of(name)
+
+	@property
+	def name(self):
+		return self._name
+
+	@property
+	def label(self):
+		return self._label
+
+	@property
+	def fieldnames(self):
+		return [ self._name ]
+
+	def emit_parse_fast(self, gen, end):
+		(value, ) = _emit_fixed_unpack(gen, [ self ], end)
+		return value
+
+	def emit_serialize_fast(self, gen, expr):
+		_emit_fixed_pack(gen, [ (self, expr) ])
+
+	@staticmethod
+	def _emit_read_length(gen, lenlength, end, what):
+		length = gen.var("n")
+		gen.raise_truncated("pos + %d > %s" % (lenlength, end), what)
+		if lenlength == 1:
+			gen.line("%s = data[pos]" % (length))
+		elif lenlength == 2:
+			gen.line("%s = (data[pos] << 8) | data[pos + 1]" % (length))
+		else:
+			gen.line("%s = int.from_bytes(data[pos : pos + %d], \"big\")" % (length, lenlength))
+		gen.line("pos += %d" % (lenlength))
+		gen.raise_truncated("pos + %s > %s" % (length, end), what)
+		return length
+
+	@staticmethod
+	def _emit_get_opaque(gen, msg, lenlength, label):
+		gen.raise_truncated("%s.remaining < %d" % (msg, lenlength), label)
+		sub = gen.var("sub")
+		gen.line("%s = %s.get_opaque(%d, name = %r)" % (sub, msg, lenlength, label))
+		gen.raise_truncated("%s.remaining < 0" % (msg), label)
+		return sub
+
+class UInt(_Field):
+	_FORMATS = { 1: "B", 2: "H", 3: "BH", 4: "I" }
+
+	def __init__(self, name, length, label = None):
+		_Field.__init__(self, name, label)
+		assert(length in self._FORMATS)
+		self._length = length
+		self.fixed_format = self._FORMATS[length]
+
+	def fixed_convert(self, gen, rawvars):
+		if self._length == 3:
+			return "((%s << 16) | %s)" % tuple(rawvars)
+		return rawvars[0]
+
+	def fixed_pack_args(self, gen, expr):
+		if self._length == 3:
+			return [ "%s >> 16" % (expr), "%s & 0xffff" % (expr) ]
+		return [ expr ]
+
+	def emit_fixed_check(self, gen, expr):
+		pass
+
+	def _emit_comment(self, gen, value):
+		pass
+
+	def emit_parse_annotated(self, gen, msg):
+		value = gen.var()
+		gen.raise_truncated("%s.remaining < %d" % (msg, self._length), self.label)
+		with gen.block("with %s.new_marker(%r):" % (msg, self.label)):
+			gen.line("%s = %s.get_uint(%d)" % (value, msg, self._length))
+		return value
+
+	def emit_serialize_annotated(self, gen, msg, expr):
+		with gen.block("with %s.new_marker(%r) as marker:" % (msg, self.label)):
+			gen.line("%s.add_uint(%s, %d)" % (msg, expr, self._length))
+			self._emit_comment(gen, expr)
+
+class Enum(UInt):
+	"""Unsigned integer that is decoded into a member of 'enumtype' through
+	its EnumTable, i.e., unknown values do not abort parsing."""
+	def __init__(self, name, enumtype, length, label = None):
+		UInt.__init__(self, name, length, label)
+		self._enumtype = enumtype
+		self._table = enum_table(enumtype)
+
+	@property
+	def enumtype(self):
+		return self._enumtype
+
+	@property
+	def table(self):
+		return self._table
+
+	def fixed_convert(self, gen, rawvars):
+		return "%s(%s)" % (gen.const(self._table), UInt.fixed_convert(self, gen, rawvars))
+
+	def emit_parse_annotated(self, gen, msg):
+		value = gen.var()
+		gen.raise_truncated("%s.remaining < %d" % (msg, self._length), self.label)
+		with gen.block("with %s.new_marker(%r) as marker:" % (msg, self.label)):
+			gen.line("%s = %s(%s.get_uint(%d))" % (value, gen.const(self._table), msg, self._length))
+			self._emit_comment(gen, value)
+		return value
+
+	def _emit_comment(self, gen, value):
+		gen.line("marker.add_comment(%s(%s).name)" % (gen.const(self._table), value))
+
+class Fixed(_Field):
+	"""Raw bytes of a fixed length."""
+	def __init__(self, name, length, label = None):
+		_Field.__init__(self, name, label)
+		self._length = length
+		self.fixed_format = "%ds" % (length)
+
+	def fixed_convert(self, gen, rawvars):
+		return rawvars[0]
+
+	def fixed_pack_args(self, gen, expr):
+		return [ expr ]
+
+	def emit_fixed_check(self, gen, expr):
+		with gen.block("if len(%s) != %d:" % (expr, self._length)):
+			gen.line("raise Exception(%r %% (len(%s)))" % ("%s must be %d bytes long, not %%d bytes." % (self.label, self._length), expr))
+
+	def emit_parse_annotated(self, gen, msg):
+		value = gen.var()
+		gen.raise_truncated("%s.remaining < %d" % (msg, self._length), self.label)
+		with gen.block("with %s.new_marker(%r):" % (msg, self.label)):
+			gen.line("%s = bytes(%s.get_buffer(%d))" % (value, msg, self._length))
+		return value
+
+	def emit_serialize_annotated(self, gen, msg, expr):
+		self.emit_fixed_check(gen, expr)
+		with gen.block("with %s.new_marker(%r):" % (msg, self.label)):
+			gen.line("%s += %s" % (msg, expr))
+
+class Opaque(_Field):
+	"""Variable length byte string, preceded by a length field of
+	'lenlength' bytes. Decodes to bytes or, if 'msgbuf' is set, to a
+	MsgBuffer."""
+	def __init__(self, name, lenlength, label = None, msgbuf = False):
+		_Field.__init__(self, name, label)
+		self._lenlength = lenlength
+		self._msgbuf = msgbuf
+
+	def emit_parse_fast(self, gen, end):
+		length = self._emit_read_length(gen, self._lenlength, end, self.label)
+		value = gen.var()
+		gen.line("%s = %s(data[pos : pos + %s])" % (value, "_MsgBuffer" if self._msgbuf else "bytes", length))
+		gen.line("pos += %s" % (length))
+		return value
+
+	def emit_serialize_fast(self, gen, expr):
+		data = gen.var("t")
+		gen.line("%s = _bytes_of(%s)" % (data, expr))
+		gen.line("out += len(%s).to_bytes(%d, \"big\")" % (data, self._lenlength))
+		gen.line("out += %s" % (data))
+
+	def emit_parse_annotated(self, gen, msg):
+		sub = self._emit_get_opaque(gen, msg, self._lenlength, self.label)
+		if self._msgbuf:
+			return sub
+		value = gen.var()
+		gen.line("%s = %s.data" % (value, sub))
+		return value
+
+	def emit_serialize_annotated(self, gen, msg, expr):
+		with gen.block("with %s.new_marker(%r):" % (msg, self.label)):
+			gen.line("%s.add_opaque(%d, %s)" % (msg, self._lenlength, expr))
+
+class OpaqueUInt(_Field):
+	"""Unsigned big integer encoded as opaque byte string of minimal
+	length, e.g., DH parameters."""
+	def __init__(self, name, lenlength, label = None):
+		_Field.__init__(self, name, label)
+		self._lenlength = lenlength
+
+	def emit_parse_fast(self, gen, end):
+		length = self._emit_read_length(gen, self._lenlength, end, self.label)
+		value = gen.var()
+		gen.line("%s = int.from_bytes(data[pos : pos + %s], \"big\")" % (value, length))
+		gen.line("pos += %s" % (length))
+		return value
+
+	def _emit_encode(self, gen, expr):
+		value = gen.var("t")
+		data = gen.var("t")
+		gen.line("%s = %s" % (value, expr))
+		gen.line("%s = %s.to_bytes((%s.bit_length() + 7) // 8, \"big\")" % (data, value, value))
+		return data
+
+	def emit_serialize_fast(self, gen, expr):
+		data = self._emit_encode(gen, expr)
+		gen.line("out += len(%s).to_bytes(%d, \"big\")" % (data, self._lenlength))
+		gen.line("out += %s" % (data))
+
+	def emit_parse_annotated(self, gen, msg):
+		sub = self._emit_get_opaque(gen, msg, self._lenlength, self.label)
+		value = gen.var()
+		gen.line("%s = int.from_bytes(%s.data, \"big\")" % (value, sub))
+		return value
+
+	def emit_serialize_annotated(self, gen, msg, expr):
+		data = self._emit_encode(gen, expr)
+		with gen.block("with %s.new_marker(%r):" % (msg, self.label)):
+			gen.line("%s.add_opaque(%d, %s)" % (msg, self._lenlength, data))
+
+class Vector(_Field):
+	"""List of 'element' fields, preceded by a length field of 'lenlength'
+	bytes that counts the encoded size of all elements."""
+	_ARRAY_FORMATS = ( "B", "H", "I" )
+
+	def __init__(self, name, lenlength, element, label = None):
+		_Field.__init__(self, name, label)
+		self._lenlength = lenlength
+		self._element = element
+
+	@property
+	def _is_array(self):
+		return self._element.fixed_format in self._ARRAY_FORMATS
+
+	def emit_parse_fast(self, gen, end):
+		length = self._emit_read_length(gen, self._lenlength, end, self.label)
+		value = gen.var()
+		if self._is_array:
+			# Homogeneous integers are decoded with a single struct call
+			size = struct.calcsize(self._element.fixed_format)
+			if size > 1:
+				with gen.block("if %s %% %d != 0:" % (length, size)):
+					gen.line("raise Exception(%r %% (%s))" % ("%s: vector length %%d is not a multiple of the element size %d." % (self.label, size), length))
+			unpacked = "_unpack_from(\">%%d%s\" %% (%s // %d), data, pos)" % (self._element.fixed_format, length, size)
+			if isinstance(self._element, Enum):
+				gen.line("%s = %s.decode_all(%s)" % (value, gen.const(self._element.table), unpacked))
+			else:
+				gen.line("%s = list(%s)" % (value, unpacked))
+			gen.line("pos += %s" % (length))
+		else:
+			vend = gen.var("end")
+			gen.line("%s = pos + %s" % (vend, length))
+			gen.line("%s = [ ]" % (value))
+			with gen.block("while pos < %s:" % (vend)):
+				element = self._element.emit_parse_fast(gen, vend)
+				gen.line("%s.append(%s)" % (value, element))
+		return value
+
+	def emit_serialize_fast(self, gen, expr):
+		if self._is_array:
+			values = gen.var("t")
+			size = struct.calcsize(self._element.fixed_format)
+			gen.line("%s = %s" % (values, expr))
+			gen.line("out += (len(%s) * %d).to_bytes(%d, \"big\")" % (values, size, self._lenlength))
+			gen.line("out += _pack(\">%%d%s\" %% (len(%s)), *%s)" % (self._element.fixed_format, values, values))
+		else:
+			lenpos = gen.var("lenpos")
+			element = gen.var("e")
+			gen.line("%s = len(out)" % (lenpos))
+			gen.line("out += bytes(%d)" % (self._lenlength))
+			with gen.block("for %s in %s:" % (element, expr)):
+				self._element.emit_serialize_fast(gen, element)
+			gen.line("out[%s : %s + %d] = (len(out) - %s - %d).to_bytes(%d, \"big\")" % (lenpos, lenpos, self._lenlength, lenpos, self._lenlength, self._lenlength))
+
+	def emit_parse_annotated(self, gen, msg):
+		sub = self._emit_get_opaque(gen, msg, self._lenlength, self.label)
+		value = gen.var()
+		gen.line("%s = [ ]" % (value))
+		with gen.block("while %s.remaining > 0:" % (sub)):
+			element = self._element.emit_parse_annotated(gen, sub)
+			gen.line("%s.append(%s)" % (value, element))
+		return value
+
+	def emit_serialize_annotated(self, gen, msg, expr):
+		element = gen.var("e")
+		with gen.block("with %s.new_marker(%r):" % (msg, self.label)):
+			with gen.block("with %s.add_opaque_deferred(%d):" % (msg, self._lenlength)):
+				with gen.block("for %s in %s:" % (element, expr)):
+					self._element.emit_serialize_annotated(gen, msg, element)
+
+class Span(_Field):
+	"""Groups fields that are decoded into the enclosing structure and
+	additionally captures their raw encoding as bytes under 'name', e.g.,
+	for data that is signed. The raw value is ignored when encoding."""
+	def __init__(self, name, fields, label = None):
+		_Field.__init__(self, name, label)
+		self._fields = fields
+
+	@property
+	def fields(self):
+		return self._fields
+
+	@property
+	def fieldnames(self):
+		return _fieldnames_of(self._fields) + [ self.name ]
+
+	def emit_parse_fast_span(self, gen, end):
+		start = gen.var("start")
+		gen.line("%s = pos" % (start))
+		values = _emit_parse_fast_fields(gen, self._fields, end)
+		raw = gen.var()
+		gen.line("%s = bytes(data[%s : pos])" % (raw, start))
+		return values + [ raw ]
+
+	def emit_parse_annotated_span(self, gen, msg):
+		start = gen.var("start")
+		with gen.block("with %s.new_marker(%r):" % (msg, self.label)):
+			gen.line("%s = %s.pos" % (start, msg))
+			values = _emit_parse_annotated_fields(gen, self._fields, msg)
+		raw = gen.var()
+		gen.line("%s = bytes(%s.get_abs_buffer(%s, %s.pos))" % (raw, msg, start, msg))
+		return values + [ raw ]
+
+	def emit_serialize_annotated_span(self, gen, msg, struct_expr):
+		with gen.block("with %s.new_marker(%r):" % (msg, self.label)):
+			_emit_serialize_annotated_fields(gen, self._fields, msg, struct_expr)
+
+class Struct(_Field):
+	"""Sequence of fields that is decoded into a namedtuple."""
+	def __init__(self, name, fields, label = None):
+		_Field.__init__(self, name, label)
+		self._fields = fields
+		self._tuple = collections.namedtuple(self.label, _fieldnames_of(fields))
+
+	@property
+	def fields(self):
+		return self._fields
+
+	@property
+	def values_type(self):
+		return self._tuple
+
+	def new(self, **kwargs):
+		"""Creates a value of this structure. Raw span values are only
+		produced by decoding and default to None."""
+		for fieldname in self._tuple._fields:
+			kwargs.setdefault(fieldname, None)
+		return self._tuple(**kwargs)
+
+	def emit_parse_fast(self, gen, end):
+		values = _emit_parse_fast_fields(gen, self._fields, end)
+		value = gen.var()
+		gen.line("%s = %s(%s)" % (value, gen.const(self._tuple), ", ".join(values)))
+		return value
+
+	def emit_serialize_fast(self, gen, expr):
+		values = gen.var("t")
+		gen.line("%s = %s" % (values, expr))
+		_emit_serialize_fast_fields(gen, self._fields, values)
+
+	def emit_parse_annotated(self, gen, msg):
+		with gen.block("with %s.new_marker(%r):" % (msg, self.label)):
+			values = _emit_parse_annotated_fields(gen, self._fields, msg)
+		value = gen.var()
+		gen.line("%s = %s(%s)" % (value, gen.const(self._tuple), ", ".join(values)))
+		return value
+
+	def emit_serialize_annotated(self, gen, msg, expr):
+		values = gen.var("t")
+		gen.line("%s = %s" % (values, expr))
+		with gen.block("with %s.new_marker(%r):" % (msg, self.label)):
+			_emit_serialize_annotated_fields(gen, self._fields, msg, values)
+
+class Optional(_Field):
+	"""Trailing field that is only present if there is data left. Decodes
+	to None when absent and is omitted when encoding None."""
+	def __init__(self, field):
+		assert(not isinstance(field, Span))
+		_Field.__init__(self, field.name, field.label)
+		self._field = field
+
+	def emit_parse_fast(self, gen, end):
+		value = gen.var()
+		gen.line("%s = None" % (value))
+		with gen.block("if pos < %s:" % (end)):
+			gen.line("%s = %s" % (value, self._field.emit_parse_fast(gen, end)))
+		return value
+
+	def emit_serialize_fast(self, gen, expr):
+		with gen.block("if %s is not None:" % (expr)):
+			self._field.emit_serialize_fast(gen, expr)
+
+	def emit_parse_annotated(self, gen, msg):
+		value = gen.var()
+		gen.line("%s = None" % (value))
+		with gen.block("if %s.remaining > 0:" % (msg)):
+			gen.line("%s = %s" % (value, self._field.emit_parse_annotated(gen, msg)))
+		return value
+
+	def emit_serialize_annotated(self, gen, msg, expr):
+		with gen.block("if %s is not None:" % (expr)):
+			self._field.emit_serialize_annotated(gen, msg, expr)
+
+def _fieldnames_of(fields):
+	fieldnames = [ ]
+	for field in fields:
+		fieldnames += field.fieldnames
+	return fieldnames
+
+def _flatten_spans(fields):
+	for field in fields:
+		if isinstance(field, Span):
+			yield from _flatten_spans(field.fields)
+		else:
+			yield field
+
+def _emit_fixed_unpack(gen, fields, end):
+	fmt = ">" + "".join(field.fixed_format for field in fields)
+	size = struct.calcsize(fmt)
+	rawvars = [ gen.var("r") for i in range(_itemcount(fmt)) ]
+	gen.raise_truncated("pos + %d > %s" % (size, end), ", ".join(field.label for field in fields))
+	gen.line("(%s, ) = _unpack_from(%r, data, pos)" % (", ".join(rawvars), fmt))
+	gen.line("pos += %d" % (size))
+	values = [ ]
+	for field in fields:
+		itemcnt = _itemcount(">" + field.fixed_format)
+		(fieldvars, rawvars) = (rawvars[ : itemcnt], rawvars[itemcnt : ])
+		value = gen.var()
+		gen.line("%s = %s" % (value, field.fixed_convert(gen, fieldvars)))
+		values.append(value)
+	return values
+
+def _emit_fixed_pack(gen, fields_exprs):
+	fmt = ">" + "".join(field.fixed_format for (field, expr) in fields_exprs)
+	args = [ ]
+	for (field, expr) in fields_exprs:
+		field.emit_fixed_check(gen, expr)
+		args += field.fixed_pack_args(gen, expr)
+	gen.line("out += _pack(%r, %s)" % (fmt, ", ".join(args)))
+
+def _emit_parse_fast_fields(gen, fields, end):
+	"""Emits the fast decoder for a sequence of fields and returns the
+	variable names holding the values in the order of their fieldnames.
+	Consecutive fixed size fields share a single struct call."""
+	values = [ ]
+	fixed_run = [ ]
+	for field in fields:
+		if field.fixed_format is not None:
+			fixed_run.append(field)
+			continue
+		if len(fixed_run) > 0:
+			values += _emit_fixed_unpack(gen, fixed_run, end)
+			fixed_run = [ ]
+		if isinstance(field, Span):
+			values += field.emit_parse_fast_span(gen, end)
+		else:
+			values.append(field.emit_parse_fast(gen, end))
+	if len(fixed_run) > 0:
+		values += _emit_fixed_unpack(gen, fixed_run, end)
+	return values
+
+def _emit_serialize_fast_fields(gen, fields, struct_expr):
+	fixed_run = [ ]
+	for field in _flatten_spans(fields):
+		expr = "%s.%s" % (struct_expr, field.name)
+		if field.fixed_format is not None:
+			value = gen.var("t")
+			gen.line("%s = %s" % (value, expr))
+			fixed_run.append((field, value))
+			continue
+		if len(fixed_run) > 0:
+			_emit_fixed_pack(gen, fixed_run)
+			fixed_run = [ ]
+		field.emit_serialize_fast(gen, expr)
+	if len(fixed_run) > 0:
+		_emit_fixed_pack(gen, fixed_run)
+
+def _emit_parse_annotated_fields(gen, fields, msg):
+	values = [ ]
+	for field in fields:
+		if isinstance(field, Span):
+			values += field.emit_parse_annotated_span(gen, msg)
+		else:
+			values.append(field.emit_parse_annotated(gen, msg))
+	return values
+
+def _emit_serialize_annotated_fields(gen, fields, msg, struct_expr):
+	for field in fields:
+		if isinstance(field, Span):
+			field.emit_serialize_annotated_span(gen, msg, struct_expr)
+		else:
+			field.emit_serialize_annotated(gen, msg, "%s.%s" % (struct_expr, field.name))
+
+class HandshakeSchema(object):
+	"""Declarative description of the body of a handshake message. At
+	construction, four specialized functions are generated from the field
+	list: a fast decoder and encoder that work on plain buffers with struct
+	and annotated variants that operate on MsgBuffers and emit markers for
+	the connection log. Which pair is used is chosen by the 'annotate'
+	class attribute."""
+	annotate = True
+
+	def __init__(self, handshake_type, fields):
+		self._handshake_type = handshake_type
+		self._struct = Struct(handshake_type.name, fields)
+		self._parse_fast = self._gen_parse_fast()
+		self._parse_annotated = self._gen_parse_annotated()
+		self._serialize_fast = self._gen_serialize_fast()
+		self._serialize_annotated = self._gen_serialize_annotated()
+
+	@property
+	def handshake_type(self):
+		return self._handshake_type
+
+	def new(self, **kwargs):
+		return self._struct.new(**kwargs)
+
+	def _gen_parse_fast(self):
+		gen = _CodeGenerator()
+		with gen.block("def parse_fast(data):"):
+			gen.line("end = len(data)")
+			gen.raise_truncated("end < 4", "handshake header")
+			with gen.block("if data[0] != %d:" % (self._handshake_type)):
+				gen.line("raise Exception(\"Expected handshake message of type %d, but got type %%d.\" %% (data[0]))" % (self._handshake_type))
+			with gen.block("if int.from_bytes(data[1 : 4], \"big\") != end - 4:"):
+				gen.line("raise Exception(\"Handshake message length %d does not match %d bytes of payload.\" % (int.from_bytes(data[1 : 4], \"big\"), end - 4))")
+			gen.line("pos = 4")
+			values = _emit_parse_fast_fields(gen, self._struct.fields, "end")
+			with gen.block("if pos != end:"):
+				gen.line("raise Exception(\"Trailing %d bytes of garbage data after decoding of packet.\" % (end - pos))")
+			gen.line("return %s(%s)" % (gen.const(self._struct.values_type), ", ".join(values)))
+		return gen.compile("parse_fast")
+
+	def _gen_parse_annotated(self):
+		gen = _CodeGenerator()
+		with gen.block("def parse_annotated(msg):"):
+			gen.line("msg.seek(0)")
+			gen.raise_truncated("msg.remaining < 4", "handshake header")
+			with gen.block("with msg.new_marker(\"HandshakeType\") as marker:"):
+				with gen.block("if msg.get_uint8() != %d:" % (self._handshake_type)):
+					gen.line("raise Exception(\"Expected handshake message of type %d.\")" % (self._handshake_type))
+				gen.line("marker.add_comment(%r)" % (self._handshake_type.name))
+			gen.line("payload = msg.get_opaque(3, name = \"Payload\")")
+			with gen.block("if msg.remaining != 0:"):
+				gen.line("raise Exception(\"Handshake message length does not match %d bytes of payload.\" % (len(msg) - 4))")
+			values = _emit_parse_annotated_fields(gen, self._struct.fields, "payload")
+			with gen.block("if payload.remaining != 0:"):
+				gen.line("raise Exception(\"Trailing %d bytes of garbage data after decoding of packet.\" % (payload.remaining))")
+			gen.line("return %s(%s)" % (gen.const(self._struct.values_type), ", ".join(values)))
+		return gen.compile("parse_annotated")
+
+	def _gen_serialize_fast(self):
+		gen = _CodeGenerator()
+		with gen.block("def serialize_fast(values):"):
+			gen.line("out = bytearray(%r)" % (bytes([ self._handshake_type, 0, 0, 0 ])))
+			_emit_serialize_fast_fields(gen, self._struct.fields, "values")
+			gen.line("out[1 : 4] = (len(out) - 4).to_bytes(3, \"big\")")
+			gen.line("return _MsgBuffer.wrap(out)")
+		return gen.compile("serialize_fast")
+
+	def _gen_serialize_annotated(self):
+		gen = _CodeGenerator()
+		with gen.block("def serialize_annotated(values):"):
+			gen.line("msg = _MsgBuffer()")
+			with gen.block("with msg.new_marker(\"HandshakeType\") as marker:"):
+				gen.line("msg.add_uint8(%d)" % (self._handshake_type))
+				gen.line("marker.add_comment(%r)" % (self._handshake_type.name))
+			with gen.block("with msg.add_opaque_deferred(3):"):
+				_emit_serialize_annotated_fields(gen, self._struct.fields, "msg", "values")
+			gen.line("return msg")
+		return gen.compile("serialize_annotated")
+
+	def parse(self, msg):
+		"""Decodes a complete handshake message including its header from a
+		MsgBuffer into a namedtuple."""
+		if self.annotate:
+			return self._parse_annotated(msg)
+		return self._parse_fast(msg.view)
+
+	def parse_fast(self, data):
+		"""Decodes from any buffer without creating markers."""
+		return self._parse_fast(data)
+
+	def serialize(self, values):
+		if self.annotate:
+			return self._serialize_annotated(values)
+		return self._serialize_fast(values)
+
+	def __str__(self):
+		return "HandshakeSchema<%s: %s>" % (self._handshake_type.name, ", ".join(self._struct.values_type._fields))
@@ -21,3 +21,4 @@
 
 from .Protocol import Protocol
 from .CipherSuiteDirectory import CipherSuiteDirectory
+from .CipherSuiteNegotiator import CipherSuiteNegotiator
@@ -19,14 +19,15 @@
 #
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
+from ..ReserializeCheck import reserialize_check
+
 class ChangeCipherSpecBasePkt(object):
 	def serialize(self):
 		raise Exception(NotImplemented)
 	
 	def reserialize(self):
 		msgbuf = self.serialize()
-		msgbuf.markers.clear()
-		pkt = self.parse(msgbuf)
+		reserialize_check.verify(self, msgbuf)
 		return msgbuf
 
 	@staticmethod
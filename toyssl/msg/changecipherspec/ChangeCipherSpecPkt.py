@@ -33,7 +33,6 @@ class ChangeCipherSpecPkt(ChangeCipherSpecBasePkt):
 		with msg.new_marker("ChangeCipherSpecType") as marker:
 			msg.add_uint8(int(self.packet_type()))
 			marker.add_comment(ChangeCipherSpecPkt.packet_type().name)
-		msg.add_opaque(3, b"")
 		return msg
 
 	@staticmethod
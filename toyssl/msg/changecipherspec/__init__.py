@@ -19,8 +19,10 @@
 #
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
+from .ChangeCipherSpecBasePkt import ChangeCipherSpecBasePkt
 from .ChangeCipherSpecPkt import ChangeCipherSpecPkt
 from ..Enums import ChangeCipherSpecType
+from ..EnumTable import enum_table
 
 _KNOWN_HANDSHAKE_PACKETS = {
 	ChangeCipherSpecType.ChangeCipherSpec: ChangeCipherSpecPkt,
@@ -28,6 +30,8 @@ _KNOWN_HANDSHAKE_PACKETS = {
 
 def parse_changecipherspec_pkt(msgbuf):
 	msgbuf.seek(0)
-	packet_type = ChangeCipherSpecType(msgbuf.get_uint8())
-	handler = _KNOWN_HANDSHAKE_PACKETS[packet_type]
+	packet_type = enum_table(ChangeCipherSpecType)(msgbuf.get_uint8())
+	handler = _KNOWN_HANDSHAKE_PACKETS.get(packet_type)
+	if handler is None:
+		raise Exception("Do not know how to parse ChangeCipherSpec message of type %s." % (packet_type))
 	return handler.parse(msgbuf)
@@ -22,56 +22,119 @@
 from ..MsgBuffer import MsgBuffer
 from ..Enums import HandshakeType
 from .HandshakePkt import HandshakePkt
+from ..Schema import HandshakeSchema, Opaque, Vector
+
+_SCHEMA = HandshakeSchema(HandshakeType.Certificate, [
+	Vector("certificate_list", 3, Opaque("certificate", 3)),
+])
 
 class CertificatePkt(HandshakePkt):
+	"""A received CertificatePkt does not copy the certificate chain: parse()
+	only records the offsets of the entries within the received message,
+	get_cert() returns zero-copy views and get_x509() decodes only the
+	certificates that are actually accessed."""
 	def __init__(self):
 		self._certs = [ ]
+		self._encoded = None
+		self._data = None
+		self._offsets = None
+		self._x509 = { }
 
 	@staticmethod
 	def packet_type():
 		return HandshakeType.Certificate
 
+	@property
+	def preencoded(self):
+		return self._encoded is not None
+
+	def _materialize(self):
+		if self._data is not None:
+			self._certs = [ bytes(self.get_cert(index)) for index in range(self.cert_count) ]
+			self._data = None
+			self._offsets = None
+
 	def add_cert(self, derdata):
 		assert(isinstance(derdata, bytes))
+		if self.preencoded:
+			raise Exception("Cannot add certificates to a pre-encoded CertificatePkt.")
+		self._materialize()
 		self._certs.append(derdata)
 
+	def preencode(self):
+		"""Encodes the certificate chain once. Afterwards, serialize() always
+		returns the same MsgBuffer, so the packet can be sent on any number of
+		connections without being encoded again. The returned buffer is
+		shared and must not be modified."""
+		self._encoded = self.reserialize()
+		return self
+
 	def get_cert(self, index):
-		return self._certs[index]
+		"""Returns the DER data of a certificate. For parsed packets, this is
+		a memoryview into the received message."""
+		if self._data is None:
+			return self._certs[index]
+		(start, end) = self._offsets[2 * index : 2 * index + 2]
+		return self._data[start : end]
 
-	def serialize(self):
-		msg = MsgBuffer()
-		with msg.new_marker("HandshakeType") as marker:
-			msg.add_uint8(int(self.packet_type()))
-			marker.add_comment(CertificatePkt.packet_type().name)
+	def get_x509(self, index):
+		"""Returns the decoded X509Certificate of a chain entry. Only the
+		accessed entries are decoded, through the process-wide certificate
+		cache."""
+		from toyssl.x509 import certificate_cache
+		certificate = self._x509.get(index)
+		if certificate is None:
+			certificate = certificate_cache.get(self.get_cert(index))
+			self._x509[index] = certificate
+		return certificate
 
-		with msg.add_opaque_deferred(3):
-			with msg.add_opaque_deferred(3):
-				for cert in self._certs:
-					msg.add_opaque(3, cert)
+	def serialize(self):
+		if self._encoded is not None:
+			return self._encoded
+		certs = self._certs if (self._data is None) else [ self.get_cert(index) for index in range(self.cert_count) ]
+		return _SCHEMA.serialize(_SCHEMA.new(certificate_list = certs))
 
-		return msg
+	@staticmethod
+	def _index(data):
+		"""Validates the message and returns the flat list of start and end
+		offsets of all certificates."""
+		end = len(data)
+		if (end < 7) or (data[0] != HandshakeType.Certificate):
+			raise Exception("Not a Certificate message.")
+		if int.from_bytes(data[1 : 4], "big") != end - 4:
+			raise Exception("Certificate message length field does not match %d bytes of payload." % (end - 4))
+		if int.from_bytes(data[4 : 7], "big") != end - 7:
+			raise Exception("Certificate list length does not match %d bytes of payload." % (end - 7))
+		offsets = [ ]
+		pos = 7
+		while pos < end:
+			if pos + 3 > end:
+				raise Exception("Truncated Certificate message while reading certificate length.")
+			length = int.from_bytes(data[pos : pos + 3], "big")
+			pos += 3
+			if pos + length > end:
+				raise Exception("Truncated Certificate message, certificate announces %d bytes but only %d are present." % (length, end - pos))
+			offsets += [ pos, pos + length ]
+			pos += length
+		return offsets
 
 	@staticmethod
 	def parse(msg):
 		assert(isinstance(msg, MsgBuffer))
-		
-		msg.seek(0)
-		with msg.new_marker("HandshakeType") as marker:
-			assert(msg.get_uint8() == int(CertificatePkt.packet_type()))
-			marker.add_comment(CertificatePkt.packet_type().name)
-		msg = msg.get_opaque(3, name = "Payload")
-
+		if _SCHEMA.annotate:
+			# Only for the markers of the connection log
+			_SCHEMA.parse(msg)
 		pkt = CertificatePkt()
-
-		certificates = msg.get_opaque(3, name = "CertificateList")
-		certcnt = 0
-		while certificates.remaining > 0:
-			certificate = certificates.get_opaque(3, name = "Certificate%d" % (certcnt))
-			pkt.add_cert(certificate.data)
-			certcnt += 1
-
+		pkt._data = msg.view
+		pkt._offsets = CertificatePkt._index(pkt._data)
+		pkt._certs = None
 		return pkt
 
-	def __str__(self):
-		return "CertificatePkt<%d certs>" % (len(self._certs))
+	@property
+	def cert_count(self):
+		if self._data is None:
+			return len(self._certs)
+		return len(self._offsets) // 2
 
+	def __str__(self):
+		return "CertificatePkt<%d certs>" % (self.cert_count)
@@ -0,0 +1,209 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import struct
+import collections
+
+from ..Enums import ContentType, HandshakeType, ExtensionType
+
+_RECORD_HEADER = struct.Struct(">BHH")
+_UINT16 = struct.Struct(">H")
+
+ClientHelloPeekResult = collections.namedtuple("ClientHelloPeekResult", [ "record_version", "client_version", "versions", "servername", "alpn_protocols", "cipher_suite_ids", "length" ])
+
+class ClientHelloPeekException(Exception): pass
+
+def _message_length(header):
+	"""Returns the length of the handshake message (header included) whose
+	4 byte header is given, which must be a ClientHello."""
+	if header[0] != HandshakeType.ClientHello:
+		raise ClientHelloPeekException("First handshake message has type %d, not a ClientHello." % (header[0]))
+	return 4 + ((header[1] << 16) | (header[2] << 8) | header[3])
+
+def _handshake_message(data):
+	"""Returns the ClientHello handshake message (header included) contained
+	in the leading handshake records of data and the number of bytes of data
+	that the message occupies on the wire. Returns None if data is not
+	complete yet."""
+	if len(data) < 5:
+		return None
+	(content_type, record_version, record_length) = _RECORD_HEADER.unpack_from(data, 0)
+	if content_type != ContentType.Handshake:
+		raise ClientHelloPeekException("First record has content type %d, not a TLS handshake." % (content_type))
+	if (record_version >> 8) != 3:
+		raise ClientHelloPeekException("First record has unsupported version 0x%x." % (record_version))
+	if record_length == 0:
+		raise ClientHelloPeekException("Empty handshake record.")
+	if record_length >= 4:
+		if len(data) < 5 + 4:
+			return None
+		message_length = _message_length(data[5 : 9])
+		if message_length <= record_length:
+			# Common case: the ClientHello fits a single record
+			if len(data) < 5 + message_length:
+				return None
+			return (record_version, data[5 : 5 + message_length], 5 + message_length)
+
+	# ClientHello is fragmented across several handshake records; the
+	# handshake header itself may be split as well
+	fragments = [ ]
+	collected = 0
+	message_length = None
+	pos = 0
+	while (message_length is None) or (collected < message_length):
+		if len(data) < pos + 5:
+			return None
+		(content_type, fragment_version, record_length) = _RECORD_HEADER.unpack_from(data, pos)
+		if content_type != ContentType.Handshake:
+			raise ClientHelloPeekException("ClientHello interrupted by record with content type %d." % (content_type))
+		if record_length == 0:
+			raise ClientHelloPeekException("Empty handshake record.")
+		pos += 5
+		if message_length is None:
+			take = record_length
+		else:
+			take = min(record_length, message_length - collected)
+		if len(data) < pos + take:
+			return None
+		fragments.append(data[pos : pos + take])
+		collected += take
+		pos += take
+		if (message_length is None) and (collected >= 4):
+			message = b"".join(fragments)
+			message_length = _message_length(message[:4])
+			fragments = [ message[:message_length] ]
+			if collected > message_length:
+				# Record carries more than the ClientHello
+				pos -= collected - message_length
+				collected = message_length
+	return (record_version, b"".join(fragments), pos)
+
+def _parse_servername(data, pos, end):
+	(list_length, ) = _UINT16.unpack_from(data, pos)
+	pos += 2
+	if pos + list_length != end:
+		raise ClientHelloPeekException("Malformed server_name extension.")
+	while pos < end:
+		if pos + 3 > end:
+			raise ClientHelloPeekException("Truncated server_name extension.")
+		name_type = data[pos]
+		(name_length, ) = _UINT16.unpack_from(data, pos + 1)
+		pos += 3
+		if pos + name_length > end:
+			raise ClientHelloPeekException("Truncated server_name extension.")
+		if name_type == 0:
+			# host_name, RFC6066 Sect. 3
+			try:
+				return bytes(data[pos : pos + name_length]).decode("ascii").lower()
+			except UnicodeDecodeError:
+				# Host names are ASCII (RFC6066 Sect. 3); treat the SNI as unknown
+				return None
+		pos += name_length
+	return None
+
+def _parse_alpn(data, pos, end):
+	(list_length, ) = _UINT16.unpack_from(data, pos)
+	pos += 2
+	if pos + list_length != end:
+		raise ClientHelloPeekException("Malformed application_layer_protocol_negotiation extension.")
+	protocols = [ ]
+	while pos < end:
+		protocol_length = data[pos]
+		pos += 1
+		if pos + protocol_length > end:
+			raise ClientHelloPeekException("Truncated application_layer_protocol_negotiation extension.")
+		protocols.append(bytes(data[pos : pos + protocol_length]))
+		pos += protocol_length
+	return protocols
+
+def _parse_supported_versions(data, pos, end):
+	list_length = data[pos]
+	pos += 1
+	if (pos + list_length != end) or (list_length % 2) != 0:
+		raise ClientHelloPeekException("Malformed supported_versions extension.")
+	return list(struct.unpack_from(">%dH" % (list_length // 2), data, pos))
+
+def peek_client_hello(data):
+	"""Extracts the routing relevant information from the first bytes a TLS
+	client sends without building any MsgBuffer or packet objects: the
+	server name (SNI), the ALPN protocols, the offered versions and the
+	cipher suite IDs. data is the raw byte stream starting at the first
+	record. Returns None if more data is needed and raises
+	ClientHelloPeekException if the data is not a well-formed ClientHello.
+	The result's length is the number of bytes the ClientHello occupies on
+	the wire, i.e., what a proxy needs to have buffered and forward."""
+	message = _handshake_message(data)
+	if message is None:
+		return None
+	(record_version, message, wire_length) = message
+	end = len(message)
+	if end < 4 + 2 + 32 + 1:
+		raise ClientHelloPeekException("Truncated ClientHello.")
+
+	(client_version, ) = _UINT16.unpack_from(message, 4)
+	pos = 4 + 2 + 32
+	pos += 1 + message[pos]
+	if pos + 2 > end:
+		raise ClientHelloPeekException("Truncated ClientHello in session ID.")
+	(suites_length, ) = _UINT16.unpack_from(message, pos)
+	pos += 2
+	if (pos + suites_length > end) or ((suites_length % 2) != 0):
+		raise ClientHelloPeekException("Malformed cipher suite vector.")
+	cipher_suite_ids = struct.unpack_from(">%dH" % (suites_length // 2), message, pos)
+	pos += suites_length
+	if pos + 1 > end:
+		raise ClientHelloPeekException("Truncated ClientHello in compression methods.")
+	pos += 1 + message[pos]
+
+	servername = None
+	alpn_protocols = None
+	versions = None
+	if pos < end:
+		if pos + 2 > end:
+			raise ClientHelloPeekException("Truncated ClientHello in extensions.")
+		(extensions_length, ) = _UINT16.unpack_from(message, pos)
+		pos += 2
+		if pos + extensions_length != end:
+			raise ClientHelloPeekException("Extension block length does not match ClientHello length.")
+		while pos < end:
+			if pos + 4 > end:
+				raise ClientHelloPeekException("Truncated extension header.")
+			(exttype, extlength) = struct.unpack_from(">HH", message, pos)
+			pos += 4
+			extend = pos + extlength
+			if extend > end:
+				raise ClientHelloPeekException("Truncated extension %d." % (exttype))
+			try:
+				if exttype == ExtensionType.server_name:
+					servername = _parse_servername(message, pos, extend)
+				elif exttype == ExtensionType.application_layer_protocol_negotiation:
+					alpn_protocols = _parse_alpn(message, pos, extend)
+				elif exttype == ExtensionType.supported_versions:
+					versions = _parse_supported_versions(message, pos, extend)
+			except (struct.error, IndexError, UnicodeDecodeError):
+				raise ClientHelloPeekException("Malformed extension %d." % (exttype))
+			pos = extend
+	elif pos > end:
+		raise ClientHelloPeekException("Truncated ClientHello in compression methods.")
+
+	if versions is None:
+		versions = [ client_version ]
+	return ClientHelloPeekResult(record_version = record_version, client_version = client_version, versions = versions, servername = servername, alpn_protocols = alpn_protocols or [ ], cipher_suite_ids = cipher_suite_ids, length = wire_length)
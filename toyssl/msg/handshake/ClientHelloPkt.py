@@ -20,15 +20,27 @@
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
 import time
-import datetime
 
 from ..Enums import SSLVersion, CipherSuite, CompressionMethod, ExtensionType, HandshakeType
 from ..MsgBuffer import MsgBuffer
+from ..EnumTable import is_enum_value
 from toyssl.crypto.Random import secure_rand
 from .HandshakePkt import HandshakePkt
-from .HelloExtension import BaseHelloExtension
+from .HelloExtension import BaseHelloExtension, EXTENSION_SCHEMA
 from toyssl.hexdump import hex2printstr
-from .HandshakePkt import HandshakePkt
+from ..Schema import HandshakeSchema, Enum, UInt, Fixed, Opaque, Vector, Span, Optional
+
+_SCHEMA = HandshakeSchema(HandshakeType.ClientHello, [
+	Enum("proto_version", SSLVersion, 2, label = "ProtocolVersion"),
+	Span("random", [
+		UInt("random_time", 4, label = "Time"),
+		Fixed("random_data", 28, label = "Other"),
+	]),
+	Opaque("session_id", 1, label = "Session"),
+	Vector("cipher_suites", 2, Enum("cipher_suite", CipherSuite, 2)),
+	Vector("compression_methods", 1, Enum("compression_method", CompressionMethod, 1)),
+	Optional(Vector("extensions", 2, EXTENSION_SCHEMA)),
+])
 
 class ClientHelloPkt(HandshakePkt):
 	def __init__(self, proto_version):
@@ -39,7 +51,7 @@ class ClientHelloPkt(HandshakePkt):
 		self._ciphersuites = [ ]
 		self._compression_methods = [ ]
 		self._extensions = [ ]
-		assert(isinstance(self._proto_version, SSLVersion))
+		assert(is_enum_value(self._proto_version, SSLVersion))
 
 	@staticmethod
 	def packet_type():
@@ -52,13 +64,17 @@ class ClientHelloPkt(HandshakePkt):
 		msg += self._random_data
 		return msg
 
+	@property
+	def cipher_suites(self):
+		return self._ciphersuites
+
 	def add_cipher_suite(self, ciphersuite):
-		assert(isinstance(ciphersuite, CipherSuite))
+		assert(is_enum_value(ciphersuite, CipherSuite))
 		self._ciphersuites.append(ciphersuite)
 		return self
 
 	def add_compression_method(self, compression_method):
-		assert(isinstance(compression_method, CompressionMethod))
+		assert(is_enum_value(compression_method, CompressionMethod))
 		self._compression_methods.append(compression_method)
 		return self
 
@@ -67,91 +83,39 @@ class ClientHelloPkt(HandshakePkt):
 		self._extensions.append(extension)
 		return self
 
+	def get_extension(self, exttype):
+		for extension in self._extensions:
+			if extension.extensiontype == exttype:
+				return extension
+		return None
+
 	def serialize(self):
 		assert(len(self._ciphersuites) > 0)
 		assert(len(self._compression_methods) > 0)
-		msg = MsgBuffer()
-		with msg.new_marker("HandshakeType") as marker:
-			msg.add_uint8(int(self.packet_type()))
-			marker.add_comment(ClientHelloPkt.packet_type().name)
-		with msg.add_opaque_deferred(3):
-			with msg.new_marker("ProtocolVersion"):
-				msg.add_uint16(int(self._proto_version))
-
-			with msg.new_marker("Random"):
-				msg.add_uint32(self._random_time)
-				msg += self._random_data
-			with msg.new_marker("Session"):
-				msg.add_opaque(1, self._sessionid)
-			
-			with msg.new_marker("CipherSuites"):
-				msg.add_uint16(len(self._ciphersuites) * 2)
-				for ciphersuite in self._ciphersuites:
-					with msg.new_marker("CipherSuite") as marker:
-						msg.add_uint16(int(ciphersuite))
-						marker.add_comment(ciphersuite.name)
-			msg.add_uint8(len(self._compression_methods))
-			for compression_method in self._compression_methods:
-				msg.add_uint8(int(compression_method))
-			if len(self._extensions) > 0:
-				with msg.add_opaque_deferred(2):
-					for extension in self._extensions:
-						(exttype, extdata) = extension.serialize()
-						msg.add_uint16(int(exttype))
-						msg.add_opaque(2, extdata)
-		return msg
+		extensions = [ EXTENSION_SCHEMA.new(type = exttype, data = extdata) for (exttype, extdata) in (extension.serialize() for extension in self._extensions) ]
+		return _SCHEMA.serialize(_SCHEMA.new(
+			proto_version = self._proto_version,
+			random_time = self._random_time,
+			random_data = self._random_data,
+			session_id = self._sessionid,
+			cipher_suites = self._ciphersuites,
+			compression_methods = self._compression_methods,
+			extensions = extensions if (len(extensions) > 0) else None,
+		))
 
 	@staticmethod
 	def parse(msg):
 		assert(isinstance(msg, MsgBuffer))
-		msg.seek(0)
-		with msg.new_marker("HandshakeType") as marker:
-			assert(msg.get_uint8() == int(ClientHelloPkt.packet_type()))
-			marker.add_comment(ClientHelloPkt.packet_type().name)
-
-		msg = msg.get_opaque(3, name = "Payload")
-
-		with msg.new_marker("ProtocolVersion"):
-			proto_version = SSLVersion(msg.get_uint16())
-		pkt = ClientHelloPkt(proto_version)
-		with msg.new_marker("Random"):
-			with msg.new_marker("Time") as marker:
-				pkt._random_time = msg.get_uint32()
-				marker.add_comment(datetime.datetime.utcfromtimestamp(pkt._random_time).strftime("%Y-%m-%d %H:%M:%S"))
-			with msg.new_marker("Other"):
-				pkt._random_data = msg.get_buffer(28)
-		pkt._sessionid = msg.get_opaque(1, name = "Session")
-		with msg.new_marker("CipherSuites"):
-			ciphersuite_data = msg.get_opaque(2)
-			while ciphersuite_data.remaining > 0:
-				with ciphersuite_data.new_marker("CipherSuite") as marker:
-					csid = ciphersuite_data.get_uint16()
-					csuite = CipherSuite(csid)
-					pkt.add_cipher_suite(csuite)
-					marker.add_comment(csuite.name)
-		comp_methods = msg.get_opaque(1, "CompressionMethods")
-		while comp_methods.remaining > 0:
-			with comp_methods.new_marker("CompressionMethod") as marker:
-				comp_method = comp_methods.get_uint8()
-				method = CompressionMethod(comp_method)
-				marker.add_comment(method.name)
-				pkt.add_compression_method(method)
-
-
-		with msg.new_marker("Extensions"):
-			# Extension decoding
-			ext_count = 0
-			extensions = msg.get_opaque(2)
-			while extensions.remaining > 0:
-				extname = "Extension%d" % (ext_count)
-				with extensions.new_marker(extname):
-					with extensions.new_marker("Type") as marker:
-						extension_type = ExtensionType(extensions.get_uint16())
-						marker.add_comment(extension_type.name)
-					extension_data = extensions.get_opaque(2)
-				extension = BaseHelloExtension.parse(extension_type, extension_data)
-				pkt.add_extension(extension)
-				ext_count += 1
+		values = _SCHEMA.parse(msg)
+		pkt = ClientHelloPkt(values.proto_version)
+		pkt._random_time = values.random_time
+		pkt._random_data = values.random_data
+		pkt._sessionid = values.session_id
+		pkt._ciphersuites = values.cipher_suites
+		pkt._compression_methods = values.compression_methods
+		if values.extensions is not None:
+			for extension in values.extensions:
+				pkt.add_extension(BaseHelloExtension.parse(extension.type, extension.data))
 		return pkt
 
 	def __str__(self):
@@ -0,0 +1,180 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import struct
+import collections
+
+from ..Enums import SSLVersion, CipherSuite, CompressionMethod, ExtensionType, HandshakeType
+from ..MsgBuffer import MsgBuffer
+from ..EnumTable import enum_table
+from .ClientHelloPkt import ClientHelloPkt
+from .HelloExtension import BaseHelloExtension
+
+_EXTENSION_HEADER = struct.Struct(">HH")
+_ExtensionIndex = collections.namedtuple("ExtensionIndex", [ "exttype", "offset", "length" ])
+
+class ClientHelloView(object):
+	"""Read-only view of an encoded ClientHello message. On construction, a
+	single pass over the data validates the structure and records the
+	offsets of all fields and extensions; fields are only decoded when they
+	are accessed. This makes routing and early rejection decisions cheap,
+	which typically need the version, the cipher suites or one extension
+	only. The data must not be modified while the view is in use."""
+	def __init__(self, data):
+		if isinstance(data, MsgBuffer):
+			data = data.view
+		self._data = memoryview(data)
+		self._session_id = None
+		self._cipher_suites = None
+		self._compression_methods = None
+		self._extensions = None
+		self._decoded_extensions = { }
+		self._index()
+
+	def _opaque(self, pos, lenlength, end, name):
+		if pos + lenlength > end:
+			raise Exception("Truncated ClientHello while reading length of %s." % (name))
+		length = int.from_bytes(self._data[pos : pos + lenlength], "big")
+		pos += lenlength
+		if pos + length > end:
+			raise Exception("Truncated ClientHello, %s announces %d bytes but only %d are present." % (name, length, end - pos))
+		return (pos, length)
+
+	def _index(self):
+		data = self._data
+		end = len(data)
+		if (end < 4 + 2 + 32) or (data[0] != HandshakeType.ClientHello):
+			raise Exception("Not a ClientHello message.")
+		if int.from_bytes(data[1 : 4], "big") != end - 4:
+			raise Exception("ClientHello length field does not match %d bytes of payload." % (end - 4))
+
+		(self._session_offset, self._session_length) = self._opaque(4 + 2 + 32, 1, end, "session ID")
+		(self._suites_offset, self._suites_length) = self._opaque(self._session_offset + self._session_length, 2, end, "cipher suites")
+		if (self._suites_length % 2) != 0:
+			raise Exception("Cipher suite vector has odd length %d." % (self._suites_length))
+		(self._compression_offset, self._compression_length) = self._opaque(self._suites_offset + self._suites_length, 1, end, "compression methods")
+		pos = self._compression_offset + self._compression_length
+
+		self._extension_index = [ ]
+		if pos < end:
+			(pos, extensions_length) = self._opaque(pos, 2, end, "extensions")
+			extensions_end = pos + extensions_length
+			while pos < extensions_end:
+				if pos + 4 > extensions_end:
+					raise Exception("Truncated ClientHello while reading extension header.")
+				(exttype, length) = _EXTENSION_HEADER.unpack_from(data, pos)
+				pos += 4
+				if pos + length > extensions_end:
+					raise Exception("Truncated ClientHello, extension %d announces %d bytes but only %d are present." % (exttype, length, extensions_end - pos))
+				self._extension_index.append(_ExtensionIndex(exttype, pos, length))
+				pos += length
+		if pos != end:
+			raise Exception("Trailing %d bytes of garbage data after ClientHello." % (end - pos))
+
+	@property
+	def proto_version(self):
+		return enum_table(SSLVersion)((self._data[4] << 8) | self._data[5])
+
+	@property
+	def random(self):
+		return bytes(self._data[6 : 38])
+
+	@property
+	def session_id(self):
+		if self._session_id is not None:
+			return self._session_id
+		self._session_id = bytes(self._data[self._session_offset : self._session_offset + self._session_length])
+		return self._session_id
+
+	@property
+	def cipher_suite_count(self):
+		return self._suites_length // 2
+
+	@property
+	def cipher_suite_ids(self):
+		"""Offered cipher suites as plain integers."""
+		return struct.unpack_from(">%dH" % (self.cipher_suite_count), self._data, self._suites_offset)
+
+	@property
+	def cipher_suites(self):
+		if self._cipher_suites is not None:
+			return self._cipher_suites
+		self._cipher_suites = enum_table(CipherSuite).decode_all(self.cipher_suite_ids)
+		return self._cipher_suites
+
+	def offers_cipher_suite(self, cipher_suite):
+		return int(cipher_suite) in self.cipher_suite_ids
+
+	@property
+	def compression_methods(self):
+		if self._compression_methods is not None:
+			return self._compression_methods
+		self._compression_methods = enum_table(CompressionMethod).decode_all(self._data[self._compression_offset : self._compression_offset + self._compression_length])
+		return self._compression_methods
+
+	@property
+	def extension_ids(self):
+		return enum_table(ExtensionType).decode_all([ extension.exttype for extension in self._extension_index ])
+
+	def _find_extension(self, exttype):
+		exttype = int(exttype)
+		for extension in self._extension_index:
+			if extension.exttype == exttype:
+				return extension
+		return None
+
+	def has_extension(self, exttype):
+		return self._find_extension(exttype) is not None
+
+	def get_extension_data(self, exttype):
+		"""Returns the undecoded extension payload as a memoryview or None if
+		the extension is not present."""
+		extension = self._find_extension(exttype)
+		if extension is None:
+			return None
+		return self._data[extension.offset : extension.offset + extension.length]
+
+	def get_extension(self, exttype):
+		"""Returns the decoded extension or None if it is not present."""
+		exttype = enum_table(ExtensionType)(exttype)
+		if exttype in self._decoded_extensions:
+			return self._decoded_extensions[exttype]
+		data = self.get_extension_data(exttype)
+		extension = None if (data is None) else BaseHelloExtension.parse(exttype, MsgBuffer(data))
+		self._decoded_extensions[exttype] = extension
+		return extension
+
+	@property
+	def extensions(self):
+		if self._extensions is not None:
+			return self._extensions
+		self._extensions = [ self.get_extension(extension.exttype) for extension in self._extension_index ]
+		return self._extensions
+
+	def to_packet(self):
+		"""Fully decodes the message into a ClientHelloPkt."""
+		return ClientHelloPkt.parse(MsgBuffer(self._data))
+
+	def __len__(self):
+		return len(self._data)
+
+	def __str__(self):
+		return "ClientHelloView<%s, %d cipher suites, %d extensions>" % (self.proto_version.name, self.cipher_suite_count, len(self._extension_index))
@@ -26,6 +26,13 @@ from ..Enums import KeyExchangeAlgorithm, HandshakeType
 from ..MsgBuffer import MsgBuffer
 from .HandshakePkt import HandshakePkt
 from toyssl.crypto.KexParams import DHModPKexParams
+from ..Schema import HandshakeSchema, OpaqueUInt, Span
+
+_SCHEMA = HandshakeSchema(HandshakeType.ClientKeyExchange, [
+	Span("client_dh_params", [
+		OpaqueUInt("Yc", 2, label = "Yc"),
+	], label = "ClientDHParams"),
+])
 
 class ClientKeyExchangePkt(HandshakePkt):
 	def __init__(self, kexalgorithm):
@@ -41,34 +48,20 @@ class ClientKeyExchangePkt(HandshakePkt):
 	def kexparam(self):
 		return self._kexparam
 
+	def set_kexparam(self, Yc):
+		self._kexparam = Yc
+		return self
+
 	def serialize(self):
-		assert(self._signature is not None)
-		msg = MsgBuffer()
-		with msg.new_marker("HandshakeType") as marker:
-			msg.add_uint8(int(self.packet_type()))
-			marker.add_comment(ClientKeyExchangePkt.packet_type().name)
-		with msg.add_opaque_deferred(3):
-			msg += self.get_signedpayload()
-			with msg.add_opaque_deferred(2):
-				msg += self._signature
-		return msg
+		assert(self._kexparam is not None)
+		return _SCHEMA.serialize(_SCHEMA.new(Yc = self._kexparam))
 
 	@staticmethod
 	def parse(msg):
 		assert(isinstance(msg, MsgBuffer))
-		msg.seek(0)
-		with msg.new_marker("HandshakeType") as marker:
-			assert(msg.get_uint8() == int(ClientKeyExchangePkt.packet_type()))
-			marker.add_comment(ClientKeyExchangePkt.packet_type().name)
-
-		msg = msg.get_opaque(3, name = "Payload")
+		values = _SCHEMA.parse(msg)
 		pkt = ClientKeyExchangePkt(KeyExchangeAlgorithm.DHE_RSA)
-
-		start_payload = None
-		with msg.new_marker("ClientDHParams"):
-			Yc = int(msg.get_opaque(2, name = "Yc"))
-			pkt._kexparam = Yc
-
+		pkt._kexparam = values.Yc
 		return pkt
 
 	def __str__(self):
@@ -19,14 +19,23 @@
 #
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
+from ..ReserializeCheck import reserialize_check
+
 class HandshakePkt(object):
+	@property
+	def preencoded(self):
+		"""True for packets which hand out a cached encoding that has already
+		been checked and therefore need not be parsed again."""
+		return False
+
 	def serialize(self):
 		raise Exception(NotImplemented)
 	
 	def reserialize(self):
+		if self.preencoded:
+			return self.serialize()
 		msgbuf = self.serialize()
-		msgbuf.markers.clear()
-		pkt = self.parse(msgbuf)
+		reserialize_check.verify(self, msgbuf)
 		return msgbuf
 
 	@staticmethod
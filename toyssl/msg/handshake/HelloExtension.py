@@ -23,17 +23,29 @@ import collections
 
 from ..Enums import ExtensionType, HashAlgorithm, SignatureAlgorithm, SupportedGroups, ECPointFormats
 from ..MsgBuffer import MsgBuffer
+from ..EnumTable import enum_table, is_enum_value
+from ..Schema import Enum, Opaque, Struct
 from toyssl.hexdump import hex2printstr
 
+# Wire format of a single extension, shared by the ClientHello and ServerHello schemas
+EXTENSION_SCHEMA = Struct("extension", [
+	Enum("type", ExtensionType, 2),
+	Opaque("data", 2, msgbuf = True),
+])
+
 class BaseHelloExtension(object):
 	_KNOWN_EXTENSIONS = { }
 
 	def __init__(self, extensiontype, msgbuffer = None):
-		assert(isinstance(extensiontype, ExtensionType))
+		assert(is_enum_value(extensiontype, ExtensionType))
 		assert((msgbuffer is None) or isinstance(msgbuffer, MsgBuffer))
 		self._extensiontype = extensiontype
 		self._msgbuffer = msgbuffer
 
+	@property
+	def extensiontype(self):
+		return self._extensiontype
+
 	def parse(extensiontype, msgbuffer):
 		if extensiontype in BaseHelloExtension._KNOWN_EXTENSIONS:
 			return BaseHelloExtension._KNOWN_EXTENSIONS[extensiontype].parse(extensiontype, msgbuffer)
@@ -77,8 +89,8 @@ class HelloExtensionSignatureAlgs(BaseHelloExtension):
 			algs = data.get_opaque(2)
 			while algs.remaining > 0:
 				with algs.new_marker("Algorithm") as marker:
-					hash_alg = HashAlgorithm(algs.get_uint8())
-					sig_alg = SignatureAlgorithm(algs.get_uint8())
+					hash_alg = enum_table(HashAlgorithm)(algs.get_uint8())
+					sig_alg = enum_table(SignatureAlgorithm)(algs.get_uint8())
 					self.add_algorithm(sig_alg, hash_alg)
 					marker.add_comment("%s-%s" % (sig_alg.name, hash_alg.name))
 		return self
@@ -91,8 +103,12 @@ class HelloExtensionSupportedGroups(BaseHelloExtension):
 		BaseHelloExtension.__init__(self, ExtensionType.supported_groups, None)
 		self._groups = [ ]
 
+	@property
+	def groups(self):
+		return self._groups
+
 	def add_group(self, group):
-		assert(isinstance(group, SupportedGroups))
+		assert(is_enum_value(group, SupportedGroups))
 		self._groups.append(group)
 		return self
 
@@ -107,7 +123,7 @@ class HelloExtensionSupportedGroups(BaseHelloExtension):
 			groups = data.get_opaque(2)
 			while groups.remaining > 0:
 				with groups.new_marker("Group") as marker:
-					group = SupportedGroups(groups.get_uint16())
+					group = enum_table(SupportedGroups)(groups.get_uint16())
 					self.add_group(group)
 					marker.add_comment("%s" % (group.name))
 		return self
@@ -121,7 +137,7 @@ class HelloExtensionECPointFormats(BaseHelloExtension):
 		self._formats = [ ]
 
 	def add_format(self, format):
-		assert(isinstance(format, ECPointFormats))
+		assert(is_enum_value(format, ECPointFormats))
 		self._formats.append(format)
 		return self
 
@@ -136,7 +152,7 @@ class HelloExtensionECPointFormats(BaseHelloExtension):
 			formats = data.get_opaque(2)
 			while formats.remaining > 0:
 				with formats.new_marker("PointFormat") as marker:
-					ptformat = ECPointFormats(formats.get_uint8())
+					ptformat = enum_table(ECPointFormats)(formats.get_uint8())
 					self.add_format(ptformat)
 					marker.add_comment("%s" % (ptformat.name))
 		return self
@@ -144,7 +160,90 @@ class HelloExtensionECPointFormats(BaseHelloExtension):
 	def __str__(self):
 		return "HelloExtensionECPointFormats<%s>" % (self._formats)
 
+class HelloExtensionServerName(BaseHelloExtension):
+	_HOST_NAME = 0
+
+	def __init__(self, hostname = None):
+		BaseHelloExtension.__init__(self, ExtensionType.server_name, None)
+		self._hostname = hostname
+
+	@property
+	def hostname(self):
+		return self._hostname
+
+	def serialize(self):
+		msg = MsgBuffer()
+		if self._hostname is not None:
+			hostname = self._hostname.encode("ascii")
+			msg.add_uint16(1 + 2 + len(hostname))
+			msg.add_uint8(self._HOST_NAME)
+			msg.add_opaque(2, hostname)
+		return (ExtensionType.server_name, msg)
+
+	def parse(extensiontype, data):
+		assert(extensiontype == ExtensionType.server_name)
+		assert(isinstance(data, MsgBuffer))
+		self = HelloExtensionServerName()
+		if data.remaining == 0:
+			# Empty in the ServerHello, RFC6066 Sect. 3
+			return self
+		with data.new_marker("ServerNameList"):
+			names = data.get_opaque(2)
+			while names.remaining > 0:
+				with names.new_marker("ServerName") as marker:
+					name_type = names.get_uint8()
+					name = names.get_opaque(2).data
+					if (name_type == self._HOST_NAME) and (self._hostname is None):
+						try:
+							self._hostname = name.decode("ascii")
+							marker.add_comment("host_name %s" % (self._hostname))
+						except UnicodeDecodeError:
+							# Host names are ASCII (RFC6066 Sect. 3); treat the SNI as unknown
+							marker.add_comment("invalid host_name %s" % (name.decode("ascii", errors = "replace")))
+		return self
+
+	def __str__(self):
+		return "HelloExtensionServerName<%s>" % (self._hostname)
+
+class HelloExtensionALPN(BaseHelloExtension):
+	def __init__(self):
+		BaseHelloExtension.__init__(self, ExtensionType.application_layer_protocol_negotiation, None)
+		self._protocols = [ ]
+
+	@property
+	def protocols(self):
+		return self._protocols
+
+	def add_protocol(self, protocol):
+		assert(isinstance(protocol, bytes))
+		self._protocols.append(protocol)
+		return self
+
+	def serialize(self):
+		msg = MsgBuffer()
+		msg.add_uint16(sum(1 + len(protocol) for protocol in self._protocols))
+		for protocol in self._protocols:
+			msg.add_opaque(1, protocol)
+		return (ExtensionType.application_layer_protocol_negotiation, msg)
+
+	def parse(extensiontype, data):
+		assert(extensiontype == ExtensionType.application_layer_protocol_negotiation)
+		assert(isinstance(data, MsgBuffer))
+		self = HelloExtensionALPN()
+		with data.new_marker("ProtocolNameList"):
+			protocols = data.get_opaque(2)
+			while protocols.remaining > 0:
+				with protocols.new_marker("ProtocolName") as marker:
+					protocol = protocols.get_opaque(1).data
+					self.add_protocol(protocol)
+					marker.add_comment("%s" % (protocol.decode("ascii", errors = "replace")))
+		return self
+
+	def __str__(self):
+		return "HelloExtensionALPN<%s>" % (self._protocols)
+
 BaseHelloExtension._KNOWN_EXTENSIONS[ExtensionType.signature_algorithms] = HelloExtensionSignatureAlgs
 BaseHelloExtension._KNOWN_EXTENSIONS[ExtensionType.supported_groups] = HelloExtensionSupportedGroups
 BaseHelloExtension._KNOWN_EXTENSIONS[ExtensionType.ec_point_formats] = HelloExtensionECPointFormats
-
+BaseHelloExtension._KNOWN_EXTENSIONS[ExtensionType.server_name] = HelloExtensionServerName
+BaseHelloExtension._KNOWN_EXTENSIONS[ExtensionType.application_layer_protocol_negotiation] = HelloExtensionALPN
@@ -23,10 +23,24 @@ import time
 
 from ..Enums import SSLVersion, CipherSuite, CompressionMethod, ExtensionType, HandshakeType
 from ..MsgBuffer import MsgBuffer
+from ..EnumTable import is_enum_value
 from toyssl.crypto.Random import secure_rand
-from .HelloExtension import BaseHelloExtension
+from .HelloExtension import BaseHelloExtension, EXTENSION_SCHEMA
 from toyssl.hexdump import hex2printstr
 from .HandshakePkt import HandshakePkt
+from ..Schema import HandshakeSchema, Enum, UInt, Fixed, Opaque, Vector, Span, Optional
+
+_SCHEMA = HandshakeSchema(HandshakeType.ServerHello, [
+	Enum("proto_version", SSLVersion, 2, label = "ProtocolVersion"),
+	Span("random", [
+		UInt("random_time", 4, label = "Time"),
+		Fixed("random_data", 28, label = "Other"),
+	]),
+	Opaque("session_id", 1, label = "Session"),
+	Enum("cipher_suite", CipherSuite, 2),
+	Enum("compression_method", CompressionMethod, 1),
+	Optional(Vector("extensions", 2, EXTENSION_SCHEMA)),
+])
 
 class ServerHelloPkt(HandshakePkt):
 	def __init__(self, proto_version):
@@ -37,7 +51,7 @@ class ServerHelloPkt(HandshakePkt):
 		self._cipher_suite = None
 		self._compression_method = None
 		self._extensions = [ ]
-		assert(isinstance(self._proto_version, SSLVersion))
+		assert(is_enum_value(self._proto_version, SSLVersion))
 
 	@staticmethod
 	def packet_type():
@@ -51,12 +65,12 @@ class ServerHelloPkt(HandshakePkt):
 		return msg
 
 	def set_cipher_suite(self, cipher_suite):
-		assert(isinstance(cipher_suite, CipherSuite))
+		assert(is_enum_value(cipher_suite, CipherSuite))
 		self._cipher_suite = cipher_suite
 		return self
 
 	def set_compression_method(self, compression_method):
-		assert(isinstance(compression_method, CompressionMethod))
+		assert(is_enum_value(compression_method, CompressionMethod))
 		self._compression_method = compression_method
 		return self
 
@@ -68,73 +82,30 @@ class ServerHelloPkt(HandshakePkt):
 	def serialize(self):
 		assert(self._cipher_suite is not None)
 		assert(self._compression_method is not None)
-		msg = MsgBuffer()
-		with msg.new_marker("HandshakeType") as marker:
-			msg.add_uint8(int(self.packet_type()))
-			marker.add_comment(ServerHelloPkt.packet_type().name)
-
-		with msg.add_opaque_deferred(3):
-			msg.add_uint16(int(self._proto_version))
-			msg.add_uint32(self._random_time)
-			msg += self._random_data
-			if self._sessionid is not None:
-				msg.add_opaque(1, self._sessionid)
-			else:
-				msg.add_uint8(0)
-			
-			msg.add_uint16(int(self._cipher_suite))
-			msg.add_uint8(int(self._compression_method))
-
-		return msg
+		extensions = [ EXTENSION_SCHEMA.new(type = exttype, data = extdata) for (exttype, extdata) in (extension.serialize() for extension in self._extensions) ]
+		return _SCHEMA.serialize(_SCHEMA.new(
+			proto_version = self._proto_version,
+			random_time = self._random_time,
+			random_data = self._random_data,
+			session_id = self._sessionid if (self._sessionid is not None) else b"",
+			cipher_suite = self._cipher_suite,
+			compression_method = self._compression_method,
+			extensions = extensions if (len(extensions) > 0) else None,
+		))
 
 	@staticmethod
 	def parse(msg):
 		assert(isinstance(msg, MsgBuffer))
-		msg.seek(0)
-		with msg.new_marker("HandshakeType") as marker:
-			assert(msg.get_uint8() == int(ServerHelloPkt.packet_type()))
-			marker.add_comment(ServerHelloPkt.packet_type().name)
-		msg = msg.get_opaque(3, name = "Payload")
-
-		with msg.new_marker("ProtocolVersion") as marker:
-			proto_version = SSLVersion(msg.get_uint16())
-			marker.add_comment(proto_version.name)
-		pkt = ServerHelloPkt(proto_version)
-		with msg.new_marker("Random"):
-			with msg.new_marker("Time"):
-				pkt._random_time = msg.get_uint32()
-			with msg.new_marker("Other"):
-				pkt._random_data = msg.get_buffer(28)
-		with msg.new_marker("Session"):
-			pkt._sessionid = msg.get_opaque(1).data
-
-		with msg.new_marker("CipherSuite") as marker:
-			csid = msg.get_uint16()
-			pkt._cipher_suite = CipherSuite(csid)
-			marker.add_comment(pkt._cipher_suite.name)
-
-		with msg.new_marker("CompressionMethod") as marker:
-			compid = msg.get_uint8()
-			pkt._compression_method = CompressionMethod(compid)
-			marker.add_comment(pkt._compression_method.name)
-
-		if msg.remaining > 0:
-			with msg.new_marker("Extensions"):
-				# Extension decoding
-				ext_count = 0
-				ext_length = msg.get_uint16()
-				assert(ext_length == msg.remaining)
-				while msg.remaining > 0:
-					extname = "Extension%d" % (ext_count)
-					with msg.new_marker(extname):
-						with msg.new_marker("Type") as marker:
-							extension_type = ExtensionType(msg.get_uint16())
-							marker.add_comment(str(extension_type))
-						with msg.new_marker("Data"):
-							extension_data = msg.get_opaque(2)
-					extension = BaseHelloExtension.parse(extension_type, extension_data)
-					pkt.add_extension(extension)
-					ext_count += 1
+		values = _SCHEMA.parse(msg)
+		pkt = ServerHelloPkt(values.proto_version)
+		pkt._random_time = values.random_time
+		pkt._random_data = values.random_data
+		pkt._sessionid = values.session_id
+		pkt._cipher_suite = values.cipher_suite
+		pkt._compression_method = values.compression_method
+		if values.extensions is not None:
+			for extension in values.extensions:
+				pkt.add_extension(BaseHelloExtension.parse(extension.type, extension.data))
 		return pkt
 
 	def __str__(self):
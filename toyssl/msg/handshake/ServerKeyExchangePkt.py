@@ -26,6 +26,16 @@ from ..Enums import KeyExchangeAlgorithm, HandshakeType
 from ..MsgBuffer import MsgBuffer
 from .HandshakePkt import HandshakePkt
 from toyssl.crypto.KexParams import DHModPKexParams
+from ..Schema import HandshakeSchema, OpaqueUInt, Opaque, Span
+
+_SCHEMA = HandshakeSchema(HandshakeType.ServerKeyExchange, [
+	Span("server_dh_params", [
+		OpaqueUInt("p", 2, label = "p"),
+		OpaqueUInt("g", 2, label = "g"),
+		OpaqueUInt("Ys", 2, label = "Ys"),
+	], label = "ServerDHParams"),
+	Opaque("signature", 2, msgbuf = True),
+])
 
 class ServerKeyExchangePkt(HandshakePkt):
 	def __init__(self, kexalgorithm):
@@ -82,37 +92,22 @@ class ServerKeyExchangePkt(HandshakePkt):
 
 	def serialize(self):
 		assert(self._signature is not None)
-		msg = MsgBuffer()
-		with msg.new_marker("HandshakeType") as marker:
-			msg.add_uint8(int(self.packet_type()))
-			marker.add_comment(ServerKeyExchangePkt.packet_type().name)
-		with msg.add_opaque_deferred(3):
-			msg += self.get_signedpayload()
-			with msg.add_opaque_deferred(2):
-				msg += self._signature
-		return msg
+		return _SCHEMA.serialize(_SCHEMA.new(
+			p = self._kexparams.p,
+			g = self._kexparams.g,
+			Ys = self._kexsession.Ys,
+			signature = self._signature,
+		))
 
 	@staticmethod
 	def parse(msg):
 		assert(isinstance(msg, MsgBuffer))
-		msg.seek(0)
-		with msg.new_marker("HandshakeType") as marker:
-			assert(msg.get_uint8() == int(ServerKeyExchangePkt.packet_type()))
-			marker.add_comment(ServerKeyExchangePkt.packet_type().name)
-
-		msg = msg.get_opaque(3, name = "Payload")
+		values = _SCHEMA.parse(msg)
 		pkt = ServerKeyExchangePkt(KeyExchangeAlgorithm.DHE_RSA)
-
-		start_payload = None
-		with msg.new_marker("ServerDHParams"):
-			p = int(msg.get_opaque(2, name = "p"))
-			g = int(msg.get_opaque(2, name = "g"))
-			Ys = int(msg.get_opaque(2, name = "Ys"))
-			pkt._signedpayload = msg.get_abs_buffer(start_payload, msg.pos)
-			pkt._kexparams = DHModPKexParams(p, g)
-			pkt._kexsession = pkt._kexparams.new_session().setYs(Ys)
-
-		pkt._signature = msg.get_opaque(2, name = "Signature")
+		pkt._signedpayload = MsgBuffer(values.server_dh_params)
+		pkt._kexparams = DHModPKexParams(values.p, values.g)
+		pkt._kexsession = pkt._kexparams.new_session().setYs(values.Ys)
+		pkt._signature = values.signature
 		return pkt
 
 	def __str__(self):
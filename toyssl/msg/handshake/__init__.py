@@ -20,12 +20,15 @@
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
 from .ClientHelloPkt import ClientHelloPkt
+from .ClientHelloView import ClientHelloView
+from .ClientHelloPeek import peek_client_hello, ClientHelloPeekException
 from .ServerHelloPkt import ServerHelloPkt
 from .CertificatePkt import CertificatePkt
 from .ServerKeyExchangePkt import ServerKeyExchangePkt
 from .ClientKeyExchangePkt import ClientKeyExchangePkt
 from .ServerHelloDonePkt import ServerHelloDonePkt
 from ..Enums import HandshakeType
+from ..EnumTable import enum_table
 
 _KNOWN_HANDSHAKE_PACKETS = {
 	HandshakeType.ClientHello: ClientHelloPkt,
@@ -38,6 +41,8 @@ _KNOWN_HANDSHAKE_PACKETS = {
 
 def parse_handshake_pkt(msgbuf):
 	msgbuf.seek(0)
-	packet_type = HandshakeType(msgbuf.get_uint8())
-	handler = _KNOWN_HANDSHAKE_PACKETS[packet_type]
+	packet_type = enum_table(HandshakeType)(msgbuf.get_uint8())
+	handler = _KNOWN_HANDSHAKE_PACKETS.get(packet_type)
+	if handler is None:
+		raise Exception("Do not know how to parse handshake message of type %s." % (packet_type))
 	return handler.parse(msgbuf)
@@ -0,0 +1,126 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+import socket
+from toyssl import SSLConnection
+from toyssl.msg import Protocol
+from toyssl.msg.RecordWriter import RecordWriter
+from toyssl.crypto.RecordEngine import AESGCMRecordEngine
+
+class ApplicationDataTest(unittest.TestCase):
+	def test_fragmentation_zerocopy(self):
+		sent = [ ]
+		writer = RecordWriter(Protocol(), sent.append).configure_record_sizing(boost_after_bytes = 0)
+		data = bytes(range(256)) * 200
+		writer.write(data)
+		self.assertEqual(len(sent), 1)
+		iovecs = sent[0]
+
+		# Header and payload alternate, payload references the source buffer
+		payloads = iovecs[1::2]
+		self.assertEqual([ len(payload) for payload in payloads ], [ 16384, 16384, 16384, 51200 - 3 * 16384 ])
+		self.assertTrue(all(payload.obj is data for payload in payloads))
+		self.assertEqual(b"".join(payloads), data)
+		self.assertEqual(bytes(iovecs[0]), b"\x17\x03\x01\x40\x00")
+
+	def test_coalescing(self):
+		sent = [ ]
+		writer = RecordWriter(Protocol(), sent.append)
+		for i in range(100):
+			writer.write(b"chunk%02d;" % (i))
+		self.assertEqual(sent, [ ])
+		self.assertEqual(writer.pending_bytes, 800)
+		writer.flush()
+		self.assertEqual(len(sent), 1)
+		self.assertEqual(len(sent[0]), 2)
+		self.assertEqual(bytes(sent[0][1]), b"".join(b"chunk%02d;" % (i) for i in range(100)))
+
+	def test_dynamic_record_size(self):
+		sent = [ ]
+		writer = RecordWriter(Protocol(), sent.append).configure_record_sizing(small_record_length = 1005, boost_after_bytes = 5000, idle_timeout = 60)
+		writer.write(bytes(20000))
+		lengths = [ len(iovec) for iovec in sent[0][1::2] ]
+		self.assertEqual(lengths, [ 1000 ] * 5 + [ 15000 ])
+		self.assertEqual(writer.stats.counters["record_size_boosts"], 1)
+		self.assertEqual(writer.stats.histogram("tx_record_size").buckets, [ (1024, 5), (16384, 1) ])
+
+		# After idling, the writer starts over with small records
+		writer.configure_record_sizing(small_record_length = 1005, boost_after_bytes = 5000, idle_timeout = 0)
+		writer.write(bytes(3000))
+		lengths = [ len(iovec) for iovec in sent[1][1::2] ]
+		self.assertEqual(lengths, [ 1000 ] * 3)
+		self.assertEqual(writer.stats.counters["record_size_fallbacks"], 1)
+
+	def _connected_pair(self):
+		(sock_a, sock_b) = socket.socketpair()
+		key = bytes(range(16))
+		salt = b"salt"
+		conns = [ ]
+		for sock in [ sock_a, sock_b ]:
+			sock.settimeout(0.1)
+			proto = Protocol().set_crypto_engine(AESGCMRecordEngine(key, salt), AESGCMRecordEngine(key, salt))
+			conn = SSLConnection(proto)
+			conn.set_peer_socket(sock)
+			conns.append(conn)
+		return conns
+
+	def test_bulk_transfer(self):
+		(conn_a, conn_b) = self._connected_pair()
+		try:
+			data = bytearray(i & 0xff for i in range(300000))
+			conn_a.write(memoryview(data))
+			conn_a.write(b"tail")
+			conn_a.flush()
+
+			received = bytearray()
+			for chunk in conn_b.read(timeout = 5):
+				self.assertLessEqual(len(chunk), 16384)
+				received += chunk
+				if len(received) == len(data) + 4:
+					break
+			self.assertEqual(received, data + b"tail")
+			self.assertEqual(conn_b.stats.histogram("rx_record_size").buckets, conn_a.stats.histogram("tx_record_size").buckets)
+		finally:
+			conn_a.close()
+			conn_b.close()
+
+	def test_read_eof(self):
+		(conn_a, conn_b) = self._connected_pair()
+		conn_a.write(b"bye").close()
+		self.assertEqual([ bytes(chunk) for chunk in conn_b.read(timeout = 5) ], [ b"bye" ])
+		conn_b.close()
+
+	def test_close_unconnected(self):
+		SSLConnection(Protocol()).close()
+
+	def test_send_timeout(self):
+		(sock_a, sock_b) = socket.socketpair()
+		sock_a.settimeout(0.05)
+		conn = SSLConnection(Protocol(), send_timeout = 0.3)
+		conn.set_peer_socket(sock_a)
+		try:
+			# sock_b is never read, so its receive buffer fills up
+			with self.assertRaises(socket.timeout):
+				conn.tx_to_peer_iov([ bytes(16 * 1024 * 1024) ])
+		finally:
+			sock_b.close()
+			conn.close()
@@ -0,0 +1,51 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+from toyssl.x509 import CertificateCache, certificate_cache
+from toyssl.x509.PEMEncoder import pem_decode
+from .X509CrtParser import _CRTDATA
+
+class CertificateCacheTest(unittest.TestCase):
+	def setUp(self):
+		self._der = pem_decode(_CRTDATA.split("\n"), "CERTIFICATE")
+
+	def test_cache(self):
+		cache = CertificateCache()
+		certificate = cache.get(self._der)
+		self.assertEqual(certificate.version, 3)
+		self.assertIs(cache.get(bytes(bytearray(self._der))), certificate)
+		self.assertIs(cache.get(memoryview(self._der)), certificate)
+		self.assertEqual((cache.hits, cache.misses, len(cache)), (2, 1, 1))
+
+	def test_bounded(self):
+		cache = CertificateCache(maxsize = 1)
+		certificate = cache.get(self._der)
+		with self.assertRaises(Exception):
+			cache.get(self._der[:-1])
+		self.assertIs(cache.get(self._der), certificate)
+		cache.resize(4)
+		self.assertIsNot(cache.get(self._der), certificate)
+
+	def test_derhash(self):
+		certificate = certificate_cache.get(self._der)
+		self.assertEqual(len(certificate.derhash), 64)
+		self.assertIs(certificate_cache.get(self._der), certificate)
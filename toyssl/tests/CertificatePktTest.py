@@ -0,0 +1,67 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+from toyssl.msg.handshake import CertificatePkt
+from toyssl.msg.MsgBuffer import MsgBuffer
+from toyssl.msg.Schema import HandshakeSchema
+from toyssl.x509.PEMEncoder import pem_decode
+from .X509CrtParser import _CRTDATA
+
+class CertificatePktTest(unittest.TestCase):
+	def setUp(self):
+		self._der = pem_decode(_CRTDATA.split("\n"), "CERTIFICATE")
+		pkt = CertificatePkt()
+		pkt.add_cert(self._der)
+		pkt.add_cert(b"not a certificate")
+		self._data = pkt.serialize().data
+
+	def test_lazy_chain(self):
+		for annotate in [ True, False ]:
+			HandshakeSchema.annotate = annotate
+			try:
+				pkt = CertificatePkt.parse(MsgBuffer(self._data))
+			finally:
+				HandshakeSchema.annotate = True
+			self.assertEqual(pkt.cert_count, 2)
+			self.assertIsInstance(pkt.get_cert(0), memoryview)
+			self.assertEqual(pkt.get_cert(0), self._der)
+			self.assertEqual(bytes(pkt.get_cert(1)), b"not a certificate")
+			self.assertEqual(str(pkt.get_x509(0).subject), "CN=Foobar")
+			self.assertIs(pkt.get_x509(0), pkt.get_x509(0))
+			with self.assertRaises(Exception):
+				pkt.get_x509(1)
+			self.assertEqual(pkt.serialize().data, self._data)
+
+	def test_modify_parsed(self):
+		pkt = CertificatePkt.parse(MsgBuffer(self._data))
+		pkt.add_cert(b"foo")
+		self.assertEqual(pkt.cert_count, 3)
+		self.assertEqual(pkt.get_cert(1), b"not a certificate")
+		self.assertEqual(CertificatePkt.parse(pkt.serialize()).get_cert(2), b"foo")
+
+	def test_malformed(self):
+		with self.assertRaises(Exception):
+			CertificatePkt._index(self._data[:-1])
+		data = bytearray(self._data)
+		data[9] += 1
+		with self.assertRaises(Exception):
+			CertificatePkt._index(data)
@@ -0,0 +1,57 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import io
+import base64
+import unittest
+from toyssl.x509 import CertificateReader
+from toyssl.x509.PEMEncoder import pem_decode, pem_encode
+from .X509CrtParser import _CRTDATA
+from .ChainVerifierTest import _ROOT_CRT
+
+class CertificateReaderTest(unittest.TestCase):
+	def setUp(self):
+		self._ders = [ pem_decode(pem.split("\n"), "CERTIFICATE") for pem in [ _CRTDATA, _ROOT_CRT ] ]
+
+	@staticmethod
+	def _read(data, fmt = "auto"):
+		reader = CertificateReader(io.BufferedReader(io.BytesIO(data)), fmt)
+		return (list(reader), reader.errors)
+
+	def test_pem(self):
+		data = "\n".join(line for der in self._ders for line in pem_encode(der, "CERTIFICATE")).encode("ascii")
+		self.assertEqual(self._read(data), (self._ders, 0))
+		self.assertEqual(self._read(data, "pem"), (self._ders, 0))
+
+	def test_der(self):
+		self.assertEqual(self._read(b"".join(self._ders)), (self._ders, 0))
+		with self.assertRaises(Exception):
+			self._read(b"".join(self._ders)[:-1])
+
+	def test_base64(self):
+		lines = [ base64.b64encode(der) for der in self._ders ]
+		data = b"# corpus\n" + lines[0] + b"\n\nnot base64!\n" + lines[1] + b"\n"
+		self.assertEqual(self._read(data), (self._ders, 1))
+		self.assertEqual(self._read(data, "base64"), (self._ders, 1))
+
+	def test_mixed(self):
+		data = "\n".join(pem_encode(self._ders[0], "CERTIFICATE")).encode("ascii") + b"\n" + base64.b64encode(self._ders[1]) + b"\n"
+		self.assertEqual(self._read(data), (self._ders, 0))
@@ -0,0 +1,220 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import datetime
+import unittest
+from toyssl.x509 import X509Certificate, TrustStore, ChainVerifier, SignatureVerifier
+from .X509CrtParser import _CRTDATA
+
+_ROOT_CRT = """
+-----BEGIN CERTIFICATE-----
+MIICCjCCAXOgAwIBAgIUaSuaqkfaD10Pq5DzK/QZ94V/mhswDQYJKoZIhvcNAQEL
+BQAwFjEUMBIGA1UEAwwLVG95IFJvb3QgQ0EwIBcNMjYxMDE5MTUzOTQ2WhgPMjEy
+NjA5MjUxNTM5NDZaMBYxFDASBgNVBAMMC1RveSBSb290IENBMIGfMA0GCSqGSIb3
+DQEBAQUAA4GNADCBiQKBgQC8tZaXGnEa57INWWm0wqlNNKogOoqy2OSkYHVRHdjL
+P48e2SvSlRCYpzlK+NnULsAL2rLRgJ0qmZRCpwBmNIbqhzy7/loJ3vmQ+nguYKBV
+sOpaprWKuim7JvkN06rzMpVfZGqfrokz5CKl6L6E/oVgz9LUztErpWdqI1kNRPZ6
+PQIDAQABo1MwUTAfBgNVHSMEGDAWgBQNJwwJoQUH/+l+EApnHMjPtTS9rDAPBgNV
+HRMBAf8EBTADAQH/MB0GA1UdDgQWBBQNJwwJoQUH/+l+EApnHMjPtTS9rDANBgkq
+hkiG9w0BAQsFAAOBgQBzaaZQ2vRggtNEgWIvoZqUuj24wSBLfQrv76bdShR/NcIe
+Mk9Si7RQmkSzmmw9+40soZjEvLfNpbpx5Vm2HrlzF+hrcVSPegJrTNTKdi8ZYE4w
+nfXQ787mDH/ny1Dq+4DEwZ9THERtZAztsAuD277Py6rXcomW0SmsDcpmKU/HrQ==
+-----END CERTIFICATE-----
+"""
+
+_INTERMEDIATE_CRT = """
+-----BEGIN CERTIFICATE-----
+MIICIjCCAYugAwIBAgIUU7HSGT8v22eJWYCVf1md37pzCLQwDQYJKoZIhvcNAQEL
+BQAwFjEUMBIGA1UEAwwLVG95IFJvb3QgQ0EwIBcNMjYxMDE5MTUzOTQ2WhgPMjEy
+NjA5MjUxNTM5NDZaMB4xHDAaBgNVBAMME1RveSBJbnRlcm1lZGlhdGUgQ0EwgZ8w
+DQYJKoZIhvcNAQEBBQADgY0AMIGJAoGBANp4wjH+0w32Dv8Zy7s6ABE18xmhlSnL
+nUz6oLFM0HSW3u5pkJPxUrtzozsdKFduXhFton0rSrac1VTwlCkoKttOIcUb3mw1
+9eZ4+fnL3BzA21Nhn4xqfRCFVqFw9Eg4XUv/4PLRRlwQ26ZcdTUtPF4E1dzgaSdb
+X1EhOPRmlvoRAgMBAAGjYzBhMA8GA1UdEwEB/wQFMAMBAf8wHQYDVR0OBBYEFBu/
+35obn6nBMveICvxaejT8GlfIMB8GA1UdIwQYMBaAFA0nDAmhBQf/6X4QCmccyM+1
+NL2sMA4GA1UdDwEB/wQEAwIBBjANBgkqhkiG9w0BAQsFAAOBgQCXN6BRfrY0QZ7H
+9qGeppySZW5zuRCkDxLFyeEHAa5NdU1L6tWHJTTsR76qka2sKZaJoaunXxcf4D8Q
+ICAgzWtq7Une5mmuS1gB2DxwjnBSmLtcChSo4t/pd8pzfar6PQcjCMM45ztMpS48
+cM0VIQRNCY1nQHCCBOA6O8TLl25x1A==
+-----END CERTIFICATE-----
+"""
+
+_LEAF_CRT = """
+-----BEGIN CERTIFICATE-----
+MIICEzCCAXygAwIBAgIUAkYZlDGMFfKhkm7WJw1xYGcif0EwDQYJKoZIhvcNAQEL
+BQAwHjEcMBoGA1UEAwwTVG95IEludGVybWVkaWF0ZSBDQTAgFw0yNjEwMTkxNTM5
+NDZaGA8yMTI2MDkyNTE1Mzk0NlowGjEYMBYGA1UEAwwPd3d3LmV4YW1wbGUuY29t
+MIGfMA0GCSqGSIb3DQEBAQUAA4GNADCBiQKBgQDG1Z8PA0m9uw66Wynx9ptr998C
+YsTkkBUHBPl/3a0HYUVpx14hqbJGMt2mHS5UFhdasO3dl24SGZHRiJFQKLQO2qhT
+FAgO5aTNK2CQ5iijHx4fKLMDiUrdFjBRtGEu+kRQRWUnGyR8stb+lqTYlUmVvrdf
+VIXTrjZN1Ue4MowjYwIDAQABo1AwTjAMBgNVHRMBAf8EAjAAMB0GA1UdDgQWBBQi
+K8G3EipSJ8cyc9O8iGzvfuUNBzAfBgNVHSMEGDAWgBQbv9+aG5+pwTL3iAr8Wno0
+/BpXyDANBgkqhkiG9w0BAQsFAAOBgQDL42SP5fTBwmq75qd5V7qFq7ThfddQU6bp
+2+m25lZxljF6JrRP/cEIs/mo/rivTTnck8NeZmHq0RCpe+Iip1Llbmjp6/3bjEDR
+7SEqAdRCZZt62jR4ikX3Cdvu3ypA2E7KsS2dbftLsJ4oDuD0PmGrxmrSqBLxprX+
+/tUPoQFpAA==
+-----END CERTIFICATE-----
+"""
+
+# Root signs with SHA-256, the leaves with MD5 and SHA-1 respectively
+_WEAK_ROOT_CRT = """
+-----BEGIN CERTIFICATE-----
+MIICEDCCAXmgAwIBAgIUUUQuq27rXoUN89zDJb2l0ZrwTx0wDQYJKoZIhvcNAQEL
+BQAwGTEXMBUGA1UEAwwOV2VhayBUZXN0IFJvb3QwIBcNMjYxMDE5MTU1MzU5WhgP
+MjEyNjA5MjUxNTUzNTlaMBkxFzAVBgNVBAMMDldlYWsgVGVzdCBSb290MIGfMA0G
+CSqGSIb3DQEBAQUAA4GNADCBiQKBgQCns5JPiR1k3Pu1+31uBND7awUhMyVxBiDw
+Q3jheli2w6FrTc9AyhW8h3zBqbH0lWNE6hrGxv4r4s+1JgQYq1jVooYVtJpO9FKa
+QzAMPXVsKLuNmhhkCSaz4twVcCiZbz0EutzndeOL2aVx65Q0lNVwBogMVv9B4Qdd
+jlfVxID/5QIDAQABo1MwUTAdBgNVHQ4EFgQUJBwG3PMHVuSBdEEcDVRReFDb+hQw
+HwYDVR0jBBgwFoAUJBwG3PMHVuSBdEEcDVRReFDb+hQwDwYDVR0TAQH/BAUwAwEB
+/zANBgkqhkiG9w0BAQsFAAOBgQBWxCTVXXubVwed7xua4sBSu3lkLzAxQXtJzIFz
+vOrOTQ6fxxYxOV5wW9p+Cr+5uOv0vDOMp57UGKOQQxUVxUnOkk9uAqs0ex0oBpmE
+WnbD0HHpMpxwA+wDsVW9NXderT2DeTjG64yTCI8xU/Quw+xIy/xMvEbsE/hcX6QU
+eCWRRg==
+-----END CERTIFICATE-----
+"""
+
+_MD5_LEAF_CRT = """
+-----BEGIN CERTIFICATE-----
+MIIBnzCCAQgCAwIxUTANBgkqhkiG9w0BAQQFADAZMRcwFQYDVQQDDA5XZWFrIFRl
+c3QgUm9vdDAgFw0yNjEwMTkxNTUzNTlaGA8yMTI2MDkyNTE1NTM1OVowEzERMA8G
+A1UEAwwIbWQ1IGxlYWYwgZ8wDQYJKoZIhvcNAQEBBQADgY0AMIGJAoGBAL4M1tez
+e9Zxe1tVpfJ486Z3FFdSf/noFar5tma7BMM+95gqPEEHNPXzWa5JJFiWHBvoKHxt
+6bNDLj+58UtZjwmKg5rt9XCVlcz39F65Dp/JS4HK11Bjl3U+ySDf5VA9lL5RO2zs
+f59wWiOcp8zXpkTzbZpvkhLttOcXH9yZ0WPLAgMBAAEwDQYJKoZIhvcNAQEEBQAD
+gYEACIcxKoV8lQVgrcuHt/9rVl49ShKlGCyY/PsGBHgl8V9MxSxsWMNwINDnKOjk
+re4AZ/UAUwfdHS55uCrt9hk4VUN8gE2ZcJfiYn4H7JYHI27IGHcSA74GK6z2iQ2y
+HxiWyjNz+8umgu0yF+tFDbe8xozi4MkzL7AbduWwtvpSneo=
+-----END CERTIFICATE-----
+"""
+
+_SHA1_LEAF_CRT = """
+-----BEGIN CERTIFICATE-----
+MIIBoDCCAQkCAwJWEjANBgkqhkiG9w0BAQUFADAZMRcwFQYDVQQDDA5XZWFrIFRl
+c3QgUm9vdDAgFw0yNjEwMTkxNTUzNTlaGA8yMTI2MDkyNTE1NTM1OVowFDESMBAG
+A1UEAwwJc2hhMSBsZWFmMIGfMA0GCSqGSIb3DQEBAQUAA4GNADCBiQKBgQDP7TSC
+hE9QDlpYx9lcoTTM25kcUmmHJJMr6bCeRxg9aeNJMKqOQ1Zl/6Q0u+kGF8UDTr1A
+6lUS0Gbbsca6nfXVelqNygyQjL+8RTqBTMEBHUEMt1aR/EkCGKkHF9PKgA899YIa
+rTzHzGo1941qZEEsP2Sc72vG77HxMfdLMMbd7wIDAQABMA0GCSqGSIb3DQEBBQUA
+A4GBAEXSuAVcpIe3QA574cbk5ygbYzRG+2OPYqjDdFOW7qGEV+t2LUHEtiRSN6Op
+7/1Z4+lKYt3y1mtpqbOfcmL5i+952tTQudCgHQ+BsiRDG12LoM9sYEfD1ak42EBs
+oPesJTn3lXY+PqCsnxCbYR6ufz9rvEAuCgyxA4mcFCFJEDFk
+-----END CERTIFICATE-----
+"""
+
+# Same subject and key identifier as the intermediate, but a P-521 key
+_P521_INTERMEDIATE_CRT = """
+-----BEGIN CERTIFICATE-----
+MIICHjCCAYegAwIBAgIUU7HSGT8v22eJWYCVf1md37pzCLUwDQYJKoZIhvcNAQEL
+BQAwFjEUMBIGA1UEAwwLVG95IFJvb3QgQ0EwIBcNMjYxMDE5MTYwMjA3WhgPMjEy
+NjA5MjUxNjAyMDdaMB4xHDAaBgNVBAMME1RveSBJbnRlcm1lZGlhdGUgQ0EwgZsw
+EAYHKoZIzj0CAQYFK4EEACMDgYYABAAPK/0JrK7qGdLaKKEgj0btuN+tc5tlcpnM
+DecqzRrHGL86sIax1FAU9K7GVh0XPj5WgFv7njQ9BKASi9rQzkiRygB8KhoTc669
+KDvMh6Ql1UMt5R7HdQrv9P4okXQwaL8eFadH6j3Ifvj4oN0vJX+cwVHJWSLfGYCf
+s5Qft3iXUCi3MKNjMGEwDwYDVR0TAQH/BAUwAwEB/zAdBgNVHQ4EFgQUG7/fmhuf
+qcEy94gK/Fp6NPwaV8gwHwYDVR0jBBgwFoAUDScMCaEFB//pfhAKZxzIz7U0vaww
+DgYDVR0PAQH/BAQDAgEGMA0GCSqGSIb3DQEBCwUAA4GBABZnI6ZQqw9+VWj/SRg5
+XUPIO3gsvhSzxpiZpzt8djPmg+bms7+H3OgTf9hed2O7IFUL8LvjDPO40dQ+RQtu
+c2S/fzr8JxTAKgoy+MDYmsT6rOO+gzPi4PMtERthoP7b5MIiSvMsAyheJ443sG0t
+5Q1pyVq0g/Ucl/MWweIPdel3
+-----END CERTIFICATE-----
+"""
+
+class ChainVerifierTest(unittest.TestCase):
+	def setUp(self):
+		self._root = X509Certificate.frompemobj(_ROOT_CRT)
+		self._intermediate = X509Certificate.frompemobj(_INTERMEDIATE_CRT)
+		self._leaf = X509Certificate.frompemobj(_LEAF_CRT)
+
+	def test_key_identifiers(self):
+		self.assertEqual(self._leaf.authority_key_identifier, self._intermediate.subject_key_identifier)
+		self.assertEqual(self._intermediate.authority_key_identifier, self._root.subject_key_identifier)
+		self.assertTrue(self._intermediate.is_ca)
+		self.assertFalse(self._leaf.is_ca)
+		self.assertEqual(self._leaf.issuer_hash, self._intermediate.subject_hash)
+
+	def test_trust_store(self):
+		store = TrustStore([ self._root, self._intermediate ])
+		self.assertEqual(len(store), 2)
+		self.assertEqual(store.find_issuers(self._leaf), [ self._intermediate ])
+		self.assertEqual(store.find_issuers(self._intermediate), [ self._root ])
+		self.assertEqual(store.find_issuers(self._root), [ self._root ])
+		self.assertTrue(self._root in store)
+		self.assertFalse(self._leaf in store)
+
+	def test_verify(self):
+		verifier = ChainVerifier(TrustStore([ self._root ]), signature_verifier = SignatureVerifier())
+		result = verifier.verify([ self._leaf, self._intermediate ])
+		self.assertTrue(result.valid)
+		self.assertEqual(result.chain, [ self._leaf, self._intermediate, self._root ])
+		self.assertEqual(verifier.signature_verifier.computed, 2)
+
+		# Verified pairs are memoized, even for newly parsed certificates
+		leaf = X509Certificate.frompemobj(_LEAF_CRT)
+		self.assertTrue(verifier.verify([ leaf, X509Certificate.frompemobj(_INTERMEDIATE_CRT) ]).valid)
+		self.assertEqual(verifier.signature_verifier.computed, 2)
+
+	def test_failures(self):
+		verifier = ChainVerifier(TrustStore([ self._root ]))
+		result = verifier.verify([ self._leaf ])
+		self.assertFalse(result.valid)
+		self.assertIn("No issuer", result.reason)
+		self.assertFalse(verifier.verify([ self._leaf, self._intermediate ], now = datetime.datetime(1990, 1, 1)).valid)
+		self.assertFalse(ChainVerifier(TrustStore([ self._intermediate ])).verify([ self._intermediate ], now = datetime.datetime(1990, 1, 1)).valid)
+
+		# Intermediate is not signed by the trust anchor
+		store = TrustStore().add_der(X509Certificate.frompemobj(_CRTDATA).derobj)
+		self.assertFalse(ChainVerifier(store).verify([ self._intermediate ]).valid)
+
+	def test_self_signed(self):
+		crt = X509Certificate.frompemobj(_CRTDATA)
+		verifier = ChainVerifier(TrustStore([ crt ]))
+		self.assertTrue(verifier.verify([ crt ], now = datetime.datetime(2015, 7, 1)).valid)
+		self.assertTrue(crt.publickey.verify_pkcs1("sha256", crt.raw_tbs, crt.raw_signature))
+		self.assertFalse(crt.publickey.verify_pkcs1("sha256", crt.raw_tbs + b"x", crt.raw_signature))
+
+	def test_weak_signatures(self):
+		root = X509Certificate.frompemobj(_WEAK_ROOT_CRT)
+		verifier = ChainVerifier(TrustStore([ root ]), signature_verifier = SignatureVerifier())
+		for (pemdata, hashname, algorithm) in [ (_MD5_LEAF_CRT, "md5", "md5WithRSAEncryption"), (_SHA1_LEAF_CRT, "sha1", "sha1WithRSAEncryption") ]:
+			leaf = X509Certificate.frompemobj(pemdata)
+			# The signature itself is correct, the algorithm is what is rejected
+			self.assertTrue(root.publickey.verify_pkcs1(hashname, leaf.raw_tbs, leaf.raw_signature))
+			self.assertFalse(verifier.signature_valid(root, leaf))
+			result = verifier.verify([ leaf ])
+			self.assertFalse(result.valid)
+			self.assertIn(algorithm, result.reason)
+		self.assertEqual(verifier.signature_verifier.computed, 0)
+		self.assertEqual(SignatureVerifier.rejected_algorithm("1.2.840.10045.4.1"), "ecdsa-with-SHA1")
+		self.assertEqual(SignatureVerifier.rejected_algorithm("1.2.840.113549.1.1.11"), None)
+
+	def test_undecodable_issuer_key(self):
+		p521 = X509Certificate.frompemobj(_P521_INTERMEDIATE_CRT)
+		verifier = ChainVerifier(TrustStore([ self._root ]), signature_verifier = SignatureVerifier())
+		self.assertFalse(verifier.signature_valid(p521, self._leaf))
+		self.assertEqual(len(verifier.signature_verifier), 1)
+		self.assertEqual(TrustStore([ p521, self._intermediate ]).find_issuers(self._leaf), [ p521, self._intermediate ])
+		result = verifier.verify([ self._leaf, p521, self._intermediate ])
+		self.assertTrue(result.valid)
+		self.assertEqual(result.chain, [ self._leaf, self._intermediate, self._root ])
+		result = verifier.verify([ self._leaf, p521 ])
+		self.assertFalse(result.valid)
+		self.assertIn("does not verify", result.reason)
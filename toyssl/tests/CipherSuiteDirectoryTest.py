@@ -0,0 +1,64 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+from toyssl.msg import CipherSuiteDirectory
+from toyssl.msg.Enums import CipherSuite
+
+class CipherSuiteDirectoryTest(unittest.TestCase):
+	def _reference(self, predicate):
+		return [ csuite.csid for csuite in CipherSuiteDirectory() if predicate(csuite) ]
+
+	def test_all(self):
+		directory = CipherSuiteDirectory()
+		self.assertEqual(len(directory), len(CipherSuite) - 2)
+		self.assertNotIn(CipherSuite.TLS_FALLBACK_SCSV, directory)
+		self.assertIn(CipherSuite.TLS_DHE_RSA_WITH_AES_128_CBC_SHA, directory)
+		suite = [ csuite for csuite in directory if csuite.csid == CipherSuite.TLS_DHE_RSA_WITH_AES_128_CBC_SHA ][0]
+		self.assertEqual(suite.key_exchange.identifier, "DHE")
+		self.assertEqual(suite.sig_algorithm.identifier, "RSA")
+		self.assertEqual(suite.cipher.identifier, "AES_128_CBC")
+		self.assertEqual(suite.prf.identifier, "SHA")
+
+	def test_kwfilter(self):
+		result = CipherSuiteDirectory().kwfilter(sig_alg = "RSA", kex_alg = "DH", kex_pfs = True, cipher_name = "AES", cipher_keylen = 128, cipher_opmode = "CBC")
+		self.assertEqual([ csuite.csid for csuite in result ], [ CipherSuite.TLS_DHE_RSA_WITH_AES_128_CBC_SHA, CipherSuite.TLS_DHE_RSA_WITH_AES_128_CBC_SHA256 ])
+		self.assertEqual(CipherSuiteDirectory().kwfilter(kex_alg = "DH", cipher_keylen = 256), CipherSuiteDirectory().kwfilter(cipher_keylen = 256).kwfilter(kex_alg = "DH"))
+		self.assertEqual(len(CipherSuiteDirectory().kwfilter()), len(CipherSuiteDirectory()))
+
+		reference = self._reference(lambda csuite: (csuite.cipher is not None) and (csuite.cipher.opmode == "GCM") and (csuite.prf.identifier == "SHA384"))
+		self.assertEqual([ csuite.csid for csuite in CipherSuiteDirectory().kwfilter(cipher_opmode = "GCM", prf = "SHA384") ], reference)
+
+	def test_subset(self):
+		directory = CipherSuiteDirectory([ CipherSuite.TLS_RSA_WITH_AES_128_CBC_SHA, CipherSuite.TLS_DHE_RSA_WITH_AES_256_CBC_SHA ])
+		self.assertEqual(len(directory), 2)
+		self.assertEqual([ csuite.csid for csuite in directory.kwfilter(kex_pfs = True) ], [ CipherSuite.TLS_DHE_RSA_WITH_AES_256_CBC_SHA ])
+		self.assertEqual(len(directory.kwfilter(kex_pfs = True)), 1)
+		self.assertEqual(len(directory & CipherSuiteDirectory().kwfilter(cipher_keylen = 128)), 1)
+
+	def test_filter_functions(self):
+		reference = self._reference(lambda csuite: (csuite.key_exchange is not None) and csuite.key_exchange.pfs and (csuite.cipher is not None) and (csuite.cipher.keylen >= 256))
+		result = CipherSuiteDirectory().filter_kex(lambda kex: kex.pfs).filter_cipher(lambda cipher: cipher.keylen >= 256)
+		self.assertEqual([ csuite.csid for csuite in result ], reference)
+		self.assertEqual(result, CipherSuiteDirectory().filter(lambda csuite: csuite.csid in reference))
+		for csuite in CipherSuiteDirectory().filter_secure():
+			self.assertTrue(csuite.provides_pfs)
+			self.assertEqual(csuite.sig_algorithm.identifier, "ECDSA")
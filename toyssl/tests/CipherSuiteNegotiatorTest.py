@@ -0,0 +1,97 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+from toyssl.msg import CipherSuiteDirectory, CipherSuiteNegotiator
+from toyssl.msg.CipherSuiteDirectory import VerboseCipherSuite
+from toyssl.msg.EnumTable import enum_table
+from toyssl.msg.Enums import CipherSuite, SupportedGroups
+
+class CipherSuiteNegotiatorTest(unittest.TestCase):
+	_PREFERENCE = [
+		CipherSuite.TLS_ECDHE_RSA_WITH_AES_256_GCM_SHA384,
+		CipherSuite.TLS_ECDHE_ECDSA_WITH_AES_128_GCM_SHA256,
+		CipherSuite.TLS_DHE_RSA_WITH_AES_256_CBC_SHA256,
+		CipherSuite.TLS_DHE_RSA_WITH_AES_128_CBC_SHA,
+		CipherSuite.TLS_RSA_WITH_AES_128_CBC_SHA,
+		CipherSuite.TLS_DH_anon_WITH_AES_128_CBC_SHA,
+	]
+
+	def setUp(self):
+		self._negotiator = CipherSuiteNegotiator(self._PREFERENCE, groups = [ SupportedGroups.secp256r1 ])
+
+	def test_server_preference(self):
+		offered = self._PREFERENCE[::-1]
+		self.assertEqual(self._negotiator.select(offered), CipherSuite.TLS_ECDHE_RSA_WITH_AES_256_GCM_SHA384)
+		self.assertEqual(self._negotiator.select(offered[:-1]), CipherSuite.TLS_DHE_RSA_WITH_AES_256_CBC_SHA256)
+		self.assertEqual(self._negotiator.select([ CipherSuite.TLS_RSA_WITH_RC4_128_SHA ]), None)
+		self.assertEqual(self._negotiator.select([ ]), None)
+
+	def test_unknown_offered(self):
+		offered = [ enum_table(CipherSuite)(0x0a0a), 0xfefe, CipherSuite.TLS_RSA_WITH_AES_128_CBC_SHA ]
+		self.assertEqual(self._negotiator.select(offered), CipherSuite.TLS_RSA_WITH_AES_128_CBC_SHA)
+
+	def test_key_types(self):
+		offered = self._PREFERENCE
+		self.assertEqual(self._negotiator.select(offered, key_types = [ "ECDSA" ]), CipherSuite.TLS_ECDHE_ECDSA_WITH_AES_128_GCM_SHA256)
+		self.assertEqual(self._negotiator.select(offered, key_types = [ ]), CipherSuite.TLS_DH_anon_WITH_AES_128_CBC_SHA)
+		self.assertIs(self._negotiator.rank_table([ "RSA" ]), self._negotiator.rank_table(( "RSA", )))
+
+	def test_groups(self):
+		offered = self._PREFERENCE
+		self.assertEqual(self._negotiator.select(offered, client_groups = [ SupportedGroups.secp384r1, SupportedGroups.secp256r1 ]), CipherSuite.TLS_ECDHE_RSA_WITH_AES_256_GCM_SHA384)
+		self.assertEqual(self._negotiator.select(offered, client_groups = [ SupportedGroups.secp384r1 ]), CipherSuite.TLS_DHE_RSA_WITH_AES_256_CBC_SHA256)
+		self.assertEqual(CipherSuiteNegotiator(self._PREFERENCE).select(offered), CipherSuite.TLS_ECDHE_RSA_WITH_AES_256_GCM_SHA384)
+		self.assertEqual(CipherSuiteNegotiator(self._PREFERENCE).select(offered, client_groups = [ SupportedGroups.secp256r1 ]), CipherSuite.TLS_DHE_RSA_WITH_AES_256_CBC_SHA256)
+
+	def test_prefer_cheap(self):
+		offered = [ CipherSuite.TLS_DHE_RSA_WITH_AES_256_CBC_SHA256, CipherSuite.TLS_ECDHE_ECDSA_WITH_AES_128_GCM_SHA256 ]
+		self.assertEqual(self._negotiator.select(offered, key_types = [ "RSA", "ECDSA" ]), CipherSuite.TLS_ECDHE_ECDSA_WITH_AES_128_GCM_SHA256)
+		offered = [ CipherSuite.TLS_DHE_RSA_WITH_AES_256_CBC_SHA256, CipherSuite.TLS_ECDHE_RSA_WITH_AES_256_GCM_SHA384 ]
+		negotiator = CipherSuiteNegotiator(offered, groups = [ SupportedGroups.secp256r1 ])
+		self.assertEqual(negotiator.select(offered), CipherSuite.TLS_DHE_RSA_WITH_AES_256_CBC_SHA256)
+		negotiator.prefer_cheap = True
+		self.assertEqual(negotiator.select(offered), CipherSuite.TLS_ECDHE_RSA_WITH_AES_256_GCM_SHA384)
+		self.assertEqual(negotiator.select(offered, prefer_cheap = False), CipherSuite.TLS_DHE_RSA_WITH_AES_256_CBC_SHA256)
+
+	def test_directory_policy(self):
+		negotiator = CipherSuiteNegotiator(CipherSuiteDirectory().kwfilter(kex_alg = "DH", kex_pfs = True, sig_alg = "RSA"))
+		offered = [ CipherSuite.TLS_RSA_WITH_AES_128_CBC_SHA, CipherSuite.TLS_DHE_RSA_WITH_AES_128_CBC_SHA, CipherSuite.TLS_FALLBACK_SCSV ]
+		self.assertEqual(negotiator.select(offered), CipherSuite.TLS_DHE_RSA_WITH_AES_128_CBC_SHA)
+
+	def test_tls10_server_policy(self):
+		negotiator = CipherSuiteNegotiator.tls10_dhe_rsa()
+		offered = [ CipherSuite.TLS_DHE_RSA_WITH_AES_128_GCM_SHA256, CipherSuite.TLS_DHE_RSA_WITH_AES_128_CBC_SHA, CipherSuite.TLS_DHE_RSA_WITH_3DES_EDE_CBC_SHA, CipherSuite.TLS_DHE_RSA_WITH_DES_CBC_SHA ]
+		self.assertEqual(negotiator.select(offered), CipherSuite.TLS_DHE_RSA_WITH_AES_128_CBC_SHA)
+		self.assertEqual(negotiator.select(offered[::-1]), CipherSuite.TLS_DHE_RSA_WITH_AES_128_CBC_SHA)
+
+		# Whatever the client offers, only TLS 1.0 capable strong suites are picked
+		for prefer_cheap in [ False, True ]:
+			for csuite in CipherSuite:
+				selected = negotiator.select([ csuite ], prefer_cheap = prefer_cheap)
+				if selected is None:
+					continue
+				verbose = VerboseCipherSuite.getsuite(selected)
+				self.assertEqual(verbose.prf.identifier, "SHA")
+				self.assertFalse(verbose.key_exchange.export)
+				self.assertEqual(verbose.cipher.cipher, "AES")
+				self.assertGreaterEqual(verbose.cipher.keylen, 128)
+				self.assertFalse(verbose.cipher.aead)
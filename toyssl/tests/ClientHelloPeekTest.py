@@ -0,0 +1,117 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+from toyssl.msg.MsgBuffer import MsgBuffer
+from toyssl.msg.handshake import ClientHelloPkt, ClientHelloView, peek_client_hello, ClientHelloPeekException
+from toyssl.msg.handshake.HelloExtension import BaseHelloExtension, HelloExtensionServerName, HelloExtensionALPN
+from toyssl.msg.Enums import SSLVersion, CipherSuite, CompressionMethod, ExtensionType
+
+class ClientHelloPeekTest(unittest.TestCase):
+	def _client_hello(self, extensions = True):
+		client_hello = ClientHelloPkt(SSLVersion.ProtocolTLSv1_2)
+		client_hello.add_cipher_suite(CipherSuite.TLS_DHE_RSA_WITH_AES_128_CBC_SHA)
+		client_hello.add_cipher_suite(CipherSuite.TLS_RSA_WITH_AES_256_CBC_SHA)
+		client_hello.add_compression_method(CompressionMethod.null)
+		if extensions:
+			client_hello.add_extension(HelloExtensionServerName("Www.Example.com"))
+			client_hello.add_extension(HelloExtensionALPN().add_protocol(b"h2").add_protocol(b"http/1.1"))
+			client_hello.add_extension(BaseHelloExtension(ExtensionType.supported_versions, MsgBuffer(b"\x04\x03\x04\x03\x03")))
+		return client_hello.serialize().data
+
+	@staticmethod
+	def _records(message, fragment_length = 16384):
+		records = b""
+		for i in range(0, len(message), fragment_length):
+			fragment = message[i : i + fragment_length]
+			records += bytes([ 0x16, 0x03, 0x01 ]) + len(fragment).to_bytes(2, "big") + fragment
+		return records
+
+	def test_peek(self):
+		data = self._records(self._client_hello())
+		result = peek_client_hello(data + b"\x17\x03\x03")
+		self.assertEqual(result.record_version, 0x0301)
+		self.assertEqual(result.client_version, 0x0303)
+		self.assertEqual(result.versions, [ 0x0304, 0x0303 ])
+		self.assertEqual(result.servername, "www.example.com")
+		self.assertEqual(result.alpn_protocols, [ b"h2", b"http/1.1" ])
+		self.assertEqual(result.cipher_suite_ids, (int(CipherSuite.TLS_DHE_RSA_WITH_AES_128_CBC_SHA), int(CipherSuite.TLS_RSA_WITH_AES_256_CBC_SHA)))
+		self.assertEqual(result.length, len(data))
+
+	def test_no_extensions(self):
+		result = peek_client_hello(self._records(self._client_hello(extensions = False)))
+		self.assertEqual(result.versions, [ 0x0303 ])
+		self.assertEqual(result.servername, None)
+		self.assertEqual(result.alpn_protocols, [ ])
+
+	def test_fragmented(self):
+		message = self._client_hello()
+		data = self._records(message, fragment_length = 7)
+		result = peek_client_hello(data)
+		self.assertEqual(result.servername, "www.example.com")
+		self.assertEqual(result.length, len(data))
+		for cut in range(len(data)):
+			self.assertEqual(peek_client_hello(data[ : cut]), None)
+
+	def test_fragmented_header(self):
+		message = self._client_hello()
+		for fragment_length in [ 1, 2, 3, 5 ]:
+			data = self._records(message, fragment_length = fragment_length)
+			result = peek_client_hello(data)
+			self.assertEqual(result.servername, "www.example.com")
+			self.assertEqual(result.length, len(data))
+		data = self._records(message[:3], fragment_length = 3) + self._records(message[3:])
+		self.assertEqual(peek_client_hello(data).length, len(data))
+		self.assertEqual(peek_client_hello(data[:5 + 3 + 5]), None)
+		with self.assertRaises(ClientHelloPeekException):
+			peek_client_hello(self._records(b"\x02" + message[1:], fragment_length = 2))
+
+	def test_non_ascii_servername(self):
+		hostname = "b\xfccher.example".encode("latin-1")
+		sni = MsgBuffer()
+		sni.add_uint16(1 + 2 + len(hostname))
+		sni.add_uint8(0)
+		sni.add_opaque(2, hostname)
+		client_hello = ClientHelloPkt(SSLVersion.ProtocolTLSv1_2)
+		client_hello.add_cipher_suite(CipherSuite.TLS_DHE_RSA_WITH_AES_128_CBC_SHA)
+		client_hello.add_compression_method(CompressionMethod.null)
+		client_hello.add_extension(BaseHelloExtension(ExtensionType.server_name, sni))
+		data = client_hello.serialize().data
+		self.assertEqual(peek_client_hello(self._records(data)).servername, None)
+		view = ClientHelloView(data)
+		self.assertEqual(view.get_extension(ExtensionType.server_name).hostname, None)
+		self.assertEqual(view.to_packet().get_extension(ExtensionType.server_name).hostname, None)
+
+	def test_malformed(self):
+		with self.assertRaises(ClientHelloPeekException):
+			peek_client_hello(b"GET / HTTP/1.1\r\n\r\n")
+		data = bytearray(self._records(self._client_hello()))
+		# supported_versions list length exceeds the extension
+		data[-5] = 6
+		with self.assertRaises(ClientHelloPeekException):
+			peek_client_hello(bytes(data))
+
+	def test_extensions_roundtrip(self):
+		data = self._client_hello()
+		view = ClientHelloView(data)
+		self.assertEqual(view.get_extension(ExtensionType.server_name).hostname, "Www.Example.com")
+		self.assertEqual(view.get_extension(ExtensionType.application_layer_protocol_negotiation).protocols, [ b"h2", b"http/1.1" ])
+		self.assertEqual(view.to_packet().serialize().data, data)
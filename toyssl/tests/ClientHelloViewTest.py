@@ -0,0 +1,79 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+from toyssl.msg.MsgBuffer import MsgBuffer
+from toyssl.msg.handshake import ClientHelloPkt, ClientHelloView
+from toyssl.msg.handshake.HelloExtension import BaseHelloExtension, HelloExtensionSignatureAlgs
+from toyssl.msg.Enums import SSLVersion, CipherSuite, CompressionMethod, ExtensionType, SignatureAlgorithm, HashAlgorithm
+
+class ClientHelloViewTest(unittest.TestCase):
+	def _client_hello(self, extensions = True):
+		client_hello = ClientHelloPkt(SSLVersion.ProtocolTLSv1_2)
+		for cipher_suite in list(CipherSuite)[:120]:
+			client_hello.add_cipher_suite(cipher_suite)
+		client_hello.add_compression_method(CompressionMethod.null)
+		if extensions:
+			client_hello.add_extension(BaseHelloExtension(ExtensionType.heartbeat, MsgBuffer(b"\x01")))
+			client_hello.add_extension(HelloExtensionSignatureAlgs().add_algorithm(SignatureAlgorithm.RSA, HashAlgorithm.sha256))
+		return client_hello
+
+	def test_fields(self):
+		client_hello = self._client_hello()
+		view = ClientHelloView(client_hello.serialize())
+		self.assertEqual(view.proto_version, SSLVersion.ProtocolTLSv1_2)
+		self.assertEqual(view.random, client_hello.random.data)
+		self.assertEqual(view.session_id, b"")
+		self.assertEqual(view.cipher_suite_count, 120)
+		self.assertEqual(view.cipher_suites, list(CipherSuite)[:120])
+		self.assertTrue(view.offers_cipher_suite(list(CipherSuite)[5]))
+		self.assertFalse(view.offers_cipher_suite(list(CipherSuite)[150]))
+		self.assertEqual(view.compression_methods, [ CompressionMethod.null ])
+		self.assertEqual(view.extension_ids, [ ExtensionType.heartbeat, ExtensionType.signature_algorithms ])
+		self.assertEqual(bytes(view.get_extension_data(ExtensionType.heartbeat)), b"\x01")
+		self.assertEqual(view.get_extension(ExtensionType.padding), None)
+		self.assertEqual(str(view.to_packet()), str(client_hello))
+
+	def test_lazy(self):
+		data = bytearray(self._client_hello().serialize().data)
+		# Replace the first cipher suite by an unknown value
+		data[4 + 2 + 32 + 1 + 2 : 4 + 2 + 32 + 1 + 4] = b"\xfe\xfe"
+		view = ClientHelloView(data)
+		self.assertEqual(view.cipher_suite_ids[0], 0xfefe)
+		self.assertTrue(isinstance(view.get_extension(ExtensionType.signature_algorithms), HelloExtensionSignatureAlgs))
+		self.assertEqual(view.cipher_suites[0], 0xfefe)
+		self.assertEqual(view.cipher_suites[0].name, "unknown(0xfefe)")
+		self.assertEqual(view.cipher_suites[1 : ], list(CipherSuite)[1 : 120])
+
+	def test_no_extensions(self):
+		view = ClientHelloView(self._client_hello(extensions = False).serialize().data)
+		self.assertEqual(view.extension_ids, [ ])
+		self.assertEqual(view.extensions, [ ])
+
+	def test_malformed(self):
+		data = self._client_hello().serialize().data
+		for cut in [ 10, 40, 100, len(data) - 1 ]:
+			truncated = bytearray(data[ : cut])
+			truncated[1 : 4] = (cut - 4).to_bytes(3, "big")
+			with self.assertRaises(Exception):
+				ClientHelloView(truncated)
+		with self.assertRaises(Exception):
+			ClientHelloView(data + b"\x00")
@@ -0,0 +1,69 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+from toyssl.x509.DERScanner import DERScanner, DERTag, der_read_header, der_decode_oid, der_decode_integer
+from toyssl.x509 import X509Certificate
+from toyssl.x509.PEMEncoder import pem_decode
+from .X509CrtParser import _CRTDATA
+
+class DERScannerTest(unittest.TestCase):
+	def setUp(self):
+		self._der = pem_decode(_CRTDATA.split("\n"), "CERTIFICATE")
+
+	def test_primitives(self):
+		self.assertEqual(der_read_header(b"\x02\x01\x05", 0, 3), (DERTag.INTEGER, 2, 3))
+		self.assertEqual(der_read_header(b"\x04\x81\x80" + bytes(128), 0, 131), (DERTag.OCTET_STRING, 3, 131))
+		self.assertEqual(der_decode_oid(bytes.fromhex("2a864886f70d01010b")), "1.2.840.113549.1.1.11")
+		self.assertEqual(der_decode_oid(bytes.fromhex("551d0e")), "2.5.29.14")
+		self.assertEqual(der_decode_integer(b"\x00\xff"), 255)
+		self.assertEqual(der_decode_integer(b"\xff"), -1)
+		with self.assertRaises(Exception):
+			der_read_header(b"\x02\x05\x00", 0, 3)
+		with self.assertRaises(Exception):
+			der_read_header(b"\x30\x80\x00\x00", 0, 4)
+
+	def test_certificate(self):
+		scanner = DERScanner(self._der)
+		self.assertTrue(scanner.has("version"))
+		self.assertEqual(der_decode_integer(scanner.value("serial")), 0xd41491642c7285fb)
+		self.assertEqual(scanner.tag("not_before"), DERTag.UTCTime)
+		self.assertEqual(bytes(scanner.value("not_after")), b"150723084959Z")
+		self.assertEqual(scanner.extension_count, 3)
+		self.assertEqual([ (oid, critical) for (oid, critical, value) in scanner.extensions() ], [ ("2.5.29.14", False), ("2.5.29.35", False), ("2.5.29.19", False) ])
+		(start, end) = scanner.value_offsets("subject")
+		self.assertEqual(scanner.tlv("subject"), self._der[start - 2 : end])
+
+	def test_malformed(self):
+		with self.assertRaises(Exception):
+			DERScanner(self._der[:-1])
+		with self.assertRaises(Exception):
+			DERScanner(self._der + b"\x00")
+
+	def test_raw_fields(self):
+		crt = X509Certificate.fromderobj(self._der)
+		self.assertEqual(crt.raw_tbs, self._der[4 : 4 + 0x1dd + 4])
+		self.assertEqual(crt.serial, 0xd41491642c7285fb)
+		self.assertEqual(crt.raw_subject, crt.raw_issuer)
+		self.assertEqual(len(crt.raw_signature), 256)
+		self.assertEqual(crt.publickey.n.bit_length(), 2048)
+		self.assertEqual(crt.extensions[2], ("2.5.29.19", False, bytes.fromhex("30030101ff")))
+		self.assertEqual(str(crt.signature_alg[0]), "1.2.840.113549.1.1.11")
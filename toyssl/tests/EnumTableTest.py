@@ -0,0 +1,93 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+from toyssl.msg.MsgBuffer import MsgBuffer
+from toyssl.msg.RecordLayerPkt import RecordLayerPkt
+from toyssl.msg.Schema import HandshakeSchema
+from toyssl.msg.handshake import ClientHelloPkt
+from toyssl.msg.handshake.HelloExtension import BaseHelloExtension, HelloExtensionSupportedGroups
+from toyssl.msg.EnumTable import EnumTable, UnknownEnumValue, enum_table, is_enum_value
+from toyssl.msg.Enums import SSLVersion, CipherSuite, CompressionMethod, ContentType, ExtensionType, SupportedGroups
+
+class EnumTableTest(unittest.TestCase):
+	def test_decode(self):
+		table = enum_table(CipherSuite)
+		self.assertIs(table, enum_table(CipherSuite))
+		self.assertEqual(len(table), 65536)
+		self.assertEqual(len(enum_table(ContentType)), 256)
+		self.assertIs(table(int(CipherSuite.TLS_RSA_WITH_AES_128_CBC_SHA)), CipherSuite.TLS_RSA_WITH_AES_128_CBC_SHA)
+
+		grease = table(0x1a1a)
+		self.assertTrue(isinstance(grease, UnknownEnumValue))
+		self.assertIs(table(0x1a1a), grease)
+		self.assertEqual(grease, 0x1a1a)
+		self.assertEqual(hash(grease), hash(0x1a1a))
+		self.assertEqual(grease.name, "unknown(0x1a1a)")
+		self.assertEqual(str(grease), "CipherSuite.unknown(0x1a1a)")
+		self.assertEqual(enum_table(ContentType)(0x1234).name, "unknown(0x1234)")
+
+	def test_decode_all(self):
+		table = enum_table(CipherSuite)
+		suites = list(CipherSuite)[:10]
+		self.assertEqual(table.decode_all([ int(suite) for suite in suites ]), suites)
+		decoded = table.decode_all([ 0x2a2a ] + [ int(suite) for suite in suites ])
+		self.assertEqual(decoded[0].name, "unknown(0x2a2a)")
+		self.assertEqual(decoded[1 : ], suites)
+
+	def test_is_enum_value(self):
+		self.assertTrue(is_enum_value(CipherSuite.TLS_RSA_WITH_AES_128_CBC_SHA, CipherSuite))
+		self.assertTrue(is_enum_value(enum_table(CipherSuite)(0x3a3a), CipherSuite))
+		self.assertFalse(is_enum_value(enum_table(ExtensionType)(0x3a3a), CipherSuite))
+		self.assertFalse(is_enum_value(0x3a3a, CipherSuite))
+		self.assertTrue(enum_table(ExtensionType).is_member(enum_table(ExtensionType)(0x3a3a)))
+
+	def test_grease_client_hello(self):
+		client_hello = ClientHelloPkt(SSLVersion.ProtocolTLSv1_2)
+		client_hello.add_cipher_suite(enum_table(CipherSuite)(0x4a4a))
+		client_hello.add_cipher_suite(CipherSuite.TLS_RSA_WITH_AES_128_CBC_SHA)
+		client_hello.add_compression_method(CompressionMethod.null)
+		client_hello.add_extension(BaseHelloExtension(enum_table(ExtensionType)(0x5a5a), MsgBuffer(b"")))
+		data = client_hello.serialize().data
+
+		annotate = HandshakeSchema.annotate
+		try:
+			for HandshakeSchema.annotate in [ True, False ]:
+				parsed = ClientHelloPkt.parse(MsgBuffer(data))
+				self.assertEqual(parsed.serialize().data, data)
+				self.assertEqual(parsed.get_extension(0x5a5a).extensiontype.name, "unknown(0x5a5a)")
+		finally:
+			HandshakeSchema.annotate = annotate
+
+	def test_grease_extension(self):
+		groups = MsgBuffer()
+		groups.add_uint16(4)
+		groups.add_uint16(0x6a6a)
+		groups.add_uint16(int(SupportedGroups.secp256r1))
+		groups.seek(0)
+		extension = HelloExtensionSupportedGroups.parse(ExtensionType.supported_groups, groups)
+		self.assertEqual(str(extension), "HelloExtensionSupportedGroups<[<SupportedGroups.unknown(0x6a6a)>, <SupportedGroups.secp256r1: 23>]>")
+
+	def test_record_layer(self):
+		msg = MsgBuffer(b"\x63\x7a\x7a\x00\x01\x00")
+		record = RecordLayerPkt.parse(msg)
+		self.assertEqual(record.contenttype, 0x63)
+		self.assertEqual(record.serialize().data, msg.data)
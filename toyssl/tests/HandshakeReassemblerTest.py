@@ -0,0 +1,78 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+from toyssl.msg import Protocol
+from toyssl.msg.HandshakeReassembler import HandshakeReassembler
+from toyssl.msg.RecordWriter import RecordWriter
+from toyssl.msg.Enums import ContentType
+from toyssl.msg.MsgBuffer import MsgBuffer
+from toyssl.msg.handshake import CertificatePkt, ServerHelloDonePkt
+
+class HandshakeReassemblerTest(unittest.TestCase):
+	def test_coalesced(self):
+		reassembler = HandshakeReassembler()
+		reassembler.put(b"\x02\x00\x00\x03abc\x0e\x00\x00\x00\x0b\x00\x00")
+		messages = [ msgbuf.data for msgbuf in reassembler ]
+		self.assertEqual(messages, [ b"\x02\x00\x00\x03abc", b"\x0e\x00\x00\x00" ])
+		self.assertEqual(reassembler.buffered, 3)
+		reassembler.put(b"\x01")
+		self.assertEqual(reassembler.get(), None)
+		reassembler.put(b"x")
+		self.assertEqual(reassembler.get().data, b"\x0b\x00\x00\x01x")
+		self.assertEqual(reassembler.buffered, 0)
+
+	def test_fragmented(self):
+		message = b"\x0b\x00\x01\x00" + bytes(range(256))
+		reassembler = HandshakeReassembler()
+		for offset in range(0, len(message), 3):
+			self.assertEqual(reassembler.get(), None)
+			reassembler.put(message[offset : offset + 3])
+		self.assertEqual(reassembler.get().data, message)
+		self.assertEqual(reassembler.get(), None)
+
+	def test_oversized(self):
+		reassembler = HandshakeReassembler(max_message_length = 100)
+		reassembler.put(b"\x0b\x00\x00\x65")
+		with self.assertRaises(Exception):
+			reassembler.get()
+
+	def test_protocol_across_records(self):
+		certificate = CertificatePkt()
+		certificate.add_cert(bytes([ 0x55 ]) * 20000)
+		sent = [ ]
+		writer = RecordWriter(Protocol(), sent.append)
+		writer.begin_flight()
+		writer.add_message(ContentType.Handshake, certificate.serialize().data)
+		writer.add_message(ContentType.Handshake, ServerHelloDonePkt().serialize().data)
+		writer.flush()
+
+		data = b"".join(sent[0])
+		protocol = Protocol()
+		results = [ ]
+		while len(data) > 0:
+			length = 5 + ((data[3] << 8) | data[4])
+			results.append(protocol.parse(MsgBuffer(data[ : length ])))
+			data = data[length : ]
+		self.assertEqual(len(results), 2)
+		self.assertEqual(results[0], [ ])
+		self.assertEqual([ type(layered.application) for layered in results[1] ], [ CertificatePkt, ServerHelloDonePkt ])
+		self.assertEqual(results[1][0].application.get_cert(0), certificate.get_cert(0))
@@ -0,0 +1,48 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+from toyssl.utils import LRUCache
+
+class LRUCacheTest(unittest.TestCase):
+	def test_eviction(self):
+		cache = LRUCache(2)
+		cache.put("a", 1)
+		cache.put("b", 2)
+		self.assertEqual(cache.get("a"), 1)
+		cache.put("c", 3)
+		self.assertEqual(len(cache), 2)
+		self.assertNotIn("b", cache)
+		self.assertEqual(cache.get("b", "missing"), "missing")
+		self.assertEqual(cache.get("a"), 1)
+		self.assertEqual(cache.get("c"), 3)
+		self.assertEqual((cache.hits, cache.misses, cache.evictions), (3, 1, 1))
+
+	def test_get_or_create(self):
+		cache = LRUCache(4)
+		created = [ ]
+		create = lambda key: created.append(key) or key.upper()
+		self.assertEqual(cache.get_or_create("x", create), "X")
+		self.assertEqual(cache.get_or_create("x", create), "X")
+		self.assertEqual(created, [ "x" ])
+		cache.put("y", None)
+		self.assertIs(cache.get_or_create("y", create), None)
+		self.assertEqual(created, [ "x" ])
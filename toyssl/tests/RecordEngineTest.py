@@ -0,0 +1,87 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+import struct
+from Crypto.Cipher import AES
+from toyssl.crypto.RecordEngine import NullRecordEngine, AESGCMRecordEngine
+
+class RecordEngineTest(unittest.TestCase):
+	_KEY = bytes.fromhex("000102030405060708090a0b0c0d0e0f")
+	_SALT = bytes.fromhex("a0a1a2a3")
+
+	def test_gcm_roundtrip(self):
+		sender = AESGCMRecordEngine(self._KEY, self._SALT)
+		receiver = AESGCMRecordEngine(self._KEY, self._SALT)
+		for plaintext in [ b"", b"foobar", bytes(range(256)) * 70 ]:
+			record = bytearray(sender.sealed_length(len(plaintext)))
+			self.assertEqual(sender.seal_into(23, 0x0303, plaintext, record), len(record))
+			self.assertEqual(struct.unpack_from(">BHH", record), (23, 0x0303, len(record) - 5))
+
+			output = bytearray(receiver.opened_length(len(record)))
+			opened = receiver.open_into(record, output)
+			self.assertEqual(opened.content_type, 23)
+			self.assertEqual(opened.length, len(plaintext))
+			self.assertEqual(output, plaintext)
+		self.assertEqual(sender.seqno, 3)
+		self.assertEqual(receiver.seqno, 3)
+
+	def test_gcm_wire_format(self):
+		engine = AESGCMRecordEngine(self._KEY, self._SALT)
+		engine.seal(22, 0x0303, b"first")
+		record = engine.seal(23, 0x0303, b"Hello World")[0]
+
+		# Explicit nonce is the sequence number, AAD is seq || type || version || length
+		self.assertEqual(record[5 : 13], bytes.fromhex("0000000000000001"))
+		cipher = AES.new(self._KEY, AES.MODE_GCM, nonce = self._SALT + record[5 : 13], mac_len = 16)
+		cipher.update(bytes.fromhex("0000000000000001 17 0303 000b"))
+		(ciphertext, tag) = cipher.encrypt_and_digest(b"Hello World")
+		self.assertEqual(record[13 : ], ciphertext + tag)
+
+	def test_gcm_tamper(self):
+		sender = AESGCMRecordEngine(self._KEY, self._SALT)
+		receiver = AESGCMRecordEngine(self._KEY, self._SALT)
+		record = sender.seal(23, 0x0303, b"secret data")[0]
+		record[20] ^= 0x01
+		output = bytearray(receiver.opened_length(len(record)))
+		with self.assertRaises(Exception):
+			receiver.open_into(record, output)
+		self.assertEqual(output, bytes(len(output)))
+		self.assertEqual(receiver.seqno, 0)
+
+	def test_gcm_out_of_order(self):
+		sender = AESGCMRecordEngine(self._KEY, self._SALT)
+		receiver = AESGCMRecordEngine(self._KEY, self._SALT)
+		sender.seal(23, 0x0303, b"skipped")
+		record = sender.seal(23, 0x0303, b"second")[0]
+		with self.assertRaises(Exception):
+			receiver.open(record)
+
+	def test_null(self):
+		engine = NullRecordEngine()
+		plaintext = memoryview(b"unprotected")
+		iovecs = engine.seal(22, 0x0301, plaintext)
+		self.assertIs(iovecs[1], plaintext)
+		record = b"".join(iovecs)
+		self.assertEqual(record, b"\x16\x03\x01\x00\x0bunprotected")
+		(opened, payload) = NullRecordEngine().open(record)
+		self.assertEqual(opened.content_type, 22)
+		self.assertEqual(bytes(payload), b"unprotected")
@@ -0,0 +1,105 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+from toyssl.msg import Protocol
+from toyssl.msg.RecordWriter import RecordWriter
+from toyssl.msg.RecordLayerPkt import RecordLayerPkt
+from toyssl.msg.MsgBuffer import MsgBuffer
+from toyssl.msg.Enums import ContentType, SSLVersion
+from toyssl.msg.handshake import CertificatePkt
+
+class RecordWriterTest(unittest.TestCase):
+	@staticmethod
+	def _records(iovecs):
+		data = b"".join(iovecs)
+		records = [ ]
+		while len(data) > 0:
+			length = (data[3] << 8) | data[4]
+			records.append((data[0], data[5 : 5 + length]))
+			data = data[5 + length : ]
+		return records
+
+	def test_flight_shared_record(self):
+		sent = [ ]
+		writer = RecordWriter(Protocol(), sent.append)
+		writer.begin_flight()
+		writer.add_message(ContentType.Handshake, b"\x02msg1")
+		writer.add_message(ContentType.Handshake, b"\x0bmsg2")
+		writer.add_message(ContentType.Handshake, b"\x0emsg3")
+		self.assertEqual(sent, [ ])
+		writer.flush()
+		self.assertFalse(writer.in_flight)
+		self.assertEqual(len(sent), 1)
+		self.assertEqual(self._records(sent[0]), [ (22, b"\x02msg1\x0bmsg2\x0emsg3") ])
+
+	def test_flight_split(self):
+		sent = [ ]
+		writer = RecordWriter(Protocol(), sent.append)
+		msg1 = bytes([ 1 ]) * 10000
+		msg2 = bytes([ 2 ]) * 10000
+		writer.begin_flight()
+		writer.add_message(ContentType.Handshake, msg1)
+		writer.add_message(ContentType.Handshake, msg2)
+		writer.add_message(ContentType.ChangeCipherSpec, b"\x01")
+		writer.flush()
+		self.assertEqual(len(sent), 1)
+		records = self._records(sent[0])
+		self.assertEqual([ (content_type, len(payload)) for (content_type, payload) in records ], [ (22, 16384), (22, 20000 - 16384), (20, 1) ])
+		self.assertEqual(records[0][1] + records[1][1], msg1 + msg2)
+
+	def test_flight_write_order(self):
+		sent = [ ]
+		writer = RecordWriter(Protocol(), sent.append)
+		writer.write(b"early")
+		writer.begin_flight()
+		writer.add_message(ContentType.Handshake, b"\x14fin1")
+		writer.write(b"late")
+		self.assertFalse(writer.in_flight)
+		writer.flush()
+		records = [ record for iovecs in sent for record in self._records(iovecs) ]
+		self.assertEqual(records, [ (23, b"early"), (22, b"\x14fin1"), (23, b"late") ])
+
+	def test_no_flight(self):
+		sent = [ ]
+		writer = RecordWriter(Protocol(), sent.append)
+		writer.add_message(ContentType.Handshake, b"\x0e\x00\x00\x00")
+		writer.add_message(ContentType.Handshake, b"\x0e\x00\x00\x00")
+		self.assertEqual(len(sent), 2)
+
+	def test_large_message(self):
+		certificate = CertificatePkt()
+		for i in range(4):
+			certificate.add_cert(bytes([ i ]) * 10000)
+		msgbuf = Protocol().serialize_message(certificate).data
+		sent = [ ]
+		writer = RecordWriter(Protocol(), sent.append)
+		writer.add_message(ContentType.Handshake, msgbuf.view)
+		self.assertEqual(len(sent), 1)
+		payloads = sent[0][1::2]
+		self.assertEqual([ len(payload) for payload in payloads ], [ 16384, 16384, len(msgbuf) - 2 * 16384 ])
+		self.assertTrue(all(payload.obj is msgbuf.view.obj for payload in payloads))
+		self.assertEqual(b"".join(payloads), msgbuf.data)
+
+	def test_record_layer_oversized(self):
+		record = RecordLayerPkt(ContentType.Handshake, SSLVersion.ProtocolTLSv1_0, MsgBuffer(bytes(16385)))
+		with self.assertRaises(Exception):
+			record.serialize()
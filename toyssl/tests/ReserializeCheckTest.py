@@ -0,0 +1,72 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+from toyssl.msg.ReserializeCheck import ReserializeCheck
+from toyssl.msg.MsgBuffer import MsgBuffer
+from toyssl.msg.handshake import ServerHelloDonePkt
+from toyssl.msg.changecipherspec import ChangeCipherSpecPkt
+
+class _BrokenPkt(object):
+	def serialize(self):
+		return MsgBuffer(b"\x0e\x00\x00\x00")
+
+	@staticmethod
+	def parse(msg):
+		return _BrokenPkt._Reparsed()
+
+	class _Reparsed(object):
+		def serialize(self):
+			return MsgBuffer(b"\x0e\x00\x00\x01")
+
+class ReserializeCheckTest(unittest.TestCase):
+	def test_always(self):
+		check = ReserializeCheck()
+		for pkt in [ ServerHelloDonePkt(), ChangeCipherSpecPkt() ]:
+			self.assertTrue(check.verify(pkt, pkt.serialize()))
+		self.assertEqual(check.stats.counters, { "checks": 2 })
+
+	def test_off(self):
+		check = ReserializeCheck(mode = "off")
+		pkt = ServerHelloDonePkt()
+		self.assertFalse(check.verify(pkt, pkt.serialize()))
+		self.assertEqual(check.stats.counters, { "skipped": 1 })
+
+	def test_sampled(self):
+		check = ReserializeCheck(mode = "sampled", sample_interval = 4)
+		pkt = ServerHelloDonePkt()
+		results = [ check.verify(pkt, pkt.serialize()) for i in range(10) ]
+		self.assertEqual(results, [ False, False, False, True ] * 2 + [ False, False ])
+		self.assertEqual(check.stats.counters, { "checks": 2, "skipped": 8 })
+
+	def test_mismatch(self):
+		check = ReserializeCheck()
+		pkt = _BrokenPkt()
+		with self.assertLogs("toyssl", level = "ERROR"):
+			self.assertFalse(check.verify(pkt, pkt.serialize()))
+			self.assertFalse(check.verify(ServerHelloDonePkt(), MsgBuffer(b"\x0e\x00")))
+		self.assertEqual(check.stats.counters, { "checks": 2, "mismatches": 2 })
+
+	def test_invalid_config(self):
+		with self.assertRaises(Exception):
+			ReserializeCheck(mode = "sometimes")
+		with self.assertRaises(Exception):
+			ReserializeCheck(mode = "sampled", sample_interval = 0)
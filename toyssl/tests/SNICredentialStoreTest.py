@@ -0,0 +1,101 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import os
+import shutil
+import tempfile
+import unittest
+from Crypto.PublicKey import RSA
+from toyssl.x509 import CredentialStore, SNICredentialStore
+from toyssl.x509.PEMEncoder import pem_encode
+from toyssl.crypto.KexParams import DHModPKexParams
+from .X509CrtParser import _CRTDATA
+
+class SNICredentialStoreTest(unittest.TestCase):
+	_NAMES = [ "example.com", "www.example.com", "*.example.com", "*.dev.example.com", "example.org" ]
+
+	@classmethod
+	def setUpClass(cls):
+		cls._tmpdir = tempfile.mkdtemp()
+		cls._dhfile = os.path.join(cls._tmpdir, "dhp.pem")
+		with open(cls._dhfile, "w") as f:
+			f.write("\n".join(pem_encode(DHModPKexParams((1 << 1023) + 1155, 2).serialize(), "DH PARAMETERS")) + "\n")
+		key = "\n".join(pem_encode(RSA.generate(1024).export_key(format = "DER", pkcs = 8), "PRIVATE KEY")) + "\n"
+		cls._sni_dir = os.path.join(cls._tmpdir, "sni")
+		os.mkdir(cls._sni_dir)
+		for name in cls._NAMES + [ "default" ]:
+			with open(os.path.join(cls._sni_dir if (name != "default") else cls._tmpdir, name + ".crt"), "w") as f:
+				f.write(_CRTDATA)
+			with open(os.path.join(cls._sni_dir if (name != "default") else cls._tmpdir, name + ".key"), "w") as f:
+				f.write(key)
+
+	@classmethod
+	def tearDownClass(cls):
+		shutil.rmtree(cls._tmpdir)
+
+	def _store(self, default = None, cache_size = 128):
+		return SNICredentialStore(default = default, cache_size = cache_size).add_directory(self._sni_dir, self._dhfile)
+
+	def _lookup(self, store, servername):
+		filenames = store.lookup(servername)
+		return None if (filenames is None) else os.path.basename(filenames[0])[:-4]
+
+	def test_lookup(self):
+		store = self._store()
+		self.assertEqual(len(store), len(self._NAMES))
+		self.assertEqual(self._lookup(store, "example.com"), "example.com")
+		self.assertEqual(self._lookup(store, "WWW.Example.COM."), "www.example.com")
+		self.assertEqual(self._lookup(store, "mail.example.com"), "*.example.com")
+		self.assertEqual(self._lookup(store, "dev.example.com"), "*.example.com")
+		self.assertEqual(self._lookup(store, "a.dev.example.com"), "*.dev.example.com")
+		self.assertEqual(self._lookup(store, "a.b.example.com"), None)
+		self.assertEqual(self._lookup(store, "example.org"), "example.org")
+		self.assertEqual(self._lookup(store, "www.example.org"), None)
+		self.assertEqual(self._lookup(store, "com"), None)
+		self.assertEqual(self._lookup(store, ""), None)
+
+	def test_invalid_name(self):
+		store = SNICredentialStore()
+		for name in [ "*", "www.*.example.com", "a..b" ]:
+			with self.assertRaises(Exception):
+				store.add(name, "x.crt", "x.key", "dhp.pem")
+
+	def test_lazy_lru(self):
+		store = self._store(cache_size = 2)
+		self.assertEqual(store.stats.counters.get("loads"), None)
+		credentials = store.get("www.example.com")
+		self.assertEqual(credentials.dh_params.g, 2)
+		self.assertIs(store.get("WWW.example.com"), credentials)
+		self.assertIs(store.get("a.example.com"), store.get("b.example.com"))
+		self.assertEqual(store.stats.counters.get("loads"), 2)
+		store.get("example.org")
+		self.assertEqual(len(store.cache), 2)
+		self.assertIsNot(store.get("www.example.com"), credentials)
+		self.assertEqual(store.stats.counters.get("loads"), 4)
+
+	def test_default(self):
+		with self.assertRaises(Exception):
+			self._store().get("unknown.org")
+		default = CredentialStore(os.path.join(self._tmpdir, "default.crt"), os.path.join(self._tmpdir, "default.key"), self._dhfile)
+		store = self._store(default = default)
+		self.assertIs(store.get("unknown.org"), default.get())
+		self.assertIs(store.get(None), default.get())
+		self.assertIsNot(store.get("example.com"), default.get())
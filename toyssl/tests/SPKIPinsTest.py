@@ -0,0 +1,48 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import base64
+import hashlib
+import unittest
+from toyssl.x509 import X509Certificate, SPKIPins
+from .ChainVerifierTest import _LEAF_CRT, _INTERMEDIATE_CRT
+
+class SPKIPinsTest(unittest.TestCase):
+	def setUp(self):
+		self._leaf = X509Certificate.frompemobj(_LEAF_CRT)
+		self._intermediate = X509Certificate.frompemobj(_INTERMEDIATE_CRT)
+
+	def test_spki_sha256(self):
+		self.assertEqual(self._leaf.spki_sha256, hashlib.sha256(self._leaf.raw_spki).digest())
+		self.assertNotEqual(self._leaf.spki_sha256, self._intermediate.spki_sha256)
+
+	def test_match(self):
+		pin = self._leaf.spki_sha256
+		for encoded in [ pin.hex(), pin.hex().upper(), base64.b64encode(pin).decode("ascii") ]:
+			pins = SPKIPins([ encoded ])
+			self.assertTrue(pins.matches(self._leaf))
+			self.assertFalse(pins.matches(self._intermediate))
+		self.assertEqual(len(SPKIPins([ pin.hex(), base64.b64encode(pin).decode("ascii") ])), 1)
+
+	def test_invalid(self):
+		for pin in [ "", "abcd", "x" * 64, base64.b64encode(bytes(20)).decode("ascii") ]:
+			with self.assertRaises(Exception):
+				SPKIPins([ pin ])
@@ -0,0 +1,127 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+from toyssl.msg.MsgBuffer import MsgBuffer
+from toyssl.msg.Schema import HandshakeSchema, UInt, Enum, Fixed, Opaque, OpaqueUInt, Vector, Struct, Span, Optional
+from toyssl.msg.Enums import HandshakeType, CipherSuite, CompressionMethod, SSLVersion
+from toyssl.msg.handshake import ClientHelloPkt, CertificatePkt
+
+_SCHEMA_PAIR = Struct("pair", [ UInt("x", 1), Opaque("y", 1) ])
+
+_SCHEMA = HandshakeSchema(HandshakeType.HelloRequest, [
+	UInt("a", 1),
+	UInt("b", 3),
+	Enum("suite", CipherSuite, 2),
+	Fixed("fixed", 4),
+	Span("signed", [
+		Opaque("blob", 2),
+		OpaqueUInt("number", 2),
+	]),
+	Vector("suites", 2, Enum("suite", CipherSuite, 2)),
+	Vector("pairs", 1, _SCHEMA_PAIR),
+	Optional(UInt("trailer", 2)),
+])
+
+class SchemaTest(unittest.TestCase):
+	def setUp(self):
+		self._annotate = HandshakeSchema.annotate
+
+	def tearDown(self):
+		HandshakeSchema.annotate = self._annotate
+
+	def _values(self, **kwargs):
+		values = {
+			"a":		0x12,
+			"b":		0x345678,
+			"suite":	CipherSuite.TLS_DHE_RSA_WITH_AES_128_CBC_SHA,
+			"fixed":	b"abcd",
+			"blob":		b"xyz",
+			"number":	0x10001,
+			"suites":	[ CipherSuite.TLS_DHE_RSA_WITH_AES_128_CBC_SHA, CipherSuite.TLS_DHE_RSA_WITH_AES_256_CBC_SHA ],
+			"pairs":	[ (1, b""), (2, b"foo") ],
+			"trailer":	0xabcd,
+		}
+		values.update(kwargs)
+		values["pairs"] = [ _SCHEMA_PAIR.new(x = x, y = y) for (x, y) in values["pairs"] ]
+		return _SCHEMA.new(**values)
+
+	def _both_modes(self):
+		for annotate in [ True, False ]:
+			HandshakeSchema.annotate = annotate
+			yield annotate
+
+	def test_encoding(self):
+		expect = bytes.fromhex("00 000024 12 345678 0033 61626364 0003 78797a 0003 010001 0004 0033 0039 07 01 00 02 03 666f6f abcd".replace(" ", ""))
+		for annotate in self._both_modes():
+			self.assertEqual(_SCHEMA.serialize(self._values()).data, expect)
+
+	def test_roundtrip(self):
+		for annotate in self._both_modes():
+			for values in [ self._values(), self._values(trailer = None, pairs = [ ]) ]:
+				msgbuf = _SCHEMA.serialize(values)
+				parsed = _SCHEMA.parse(MsgBuffer(msgbuf.data))
+				self.assertEqual(parsed.signed, b"\x00\x03xyz\x00\x03\x01\x00\x01")
+				self.assertEqual(parsed._replace(signed = None), values)
+				self.assertTrue(isinstance(parsed.suite, CipherSuite))
+
+	def test_truncated(self):
+		data = _SCHEMA.serialize(self._values(trailer = None)).data
+		for annotate in self._both_modes():
+			for cut in range(len(data) - 4):
+				truncated = bytearray(data[ : 4 + cut])
+				truncated[1 : 4] = cut.to_bytes(3, "big")
+				with self.assertRaises(Exception):
+					_SCHEMA.parse(MsgBuffer(truncated))
+
+	def test_trailing_data(self):
+		data = bytearray(_SCHEMA.serialize(self._values()).data + b"\x00")
+		data[3] += 1
+		for annotate in self._both_modes():
+			with self.assertRaises(Exception):
+				_SCHEMA.parse(MsgBuffer(data))
+
+	def test_fixed_length(self):
+		for annotate in self._both_modes():
+			with self.assertRaises(Exception):
+				_SCHEMA.serialize(self._values(fixed = b"abc"))
+
+	def test_markers(self):
+		HandshakeSchema.annotate = True
+		msgbuf = MsgBuffer(_SCHEMA.serialize(self._values()).data)
+		_SCHEMA.parse(msgbuf)
+		labels = [ marker.text for marker in msgbuf.markers ]
+		for label in [ "HandshakeType", "Payload", "A", "B", "Suite", "Fixed", "Signed", "Blob", "Number", "Suites", "Pairs", "Pair", "Trailer" ]:
+			self.assertIn(label, labels)
+
+	def test_packets_modes_identical(self):
+		client_hello = ClientHelloPkt(SSLVersion.ProtocolTLSv1_2)
+		client_hello.add_cipher_suite(CipherSuite.TLS_DHE_RSA_WITH_AES_128_CBC_SHA)
+		client_hello.add_compression_method(CompressionMethod.null)
+		certificate = CertificatePkt()
+		certificate.add_cert(b"foo")
+		certificate.add_cert(b"bar" * 100)
+		for pkt in [ client_hello, certificate ]:
+			encodings = [ pkt.serialize().data for annotate in self._both_modes() ]
+			self.assertEqual(encodings[0], encodings[1])
+			parsed = [ str(pkt.parse(MsgBuffer(encodings[0]))) for annotate in self._both_modes() ]
+			self.assertEqual(parsed[0], parsed[1])
+			self.assertEqual(parsed[0], str(pkt))
@@ -0,0 +1,93 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import unittest
+from toyssl.x509 import X509Certificate, SignatureVerifier
+from toyssl.x509.PublicKey import _ECCPublicKey
+from .ChainVerifierTest import _ROOT_CRT, _INTERMEDIATE_CRT
+
+_ECC_ROOT_CRT = """
+-----BEGIN CERTIFICATE-----
+MIIBizCCATGgAwIBAgIUJvSZ1V/O03X8wKLW9c5caK57j1AwCgYIKoZIzj0EAwIw
+GjEYMBYGA1UEAwwPVG95IEVDQyBSb290IENBMCAXDTI2MTAxOTE1NDQ1MFoYDzIx
+MjYwOTI1MTU0NDUwWjAaMRgwFgYDVQQDDA9Ub3kgRUNDIFJvb3QgQ0EwWTATBgcq
+hkjOPQIBBggqhkjOPQMBBwNCAARM8KWe8Jr9cT6RCSa2jw9u/9wbTjyk06m5tijQ
+ReKyX6IXAh/Qrdx8m5x/T9V955PsaGgmldGKPveHROctY9RGo1MwUTAfBgNVHSME
+GDAWgBTiRqy3txyo0nLfGMIGWdHQuGrtvDAPBgNVHRMBAf8EBTADAQH/MB0GA1Ud
+DgQWBBTiRqy3txyo0nLfGMIGWdHQuGrtvDAKBggqhkjOPQQDAgNIADBFAiEAh6tm
+/rf58XE961UAYMNiV7QNn8SrBoix7BUM6JxhwjkCIFt4P9JrsPJ+v2QpoL4mpNaI
+ht8gnKekBaK+qAWvBtC9
+-----END CERTIFICATE-----
+"""
+
+_ECC_LEAF_CRT = """
+-----BEGIN CERTIFICATE-----
+MIIBpDCCAUugAwIBAgIUFxhxmsW8kzYdYADdl3LuUnG/qP8wCgYIKoZIzj0EAwIw
+GjEYMBYGA1UEAwwPVG95IEVDQyBSb290IENBMCAXDTI2MTAxOTE1NDQ1MFoYDzIx
+MjYwOTI1MTU0NDUwWjAaMRgwFgYDVQQDDA9lY2MuZXhhbXBsZS5jb20wdjAQBgcq
+hkjOPQIBBgUrgQQAIgNiAARFLwyDFNHKbpS0WDMWqW9W/spyVVO1BLgAqts7KGlI
+AMP8s2Yp5oAON2aRmvwIJQKhxlweqeTj/zi4QOtJdUivbw5rk3rWUmuEzIQLERv8
+xn2bdG6md8vnXkxDeSXVJeajUDBOMAwGA1UdEwEB/wQCMAAwHQYDVR0OBBYEFPZv
+KNkKocJGIPHjnylsRkgw9GRdMB8GA1UdIwQYMBaAFOJGrLe3HKjSct8YwgZZ0dC4
+au28MAoGCCqGSM49BAMCA0cAMEQCIH7Bg4VkY64CVQcPvIq8ULAF2jyN7y9VUovH
+Mda2pU40AiAE5M8bVALfxSVshJl1S2iTmwp9TsXW1pBAOm7MDaFcqg==
+-----END CERTIFICATE-----
+"""
+
+class SignatureVerifierTest(unittest.TestCase):
+	def test_rsa(self):
+		root = X509Certificate.frompemobj(_ROOT_CRT)
+		intermediate = X509Certificate.frompemobj(_INTERMEDIATE_CRT)
+		verifier = SignatureVerifier()
+		self.assertTrue(verifier.verify(root, intermediate))
+		self.assertTrue(verifier.verify(root, root))
+		self.assertFalse(verifier.verify(intermediate, root))
+		self.assertEqual(verifier.computed, 3)
+
+	def test_ecdsa(self):
+		root = X509Certificate.frompemobj(_ECC_ROOT_CRT)
+		leaf = X509Certificate.frompemobj(_ECC_LEAF_CRT)
+		self.assertEqual((root.publickey.curveid, leaf.publickey.curveid), ("prime256v1", "secp384r1"))
+		verifier = SignatureVerifier()
+		self.assertTrue(verifier.verify(root, leaf))
+		self.assertTrue(verifier.verify(root, root))
+		self.assertFalse(verifier.verify(leaf, leaf))
+		self.assertFalse(root.publickey.verify_ecdsa("sha256", leaf.raw_tbs + b"x", leaf.raw_signature))
+
+	def test_off_curve_point(self):
+		leaf = X509Certificate.frompemobj(_ECC_LEAF_CRT)
+		point = b"\x04" + (1).to_bytes(32, "big") + (1).to_bytes(32, "big")
+		self.assertFalse(_ECCPublicKey("prime256v1", point).verify_ecdsa("sha384", leaf.raw_tbs, leaf.raw_signature))
+
+	def test_mismatched_keytype(self):
+		verifier = SignatureVerifier()
+		self.assertFalse(verifier.verify(X509Certificate.frompemobj(_ROOT_CRT), X509Certificate.frompemobj(_ECC_LEAF_CRT)))
+		self.assertEqual(verifier.computed, 0)
+
+	def test_cache(self):
+		root = X509Certificate.frompemobj(_ECC_ROOT_CRT)
+		verifier = SignatureVerifier(maxsize = 1)
+		for i in range(3):
+			self.assertTrue(verifier.verify(root, X509Certificate.frompemobj(_ECC_LEAF_CRT)))
+		self.assertEqual((verifier.computed, verifier.hits), (1, 2))
+		verifier.verify(root, root)
+		verifier.verify(root, X509Certificate.frompemobj(_ECC_LEAF_CRT))
+		self.assertEqual(verifier.computed, 3)
@@ -0,0 +1,69 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import os
+import tempfile
+import unittest
+from toyssl.x509 import X509Certificate, TrustStore, TrustStoreSnapshot, ChainVerifier
+from .X509CrtParser import _CRTDATA
+from .ChainVerifierTest import _ROOT_CRT, _INTERMEDIATE_CRT, _LEAF_CRT
+
+class TrustStoreSnapshotTest(unittest.TestCase):
+	def setUp(self):
+		(fd, self._filename) = tempfile.mkstemp(suffix = ".bin")
+		os.close(fd)
+		self._root = X509Certificate.frompemobj(_ROOT_CRT)
+		self._other = X509Certificate.frompemobj(_CRTDATA)
+		TrustStoreSnapshot.write(self._filename, TrustStore([ self._root, self._other ]))
+
+	def tearDown(self):
+		os.unlink(self._filename)
+
+	def test_lazy(self):
+		snapshot = TrustStoreSnapshot(self._filename)
+		try:
+			self.assertEqual(len(snapshot), 2)
+			self.assertTrue(self._root in snapshot)
+			self.assertFalse(X509Certificate.frompemobj(_LEAF_CRT) in snapshot)
+			self.assertEqual(str(snapshot), "TrustStoreSnapshot<2 certificates, 0 parsed>")
+
+			intermediate = X509Certificate.frompemobj(_INTERMEDIATE_CRT)
+			issuers = snapshot.find_issuers(intermediate)
+			self.assertEqual([ issuer.derhash for issuer in issuers ], [ self._root.derhash ])
+			self.assertEqual(issuers[0].publickey.n, self._root.publickey.n)
+			self.assertEqual(issuers[0].subject_key_identifier, self._root.subject_key_identifier)
+			self.assertEqual(str(snapshot), "TrustStoreSnapshot<2 certificates, 1 parsed>")
+		finally:
+			snapshot.close()
+
+	def test_verify(self):
+		snapshot = TrustStoreSnapshot(self._filename)
+		try:
+			chain = [ X509Certificate.frompemobj(_LEAF_CRT), X509Certificate.frompemobj(_INTERMEDIATE_CRT) ]
+			self.assertTrue(ChainVerifier(snapshot).verify(chain).valid)
+		finally:
+			snapshot.close()
+
+	def test_invalid(self):
+		with open(self._filename, "r+b") as f:
+			f.write(b"garbage")
+		with self.assertRaises(Exception):
+			TrustStoreSnapshot(self._filename)
@@ -55,3 +55,16 @@ class X509CrtParser(unittest.TestCase):
 #		print(dir(crt.decoded))
 #		print(crt.decoded.prettyPrint())
 
+
+	def test_lazy_fields(self):
+		crt = X509Certificate.frompemobj(_CRTDATA)
+		self.assertIs(crt.subject, crt.subject)
+		self.assertIs(crt.publickey, crt.publickey)
+		self.assertEqual(str(crt.subject), "CN=Foobar")
+		self.assertEqual(str(crt.issuer), "CN=Foobar")
+		self.assertEqual(crt.valid_from.year, 2015)
+		self.assertEqual(crt.valid_to.month, 7)
+		self.assertEqual(crt.publickey.e, 65537)
+		self.assertEqual(crt.key_identifier, "5dc4eba67975720654ffd45a65e6522f295e8768")
+		self.assertEqual(crt.decoded[0][1], 0xd41491642c7285fb)
+		self.assertEqual(len(crt.derhash), 64)
@@ -28,3 +28,25 @@ from .OpaqueTest import OpaqueTest
 from .PacketTest import PacketTest
 from .PMSTests import PMSTest
 from .RSAKeyReader import RSAKeyReaderTest
+from .RecordEngineTest import RecordEngineTest
+from .ApplicationDataTest import ApplicationDataTest
+from .RecordWriterTest import RecordWriterTest
+from .HandshakeReassemblerTest import HandshakeReassemblerTest
+from .CredentialStoreTest import CredentialStoreTest
+from .ReserializeCheckTest import ReserializeCheckTest
+from .SchemaTest import SchemaTest
+from .ClientHelloViewTest import ClientHelloViewTest
+from .ClientHelloPeekTest import ClientHelloPeekTest
+from .LRUCacheTest import LRUCacheTest
+from .SNICredentialStoreTest import SNICredentialStoreTest
+from .EnumTableTest import EnumTableTest
+from .CipherSuiteDirectoryTest import CipherSuiteDirectoryTest
+from .CipherSuiteNegotiatorTest import CipherSuiteNegotiatorTest
+from .CertificateCacheTest import CertificateCacheTest
+from .DERScannerTest import DERScannerTest
+from .CertificatePktTest import CertificatePktTest
+from .ChainVerifierTest import ChainVerifierTest
+from .TrustStoreSnapshotTest import TrustStoreSnapshotTest
+from .SignatureVerifierTest import SignatureVerifierTest
+from .SPKIPinsTest import SPKIPinsTest
+from .CertificateReaderTest import CertificateReaderTest
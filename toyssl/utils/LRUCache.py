@@ -0,0 +1,93 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import threading
+import collections
+
+class LRUCache(object):
+	"""Thread-safe mapping that holds at most 'maxsize' entries. When a new
+	entry is added to a full cache, the least recently used one is
+	evicted."""
+	def __init__(self, maxsize):
+		assert(maxsize > 0)
+		self._maxsize = maxsize
+		self._entries = collections.OrderedDict()
+		self._lock = threading.Lock()
+		self._hits = 0
+		self._misses = 0
+		self._evictions = 0
+
+	@property
+	def maxsize(self):
+		return self._maxsize
+
+	@property
+	def hits(self):
+		return self._hits
+
+	@property
+	def misses(self):
+		return self._misses
+
+	@property
+	def evictions(self):
+		return self._evictions
+
+	def get(self, key, default = None):
+		with self._lock:
+			if key not in self._entries:
+				self._misses += 1
+				return default
+			self._entries.move_to_end(key)
+			self._hits += 1
+			return self._entries[key]
+
+	def put(self, key, value):
+		with self._lock:
+			self._entries[key] = value
+			self._entries.move_to_end(key)
+			while len(self._entries) > self._maxsize:
+				self._entries.popitem(last = False)
+				self._evictions += 1
+
+	def get_or_create(self, key, create):
+		"""Returns the cached value for key; on a miss, create(key) is called
+		outside of the lock and its result is cached. Concurrent misses for
+		the same key may therefore call create() more than once."""
+		value = self.get(key, self)
+		if value is self:
+			value = create(key)
+			self.put(key, value)
+		return value
+
+	def clear(self):
+		with self._lock:
+			self._entries.clear()
+
+	def __contains__(self, key):
+		with self._lock:
+			return key in self._entries
+
+	def __len__(self):
+		return len(self._entries)
+
+	def __str__(self):
+		return "LRUCache<%d/%d, %d hits, %d misses, %d evictions>" % (len(self), self._maxsize, self._hits, self._misses, self._evictions)
@@ -20,3 +20,4 @@
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
 from .Comparable import Comparable
+from .LRUCache import LRUCache
@@ -66,7 +66,9 @@ class ASN1PrettyPrinter(object):
 
 	def _dump_enumeration(self, element, name, startchar, endchar):
 		self._contline("%s %s\n" % (name, startchar))
-		for (index, subelement) in enumerate(element):
+		for index in range(len(element)):
+			# Iterating a pyasn1 Sequence yields its component names
+			subelement = element[index]
 			pos_name = None
 			if getattr(element, "getNameByPosition", None) is not None:
 				pos_name = element.getNameByPosition(index)
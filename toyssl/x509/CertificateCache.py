@@ -0,0 +1,69 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import hashlib
+
+from .X509Certificate import X509Certificate
+from toyssl.utils import LRUCache
+
+class CertificateCache(object):
+	"""Process-wide cache of parsed certificates, keyed by the SHA-256 of
+	their DER encoding. Clients that repeatedly connect to the same servers
+	thereby only pay for parsing and for decoding the accessed fields the
+	first time; afterwards, a lookup costs one hash over the DER data.
+	Certificates do fill in their decoded fields lazily, but these are
+	derived only from the DER data, so what a certificate reports never
+	changes and it can be shared between connections."""
+	def __init__(self, maxsize = 256):
+		self._cache = LRUCache(maxsize)
+
+	@property
+	def hits(self):
+		return self._cache.hits
+
+	@property
+	def misses(self):
+		return self._cache.misses
+
+	def resize(self, maxsize):
+		"""Replaces the cache by an empty one of a different size."""
+		self._cache = LRUCache(maxsize)
+
+	def get(self, derobj):
+		"""Returns the parsed X509Certificate for the DER data."""
+		derhash = hashlib.sha256(derobj).hexdigest()
+		certificate = self._cache.get(derhash)
+		if certificate is None:
+			# Copy so that the cache does not keep a larger buffer alive
+			certificate = X509Certificate.fromderobj(bytes(derobj), derhash = derhash)
+			self._cache.put(derhash, certificate)
+		return certificate
+
+	def clear(self):
+		self._cache.clear()
+
+	def __len__(self):
+		return len(self._cache)
+
+	def __str__(self):
+		return "CertificateCache<%s>" % (self._cache)
+
+certificate_cache = CertificateCache()
@@ -78,6 +78,7 @@ class CertificateChecker(object):
 			"1.2.840.113549.1.1.11":		128,	# sha256WithRSAEncryption
 			"1.2.840.113549.1.1.12":		192,	# sha384WithRSAEncryption
 			"1.2.840.113549.1.1.13":		256,	# sha512WithRSAEncryption
+			"1.2.840.10045.4.3.2":			128,	# ecdsa-with-SHA256
 			"1.2.840.10045.4.3.3":			192,	# ecdsa-with-SHA384
 			"2.16.840.1.101.3.4.2.1":		128,	# sha256
 		}
@@ -0,0 +1,96 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import base64
+import binascii
+
+class CertificateReader(object):
+	"""Streams DER encoded certificates from a binary file object that
+	contains PEM blocks, concatenated DER certificates or one base64 encoded
+	certificate per line. Only one certificate is held in memory at a time,
+	so arbitrarily large corpora can be read. In "auto" mode, the format is
+	determined from the first byte of the input, which therefore must be a
+	buffered reader such as a file opened in "rb" mode."""
+	_FORMATS = ( "auto", "pem", "der", "base64" )
+
+	def __init__(self, f, fmt = "auto"):
+		if fmt not in self._FORMATS:
+			raise Exception("Unknown certificate input format '%s'." % (fmt))
+		self._f = f
+		self._fmt = fmt
+		self._errors = 0
+
+	@property
+	def errors(self):
+		"""Number of lines or blocks that could not be decoded and were
+		skipped."""
+		return self._errors
+
+	def _read_lines(self):
+		"""PEM blocks and lines with one base64 encoded certificate each, which
+		may also be mixed."""
+		data = None
+		for line in self._f:
+			line = line.strip()
+			if line == b"-----BEGIN CERTIFICATE-----":
+				data = [ ]
+				continue
+			elif line == b"-----END CERTIFICATE-----":
+				(encoded, data) = (b"".join(data or [ ]), None)
+			elif data is not None:
+				data.append(line)
+				continue
+			elif (len(line) == 0) or line.startswith(b"#") or line.startswith(b"-----"):
+				continue
+			else:
+				encoded = line
+			try:
+				yield base64.b64decode(encoded, validate = True)
+			except binascii.Error:
+				self._errors += 1
+
+	def _read_der(self):
+		while True:
+			header = self._f.read(2)
+			if len(header) == 0:
+				break
+			if (len(header) != 2) or (header[0] != 0x30):
+				raise Exception("Malformed DER certificate stream.")
+			length = header[1]
+			if length & 0x80:
+				lenlength = length & 0x7f
+				if (lenlength == 0) or (lenlength > 4):
+					raise Exception("Unsupported DER length encoding in certificate stream.")
+				lenbytes = self._f.read(lenlength)
+				header += lenbytes
+				length = int.from_bytes(lenbytes, "big")
+			body = self._f.read(length)
+			if len(body) != length:
+				raise Exception("Truncated DER certificate stream.")
+			yield header + body
+
+	def __iter__(self):
+		fmt = self._fmt
+		if fmt == "auto":
+			fmt = "der" if (self._f.peek(1)[:1] == b"\x30") else "pem"
+		if fmt == "der":
+			return self._read_der()
+		return self._read_lines()
@@ -0,0 +1,123 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import datetime
+import collections
+
+from .TrustStore import TrustStore
+from .SignatureVerifier import signature_verifier as default_signature_verifier
+
+ChainVerificationResult = collections.namedtuple("ChainVerificationResult", [ "valid", "chain", "reason" ])
+
+class ChainVerifier(object):
+	"""Builds a path from a peer certificate to one of the trust anchors of
+	a TrustStore and verifies the signatures along it. Issuer candidates are
+	looked up by AuthorityKeyIdentifier and issuer name. Signatures are
+	checked by a SignatureVerifier, by default the process-wide one, so a
+	chain that has been seen before is validated again without any public
+	key operation."""
+	def __init__(self, trust_store, max_depth = 8, signature_verifier = None):
+		self._trust_store = trust_store
+		self._max_depth = max_depth
+		if signature_verifier is None:
+			signature_verifier = default_signature_verifier
+		self._signature_verifier = signature_verifier
+
+	@property
+	def trust_store(self):
+		return self._trust_store
+
+	@property
+	def signature_verifier(self):
+		return self._signature_verifier
+
+	def signature_valid(self, issuer, subject):
+		"""Checks if 'subject' carries a valid signature by the key of
+		'issuer'."""
+		return self._signature_verifier.verify(issuer, subject)
+
+	@staticmethod
+	def _time_valid(certificate, now):
+		return certificate.valid_from <= now <= certificate.valid_to
+
+	def _extend(self, path, intermediates, now):
+		"""Tries to complete the path whose last element is not yet trusted.
+		Returns None on success or the reason of failure."""
+		current = path[-1]
+		rejected = self._signature_verifier.rejected_algorithm(current.signature_alg_oid)
+		if rejected is not None:
+			return "Signature of %s uses rejected algorithm %s." % (current.subject, rejected)
+		reason = "No issuer found for %s." % (current.subject)
+
+		for anchor in self._trust_store.find_issuers(current):
+			if (anchor.version >= 3) and (not anchor.is_ca):
+				reason = "Trust anchor %s is not a CA." % (anchor.subject)
+			elif not self._time_valid(anchor, now):
+				reason = "Trust anchor %s is not valid at %s." % (anchor.subject, now)
+			elif not self.signature_valid(anchor, current):
+				reason = "Signature of %s does not verify with trust anchor %s." % (current.subject, anchor.subject)
+			else:
+				path.append(anchor)
+				return None
+
+		if len(path) >= self._max_depth:
+			return "Certificate chain exceeds maximum depth of %d." % (self._max_depth)
+
+		for issuer in intermediates.find_issuers(current):
+			if issuer in path:
+				continue
+			if not issuer.is_ca:
+				reason = "Intermediate certificate %s is not a CA." % (issuer.subject)
+			elif not self._time_valid(issuer, now):
+				reason = "Intermediate certificate %s is not valid at %s." % (issuer.subject, now)
+			elif not self.signature_valid(issuer, current):
+				reason = "Signature of %s does not verify with intermediate certificate %s." % (current.subject, issuer.subject)
+			else:
+				path.append(issuer)
+				issuer_reason = self._extend(path, intermediates, now)
+				if issuer_reason is None:
+					return None
+				path.pop()
+				reason = issuer_reason
+		return reason
+
+	def verify(self, chain, now = None):
+		"""Verifies a certificate chain as sent by a peer, i.e., a list of
+		X509Certificates with the peer certificate first and the
+		intermediates in any order. The returned chain runs from the peer
+		certificate up to the trust anchor."""
+		if len(chain) == 0:
+			return ChainVerificationResult(valid = False, chain = [ ], reason = "Empty certificate chain.")
+		if now is None:
+			now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo = None)
+
+		leaf = chain[0]
+		if not self._time_valid(leaf, now):
+			return ChainVerificationResult(valid = False, chain = [ leaf ], reason = "Certificate %s is not valid at %s." % (leaf.subject, now))
+		if leaf in self._trust_store:
+			return ChainVerificationResult(valid = True, chain = [ leaf ], reason = None)
+
+		path = [ leaf ]
+		reason = self._extend(path, TrustStore(chain[1:]), now)
+		return ChainVerificationResult(valid = reason is None, chain = path, reason = reason)
+
+	def __str__(self):
+		return "ChainVerifier<%s, %s>" % (self._trust_store, self._signature_verifier)
@@ -0,0 +1,159 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import os
+import time
+import logging
+import threading
+
+from .PEMEncoder import pem_readfile
+from .PrivateKey import PrivateKey
+from .X509Certificate import X509Certificate
+from toyssl.crypto.KexParams import DHModPKexParams
+from toyssl.msg.handshake import CertificatePkt
+from toyssl.log import ConnectionStats
+
+class Credentials(object):
+	"""Parsed server credentials as they are needed during the handshake:
+	the DER-encoded certificate, the DH parameters and the private key."""
+	def __init__(self, crt_der, dh_params, private_key):
+		self._crt_der = crt_der
+		self._dh_params = dh_params
+		self._private_key = private_key
+		self._certificate = None
+		self._certificate_pkt = None
+
+	@staticmethod
+	def load(crtfile, keyfile, dhfile):
+		crt_der = pem_readfile(crtfile, "CERTIFICATE")
+		dh_params = DHModPKexParams.parse(pem_readfile(dhfile, "DH PARAMETERS"))
+		private_key = PrivateKey.from_der(pem_readfile(keyfile, "PRIVATE KEY"))
+		return Credentials(crt_der, dh_params, private_key)
+
+	@property
+	def crt_der(self):
+		return self._crt_der
+
+	@property
+	def certificate(self):
+		if self._certificate is not None:
+			return self._certificate
+		self._certificate = X509Certificate.fromderobj(self._crt_der)
+		return self._certificate
+
+	@property
+	def certificate_pkt(self):
+		"""Certificate handshake message for this chain, encoded only once.
+		Since reloading creates new Credentials, the cached encoding is
+		dropped together with the old chain."""
+		if self._certificate_pkt is not None:
+			return self._certificate_pkt
+		self._certificate_pkt = CertificatePkt()
+		self._certificate_pkt.add_cert(self._crt_der)
+		self._certificate_pkt.preencode()
+		return self._certificate_pkt
+
+	@property
+	def dh_params(self):
+		return self._dh_params
+
+	@property
+	def private_key(self):
+		return self._private_key
+
+	def __str__(self):
+		return "Credentials<%d bytes certificate, %d bit DH group>" % (len(self._crt_der), self._dh_params.p.bit_length())
+
+class CredentialStore(object):
+	"""Loads the server credentials once and hands out the parsed objects.
+	The modification times of the files are polled at most every
+	'check_interval' seconds; when any of them changed, all credentials are
+	reloaded and swapped in atomically. Handshakes that are in progress
+	keep using the Credentials instance they obtained. If a reload fails
+	(e.g., because the files are only partially written), the previous
+	credentials remain active and the reload is retried on the next
+	change."""
+	def __init__(self, crtfile, keyfile, dhfile, check_interval = 1.0):
+		self._log = logging.getLogger("toyssl")
+		self._filenames = (crtfile, keyfile, dhfile)
+		self._check_interval = check_interval
+		self._lock = threading.Lock()
+		self._stats = ConnectionStats()
+		self._load_time = None
+		self._last_check = time.monotonic()
+		self._mtimes = self._get_mtimes()
+		self._credentials = self._load()
+
+	@property
+	def stats(self):
+		return self._stats
+
+	@property
+	def load_time(self):
+		"""Seconds it took to load and parse the current credentials."""
+		return self._load_time
+
+	@property
+	def reload_count(self):
+		return self._stats.counters.get("reloads", 0)
+
+	def _get_mtimes(self):
+		return tuple(os.stat(filename).st_mtime_ns for filename in self._filenames)
+
+	def _load(self):
+		t0 = time.perf_counter()
+		credentials = Credentials.load(*self._filenames)
+		self._load_time = time.perf_counter() - t0
+		self._stats.count("loads")
+		return credentials
+
+	def _check_reload(self):
+		with self._lock:
+			now = time.monotonic()
+			if now - self._last_check < self._check_interval:
+				return
+			self._last_check = now
+			try:
+				mtimes = self._get_mtimes()
+			except OSError as e:
+				self._log.warning("Cannot stat credential files: %s" % (str(e)))
+				return
+			if mtimes == self._mtimes:
+				return
+			self._mtimes = mtimes
+			try:
+				credentials = self._load()
+			except Exception as e:
+				self._stats.count("reload_failures")
+				self._log.error("Reloading credentials failed, keeping previous ones: %s" % (str(e)))
+				return
+			self._credentials = credentials
+			self._stats.count("reloads")
+			self._log.info("Reloaded credentials in %.1f ms" % (self._load_time * 1000))
+
+	def get(self, servername = None):
+		"""Returns the currently active Credentials, regardless of the
+		requested server name."""
+		self._check_reload()
+		return self._credentials
+
+	def __str__(self):
+		return "CredentialStore<%s, %d reloads>" % (", ".join(self._filenames), self.reload_count)
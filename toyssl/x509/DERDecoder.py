@@ -43,9 +43,7 @@ class DERAssigner(object):
 def asn1_bitstring_to_bytes(element):
 	if (len(element) % 8) != 0:
 		raise Exception(NotImplemented)
-	bytecnt = (len(element) + 7) // 8
-	data = bytes(sum((element[(8 * i) + j] << (7 - j)) for j in range(8)) for i in range(bytecnt))
-	return data
+	return element.asOctets()
 
 def der_decode(derobj):
 	(data, trailer) = pyasn1.codec.der.decoder.decode(derobj)
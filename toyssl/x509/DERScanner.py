@@ -0,0 +1,264 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import datetime
+
+class DERTag(object):
+	BOOLEAN = 0x01
+	INTEGER = 0x02
+	BIT_STRING = 0x03
+	OCTET_STRING = 0x04
+	NULL = 0x05
+	OBJECT_IDENTIFIER = 0x06
+	UTF8String = 0x0c
+	PrintableString = 0x13
+	TeletexString = 0x14
+	IA5String = 0x16
+	UTCTime = 0x17
+	GeneralizedTime = 0x18
+	UniversalString = 0x1c
+	BMPString = 0x1e
+	SEQUENCE = 0x30
+	SET = 0x31
+
+	@staticmethod
+	def context(number, constructed = True):
+		return (0xa0 if constructed else 0x80) | number
+
+def der_read_header(data, pos, end):
+	"""Reads the tag and length at 'pos' and returns (tag, value offset,
+	value end). Only single byte tags and definite lengths (as DER requires)
+	are supported."""
+	if pos + 2 > end:
+		raise Exception("Truncated DER data at offset %d." % (pos))
+	tag = data[pos]
+	if (tag & 0x1f) == 0x1f:
+		raise Exception("Multi-byte DER tag at offset %d not supported." % (pos))
+	length = data[pos + 1]
+	pos += 2
+	if length & 0x80:
+		lenlength = length & 0x7f
+		if (lenlength == 0) or (lenlength > 4):
+			raise Exception("Unsupported DER length encoding at offset %d." % (pos - 1))
+		if pos + lenlength > end:
+			raise Exception("Truncated DER length at offset %d." % (pos))
+		length = int.from_bytes(data[pos : pos + lenlength], "big")
+		pos += lenlength
+	if pos + length > end:
+		raise Exception("DER element at offset %d announces %d bytes, but only %d are present." % (pos, length, end - pos))
+	return (tag, pos, pos + length)
+
+def der_expect(data, pos, end, tag, what):
+	(actual_tag, start, stop) = der_read_header(data, pos, end)
+	if actual_tag != tag:
+		raise Exception("Expected %s (tag 0x%02x) at offset %d, but found tag 0x%02x." % (what, tag, pos, actual_tag))
+	return (start, stop)
+
+def der_children(data, start, end):
+	"""Iterates over (tag, value offset, value end) of the elements within a
+	constructed value."""
+	pos = start
+	while pos < end:
+		(tag, value_start, value_end) = der_read_header(data, pos, end)
+		yield (tag, value_start, value_end)
+		pos = value_end
+
+def der_decode_oid(value):
+	"""Decodes the content bytes of an OBJECT IDENTIFIER to dotted form."""
+	arcs = [ ]
+	arc = 0
+	for byte in value:
+		arc = (arc << 7) | (byte & 0x7f)
+		if not (byte & 0x80):
+			if len(arcs) == 0:
+				first = min(arc // 40, 2)
+				arcs.append(first)
+				arcs.append(arc - (40 * first))
+			else:
+				arcs.append(arc)
+			arc = 0
+	return ".".join(str(arc) for arc in arcs)
+
+def der_decode_integer(value):
+	return int.from_bytes(value, "big", signed = True)
+
+def der_decode_time(tag, value):
+	text = bytes(value).decode("ascii")
+	if tag == DERTag.UTCTime:
+		return datetime.datetime.strptime(text, "%y%m%d%H%M%SZ")
+	elif tag == DERTag.GeneralizedTime:
+		return datetime.datetime.strptime(text, "%Y%m%d%H%M%SZ")
+	raise Exception("Tag 0x%02x is not a time." % (tag))
+
+_STRING_CODECS = {
+	DERTag.UTF8String:			"utf-8",
+	DERTag.PrintableString:		"ascii",
+	DERTag.IA5String:			"ascii",
+	DERTag.TeletexString:		"latin-1",
+	DERTag.UniversalString:		"utf-32-be",
+	DERTag.BMPString:			"utf-16-be",
+}
+
+def der_decode_string(tag, value):
+	"""Decodes a character string or returns None if 'tag' is not a
+	supported string type."""
+	codec = _STRING_CODECS.get(tag)
+	if codec is None:
+		return None
+	return bytes(value).decode(codec, errors = "replace")
+
+def der_split_spki(data):
+	"""Splits a SubjectPublicKeyInfo into (algorithm OID, parameters tag,
+	parameters value, public key bytes); the parameter tag and value are None
+	if absent."""
+	(pos, end) = der_expect(data, 0, len(data), DERTag.SEQUENCE, "SubjectPublicKeyInfo")
+	(alg_start, alg_end) = der_expect(data, pos, end, DERTag.SEQUENCE, "AlgorithmIdentifier")
+	(oid_start, oid_end) = der_expect(data, alg_start, alg_end, DERTag.OBJECT_IDENTIFIER, "algorithm")
+	(param_tag, param_value) = (None, None)
+	if oid_end < alg_end:
+		(param_tag, param_start, param_end) = der_read_header(data, oid_end, alg_end)
+		param_value = data[param_start : param_end]
+	(key_start, key_end) = der_expect(data, alg_end, end, DERTag.BIT_STRING, "subjectPublicKey")
+	if (key_start == key_end) or (data[key_start] != 0):
+		raise Exception(NotImplemented)
+	return (der_decode_oid(data[oid_start : oid_end]), param_tag, param_value, data[key_start + 1 : key_end])
+
+class DERScanner(object):
+	"""Walks a DER encoded X.509 certificate once and records the offsets of
+	the fields needed during a handshake into a flat list of integers; no
+	object is created per ASN.1 node. For every field, the offsets of the
+	complete TLV, of its value and of its end are kept, so that raw slices
+	of the original buffer can be handed out and decoded on demand.
+	Absent optional fields have offsets of None."""
+	FIELDS = ( "certificate", "tbs_certificate", "version", "serial", "tbs_signature_algorithm", "issuer", "validity", "not_before", "not_after", "subject", "subject_public_key_info", "extensions", "signature_algorithm", "signature" )
+	_FIELD_INDEX = { name: index for (index, name) in enumerate(FIELDS) }
+	_EXTENSIONS_TAG = DERTag.context(3)
+
+	def __init__(self, data):
+		self._data = data
+		self._offsets = [ None ] * (3 * len(self.FIELDS))
+		self._tags = [ None ] * len(self.FIELDS)
+		self._extension_offsets = [ ]
+		self._scan()
+
+	def _record(self, name, tlv_start, tag, value_start, value_end):
+		index = self._FIELD_INDEX[name]
+		self._offsets[3 * index : 3 * index + 3] = [ tlv_start, value_start, value_end ]
+		self._tags[index] = tag
+
+	def _next(self, name, pos, end, expect_tag = None):
+		(tag, value_start, value_end) = der_read_header(self._data, pos, end)
+		if (expect_tag is not None) and (tag != expect_tag):
+			raise Exception("Malformed certificate: expected tag 0x%02x for %s at offset %d, found 0x%02x." % (expect_tag, name, pos, tag))
+		self._record(name, pos, tag, value_start, value_end)
+		return value_end
+
+	def _scan(self):
+		data = self._data
+		end = len(data)
+		if self._next("certificate", 0, end, DERTag.SEQUENCE) != end:
+			raise Exception("Trailing data after DER encoded certificate.")
+		(pos, end) = self.value_offsets("certificate")
+
+		tbs_end = self._next("tbs_certificate", pos, end, DERTag.SEQUENCE)
+		pos = self._next("signature_algorithm", tbs_end, end, DERTag.SEQUENCE)
+		pos = self._next("signature", pos, end, DERTag.BIT_STRING)
+		if pos != end:
+			raise Exception("Malformed certificate: trailing data after signature.")
+
+		(pos, end) = self.value_offsets("tbs_certificate")
+		if (pos < end) and (data[pos] == DERTag.context(0)):
+			pos = self._next("version", pos, end)
+		pos = self._next("serial", pos, end, DERTag.INTEGER)
+		pos = self._next("tbs_signature_algorithm", pos, end, DERTag.SEQUENCE)
+		pos = self._next("issuer", pos, end, DERTag.SEQUENCE)
+		validity_end = self._next("validity", pos, end, DERTag.SEQUENCE)
+		pos = self._next("subject", validity_end, end, DERTag.SEQUENCE)
+		pos = self._next("subject_public_key_info", pos, end, DERTag.SEQUENCE)
+		while pos < end:
+			# issuerUniqueID [1], subjectUniqueID [2], extensions [3]
+			(tag, value_start, value_end) = der_read_header(data, pos, end)
+			if tag == self._EXTENSIONS_TAG:
+				self._scan_extensions(value_start, value_end)
+			pos = value_end
+
+		(pos, end) = self.value_offsets("validity")
+		pos = self._next("not_before", pos, end)
+		if self._next("not_after", pos, end) != end:
+			raise Exception("Malformed certificate: trailing data in validity.")
+
+	def _scan_extensions(self, start, end):
+		if self._next("extensions", start, end, DERTag.SEQUENCE) != end:
+			raise Exception("Malformed certificate: trailing data after extensions.")
+		(start, end) = self.value_offsets("extensions")
+		for (tag, ext_start, ext_end) in der_children(self._data, start, end):
+			if tag != DERTag.SEQUENCE:
+				raise Exception("Malformed certificate extension.")
+			(oid_start, oid_end) = der_expect(self._data, ext_start, ext_end, DERTag.OBJECT_IDENTIFIER, "extension OID")
+			critical = False
+			(tag, value_start, value_end) = der_read_header(self._data, oid_end, ext_end)
+			if tag == DERTag.BOOLEAN:
+				critical = (value_end > value_start) and (self._data[value_start] != 0)
+				(tag, value_start, value_end) = der_read_header(self._data, value_end, ext_end)
+			if (tag != DERTag.OCTET_STRING) or (value_end != ext_end):
+				raise Exception("Malformed certificate extension value.")
+			self._extension_offsets += [ oid_start, oid_end, int(critical), value_start, value_end ]
+
+	@property
+	def data(self):
+		return self._data
+
+	def has(self, name):
+		return self._tags[self._FIELD_INDEX[name]] is not None
+
+	def tag(self, name):
+		return self._tags[self._FIELD_INDEX[name]]
+
+	def value_offsets(self, name):
+		index = 3 * self._FIELD_INDEX[name]
+		return (self._offsets[index + 1], self._offsets[index + 2])
+
+	def tlv(self, name):
+		"""Complete DER encoding (tag, length and value) of a field or None."""
+		index = 3 * self._FIELD_INDEX[name]
+		if self._offsets[index] is None:
+			return None
+		return self._data[self._offsets[index] : self._offsets[index + 2]]
+
+	def value(self, name):
+		"""Content bytes of a field or None."""
+		index = 3 * self._FIELD_INDEX[name]
+		if self._offsets[index] is None:
+			return None
+		return self._data[self._offsets[index + 1] : self._offsets[index + 2]]
+
+	@property
+	def extension_count(self):
+		return len(self._extension_offsets) // 5
+
+	def extensions(self):
+		"""Iterates over (OID, critical, value) of all extensions."""
+		offsets = self._extension_offsets
+		for i in range(0, len(offsets), 5):
+			yield (der_decode_oid(self._data[offsets[i] : offsets[i + 1]]), bool(offsets[i + 2]), self._data[offsets[i + 3] : offsets[i + 4]])
+
+	def __str__(self):
+		return "DERScanner<%d bytes, %d extensions>" % (len(self._data), self.extension_count)
@@ -45,12 +45,35 @@ def pem_decode(pemdata, name):
 			data.append(line)
 	raise Exception(NotImplemented)
 
+def pem_decode_all(pemdata, name):
+	"""Yields the data of all PEM blocks of the given type, e.g., of a CA
+	bundle."""
+	assert(isinstance(pemdata, list))
+	assert(isinstance(name, str))
+	data = None
+	for line in pemdata:
+		line = line.rstrip("\r")
+		if line == ("-----BEGIN %s-----" % (name)):
+			data = [ ]
+		elif line == ("-----END %s-----" % (name)):
+			if data is not None:
+				yield base64.b64decode("".join(data).encode("utf-8"))
+			data = None
+		elif data is not None:
+			data.append(line)
+
 def pem_readfile(filename, name):
 	assert(isinstance(filename, str))
 	assert(isinstance(name, str))
 	lines = open(filename, "r").read().split("\n")
 	return pem_decode(lines, name)
 
+def pem_readfile_all(filename, name):
+	assert(isinstance(filename, str))
+	assert(isinstance(name, str))
+	lines = open(filename, "r").read().split("\n")
+	return list(pem_decode_all(lines, name))
+
 if __name__ == "__main__":
 	pem = pem_readfile("../../server.crt", "CERTIFICATE")
 	print(pem)
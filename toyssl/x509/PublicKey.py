@@ -20,9 +20,35 @@
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
 import hashlib
-from toyssl.crypto.BinInt import int2bytes, bytes2int, unpad_pkcs1
+import Crypto.Hash.SHA1
+import Crypto.Hash.SHA224
+import Crypto.Hash.SHA256
+import Crypto.Hash.SHA384
+import Crypto.Hash.SHA512
+import Crypto.PublicKey.ECC
+import Crypto.Signature.DSS
+from toyssl.crypto.BinInt import int2bytes, bytes2int, pad_pkcs1, unpad_pkcs1
 from toyssl.log.ExplainedStep import ExplainedSteps, ExplainedValueStep, ExplainedModularExponentiationStep
 from .DERDecoder import der_decode, asn1_bitstring_to_bytes
+from .DERScanner import DERTag, der_expect, der_children, der_decode_oid, der_decode_integer, der_split_spki
+
+_CRYPTO_HASHES = {
+	"sha1":		Crypto.Hash.SHA1,
+	"sha224":	Crypto.Hash.SHA224,
+	"sha256":	Crypto.Hash.SHA256,
+	"sha384":	Crypto.Hash.SHA384,
+	"sha512":	Crypto.Hash.SHA512,
+}
+
+# DER encoded DigestInfo without the hash value, RFC 8017 9.2
+_DIGESTINFO_PREFIXES = {
+	"md5":		bytes.fromhex("3020300c06082a864886f70d020505000410"),
+	"sha1":		bytes.fromhex("3021300906052b0e03021a05000414"),
+	"sha224":	bytes.fromhex("302d300d06096086480165030402040500041c"),
+	"sha256":	bytes.fromhex("3031300d060960864801650304020105000420"),
+	"sha384":	bytes.fromhex("3041300d060960864801650304020205000430"),
+	"sha512":	bytes.fromhex("3051300d060960864801650304020305000440"),
+}
 
 class _BasePublicKey(object):
 	def __init__(self):
@@ -36,9 +62,15 @@ def _bytes2int(data):
 	return sum(value << (8 * index) for (index, value) in enumerate(reversed(data)))
 
 class _ECCPublicKey(_BasePublicKey):
+	_CURVE_NAMES = {
+		"prime256v1":	"P-256",
+		"secp384r1":	"P-384",
+	}
+
 	def __init__(self, curveid, encoded_pubkey):
 		_BasePublicKey.__init__(self)
 		self._curveid = curveid
+		self._eccobj = None
 		if encoded_pubkey[0] == 0x04:
 			coordlen = (len(encoded_pubkey) - 1) // 2
 			self._x = _bytes2int(encoded_pubkey[1 : 1 + coordlen])
@@ -62,6 +94,20 @@ class _ECCPublicKey(_BasePublicKey):
 	def keytype(self):
 		return "ecc"
 
+	def verify_ecdsa(self, hashname, data, signature):
+		"""Verifies a DER encoded ECDSA signature over 'data'."""
+		hashmodule = _CRYPTO_HASHES.get(hashname)
+		if hashmodule is None:
+			raise Exception("Unsupported hash algorithm %s for ECDSA signatures." % (hashname))
+		try:
+			if self._eccobj is None:
+				# Raises ValueError for points that are not on the curve
+				self._eccobj = Crypto.PublicKey.ECC.construct(curve = self._CURVE_NAMES[self.curveid], point_x = self.x, point_y = self.y)
+			Crypto.Signature.DSS.new(self._eccobj, "fips-186-3", encoding = "der").verify(hashmodule.new(data), signature)
+			return True
+		except ValueError:
+			return False
+
 	def __str__(self):
 		return "ECCPublicKey<%s, (0x%x, 0x%x)>" % (self.curveid, self.x, self.y)
 
@@ -111,10 +157,55 @@ class _RSAPublicKey(_BasePublicKey):
 		return expect_hash == dec
 
 
+	def verify_pkcs1(self, hashname, data, signature):
+		"""Verifies a RSASSA-PKCS1-v1_5 signature over 'data'. The expected
+		encoding is computed and compared as a whole, the decrypted signature
+		is not parsed."""
+		digestinfo = _DIGESTINFO_PREFIXES.get(hashname)
+		if digestinfo is None:
+			raise Exception("Unsupported hash algorithm %s for PKCS#1 signatures." % (hashname))
+		modlen = (self.n.bit_length() + 7) // 8
+		if len(signature) != modlen:
+			return False
+		sig_int = int.from_bytes(signature, "big")
+		if sig_int >= self.n:
+			return False
+		encoded = pow(sig_int, self.e, self.n).to_bytes(modlen, "big")
+		digestinfo = digestinfo + hashlib.new(hashname, data).digest()
+		try:
+			expected = pad_pkcs1(digestinfo, modlen)
+		except Exception:
+			return False
+		return encoded == expected
+
 	def __str__(self):
 		return "RSAPublicKey<0x%x, 0x%x>" % (self.n, self.e)
 
 class PublicKey(object):
+	_CURVES = {
+		"1.3.132.0.34":			"secp384r1",
+		"1.2.840.10045.3.1.7":	"prime256v1",
+	}
+
+	@staticmethod
+	def from_der(spki):
+		"""Decodes a DER encoded SubjectPublicKeyInfo without going through
+		pyasn1."""
+		(oid, param_tag, param_value, pubkey_bytes) = der_split_spki(spki)
+		if (oid == "1.2.840.113549.1.1.1") and (param_tag == DERTag.NULL):
+			(pos, end) = der_expect(pubkey_bytes, 0, len(pubkey_bytes), DERTag.SEQUENCE, "RSAPublicKey")
+			rsaparams = [ der_decode_integer(pubkey_bytes[start : stop]) for (tag, start, stop) in der_children(pubkey_bytes, pos, end) ]
+			if len(rsaparams) != 2:
+				raise Exception("Malformed RSA public key.")
+			return _RSAPublicKey(rsaparams[0], rsaparams[1])
+		elif (oid == "1.2.840.10045.2.1") and (param_tag == DERTag.OBJECT_IDENTIFIER):
+			curve_id = PublicKey._CURVES.get(der_decode_oid(param_value))
+			if curve_id is None:
+				raise Exception(NotImplemented)
+			return _ECCPublicKey(curve_id, pubkey_bytes)
+		else:
+			raise Exception(NotImplemented)
+
 	def from_asn1(asn1):
 		main_oid = asn1[0][0]
 		sub_oid = asn1[0][1]
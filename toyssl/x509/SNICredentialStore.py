@@ -0,0 +1,142 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import os
+import logging
+import threading
+
+from .CredentialStore import Credentials
+from toyssl.utils import LRUCache
+from toyssl.log import ConnectionStats
+
+class _TrieNode(object):
+	__slots__ = [ "children", "exact", "wildcard" ]
+
+	def __init__(self):
+		self.children = { }
+		self.exact = None
+		self.wildcard = None
+
+class SNICredentialStore(object):
+	"""Maps server names as sent in the SNI extension to credentials. Names
+	are kept in a trie of reversed labels (i.e., "www.example.com" is stored
+	under "com", "example", "www"), so a lookup takes one dictionary access
+	per label independent of the number of names. A wildcard name
+	"*.example.com" matches exactly one additional leftmost label (RFC6125
+	Sect. 6.4.3); an exact name always takes precedence over a wildcard.
+
+	The trie only holds file names. Credentials are loaded on first use and
+	kept in an LRU cache of at most 'cache_size' entries, so memory usage
+	depends on the cache size and not on the number of tenants. Names that
+	share the same files share one cache entry."""
+	def __init__(self, default = None, cache_size = 128):
+		self._log = logging.getLogger("toyssl")
+		self._root = _TrieNode()
+		self._default = default
+		self._cache = LRUCache(cache_size)
+		self._stats = ConnectionStats()
+		self._lock = threading.Lock()
+		self._count = 0
+
+	@property
+	def stats(self):
+		return self._stats
+
+	@property
+	def cache(self):
+		return self._cache
+
+	@staticmethod
+	def _labels(servername):
+		return servername.lower().rstrip(".").split(".")[::-1]
+
+	def add(self, servername, crtfile, keyfile, dhfile):
+		"""Registers the credential files for a server name, which may be a
+		wildcard name ("*.example.com"). Files are not read at this point."""
+		labels = self._labels(servername)
+		wildcard = (labels[-1] == "*")
+		if wildcard:
+			labels = labels[:-1]
+		if (len(labels) == 0) or ("*" in labels) or ("" in labels):
+			raise Exception("Invalid server name '%s'." % (servername))
+
+		with self._lock:
+			node = self._root
+			for label in labels:
+				child = node.children.get(label)
+				if child is None:
+					child = _TrieNode()
+					node.children[label] = child
+				node = child
+			if wildcard:
+				node.wildcard = (crtfile, keyfile, dhfile)
+			else:
+				node.exact = (crtfile, keyfile, dhfile)
+			self._count += 1
+		return self
+
+	def add_directory(self, dirname, dhfile):
+		"""Registers all "<servername>.crt" files in a directory, each with
+		the private key "<servername>.key" next to it. Wildcard names are
+		given as "*.example.com.crt"."""
+		for filename in os.listdir(dirname):
+			if filename.endswith(".crt"):
+				servername = filename[:-4]
+				self.add(servername, os.path.join(dirname, filename), os.path.join(dirname, servername + ".key"), dhfile)
+		return self
+
+	def lookup(self, servername):
+		"""Returns the file names registered for a server name or None."""
+		labels = self._labels(servername)
+		node = self._root
+		wildcard = None
+		last = len(labels) - 1
+		for (depth, label) in enumerate(labels):
+			if (depth == last) and (node.wildcard is not None):
+				wildcard = node.wildcard
+			node = node.children.get(label)
+			if node is None:
+				return wildcard
+		return node.exact or wildcard
+
+	def _load(self, filenames):
+		self._stats.count("loads")
+		self._log.debug("Loading credentials %s" % (filenames[0]))
+		return Credentials.load(*filenames)
+
+	def get(self, servername = None):
+		"""Returns the Credentials for the server name. Unknown names or a
+		missing server name are served from the default store if one is
+		set (any object with a get(servername) method, e.g., a
+		CredentialStore)."""
+		filenames = None if (servername is None) else self.lookup(servername)
+		if filenames is None:
+			self._stats.count("unmatched")
+			if self._default is None:
+				raise Exception("No credentials for server name %s." % (servername))
+			return self._default.get(servername)
+		return self._cache.get_or_create(filenames, self._load)
+
+	def __len__(self):
+		return self._count
+
+	def __str__(self):
+		return "SNICredentialStore<%d names, %s>" % (self._count, self._cache)
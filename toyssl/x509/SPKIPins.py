@@ -0,0 +1,63 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import base64
+import binascii
+
+class SPKIPins(object):
+	"""Set of pinned public keys, given as SHA-256 hashes over the DER
+	encoded SubjectPublicKeyInfo, either in hex or in base64 (the format
+	of RFC 7469 pin-sha256 values). A certificate matches if the hash of its
+	SubjectPublicKeyInfo is one of the pins; checking this takes a single
+	hash and does not require the certificate chain to be built or any
+	extension to be decoded."""
+	def __init__(self, pins = None):
+		self._pins = set()
+		for pin in (pins or [ ]):
+			self.add(pin)
+
+	@staticmethod
+	def _decode(pin):
+		if len(pin) == 64:
+			try:
+				return bytes.fromhex(pin)
+			except ValueError:
+				pass
+		try:
+			digest = base64.b64decode(pin, validate = True)
+		except binascii.Error:
+			digest = None
+		if (digest is None) or (len(digest) != 32):
+			raise Exception("SPKI pin '%s' is neither a hex nor a base64 encoded SHA-256 hash." % (pin))
+		return digest
+
+	def add(self, pin):
+		self._pins.add(self._decode(pin))
+		return self
+
+	def matches(self, certificate):
+		return certificate.spki_sha256 in self._pins
+
+	def __len__(self):
+		return len(self._pins)
+
+	def __str__(self):
+		return "SPKIPins<%d pins>" % (len(self))
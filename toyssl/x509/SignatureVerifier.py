@@ -0,0 +1,116 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import hashlib
+
+from toyssl.utils import LRUCache
+
+class SignatureVerifier(object):
+	"""Verifies the signature of a certificate by the public key of its
+	issuer. Results are kept in a bounded cache keyed by the hash of the
+	issuer's SubjectPublicKeyInfo, the hash of the signed TBSCertificate and
+	the signature itself, so that an intermediate certificate that is shared
+	by many peers is only verified once per process.
+
+	Signatures over MD2, MD5 and SHA-1 are never valid: collisions for all
+	of them are practical, which is enough to forge a CA certificate."""
+	_SIGNATURE_ALGORITHMS = {
+		"1.2.840.113549.1.1.14":	("rsa", "sha224"),		# sha224WithRSAEncryption
+		"1.2.840.113549.1.1.11":	("rsa", "sha256"),		# sha256WithRSAEncryption
+		"1.2.840.113549.1.1.12":	("rsa", "sha384"),		# sha384WithRSAEncryption
+		"1.2.840.113549.1.1.13":	("rsa", "sha512"),		# sha512WithRSAEncryption
+		"1.2.840.10045.4.3.1":		("ecc", "sha224"),		# ecdsa-with-SHA224
+		"1.2.840.10045.4.3.2":		("ecc", "sha256"),		# ecdsa-with-SHA256
+		"1.2.840.10045.4.3.3":		("ecc", "sha384"),		# ecdsa-with-SHA384
+		"1.2.840.10045.4.3.4":		("ecc", "sha512"),		# ecdsa-with-SHA512
+	}
+	_REJECTED_ALGORITHMS = {
+		"1.2.840.113549.1.1.2":		"md2WithRSAEncryption",
+		"1.2.840.113549.1.1.4":		"md5WithRSAEncryption",
+		"1.2.840.113549.1.1.5":		"sha1WithRSAEncryption",
+		"1.3.14.3.2.29":			"sha1WithRSASignature",
+		"1.2.840.10040.4.3":		"dsa-with-sha1",
+		"1.2.840.10045.4.1":		"ecdsa-with-SHA1",
+	}
+
+	def __init__(self, maxsize = 4096):
+		self._cache = LRUCache(maxsize)
+		self._computed = 0
+
+	@property
+	def hits(self):
+		return self._cache.hits
+
+	@property
+	def computed(self):
+		"""Number of signatures that were actually verified with the public
+		key, i.e., that were not answered from the cache."""
+		return self._computed
+
+	@staticmethod
+	def is_supported(oid):
+		return oid in SignatureVerifier._SIGNATURE_ALGORITHMS
+
+	@staticmethod
+	def rejected_algorithm(oid):
+		"""Returns the name of the signature algorithm if it is known but
+		deliberately rejected, None otherwise."""
+		return SignatureVerifier._REJECTED_ALGORITHMS.get(oid)
+
+	def _verify(self, issuer, oid, data, signature):
+		algorithm = self._SIGNATURE_ALGORITHMS.get(oid)
+		if algorithm is None:
+			return False
+		try:
+			publickey = issuer.publickey
+		except Exception:
+			# The issuer's key comes from the peer and may not be decodable
+			# (e.g., an unsupported curve); nothing can be verified with it
+			return False
+		if algorithm[0] != publickey.keytype:
+			return False
+		(keytype, hashname) = algorithm
+		self._computed += 1
+		if keytype == "rsa":
+			return publickey.verify_pkcs1(hashname, data, signature)
+		else:
+			return publickey.verify_ecdsa(hashname, data, signature)
+
+	def verify(self, issuer, subject):
+		"""Checks if 'subject' carries a valid signature by the key of
+		'issuer'."""
+		key = (hashlib.sha256(issuer.raw_spki).digest(), hashlib.sha256(subject.raw_tbs).digest(), bytes(subject.raw_signature))
+		valid = self._cache.get(key)
+		if valid is None:
+			valid = self._verify(issuer, subject.signature_alg_oid, subject.raw_tbs, subject.raw_signature)
+			self._cache.put(key, valid)
+		return valid
+
+	def clear(self):
+		self._cache.clear()
+
+	def __len__(self):
+		return len(self._cache)
+
+	def __str__(self):
+		return "SignatureVerifier<%d cached, %d computed>" % (len(self), self.computed)
+
+signature_verifier = SignatureVerifier()
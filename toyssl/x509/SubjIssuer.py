@@ -20,6 +20,8 @@
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
 import collections
+from .DERDecoder import der_decode
+from .DERScanner import DERTag, der_read_header, der_expect, der_children, der_decode_oid, der_decode_string
 
 class SubjIssuer(object):
 	_KNOWN_FIELDS = {
@@ -53,10 +55,28 @@ class SubjIssuer(object):
 			fields.append((oid, value))
 		return SubjIssuer(fields)
 
+	@staticmethod
+	def from_der(data):
+		"""Decodes a DER encoded Name. Like from_asn1(), only the first
+		attribute of every RelativeDistinguishedName is considered."""
+		fields = [ ]
+		(pos, end) = der_expect(data, 0, len(data), DERTag.SEQUENCE, "Name")
+		for (tag, rdn_start, rdn_end) in der_children(data, pos, end):
+			if (tag != DERTag.SET) or (rdn_start == rdn_end):
+				raise Exception("Malformed RelativeDistinguishedName in Name.")
+			(atv_start, atv_end) = der_expect(data, rdn_start, rdn_end, DERTag.SEQUENCE, "AttributeTypeAndValue")
+			(oid_start, oid_end) = der_expect(data, atv_start, atv_end, DERTag.OBJECT_IDENTIFIER, "AttributeType")
+			(value_tag, value_start, value_end) = der_read_header(data, oid_end, atv_end)
+			value = der_decode_string(value_tag, data[value_start : value_end])
+			if value is None:
+				value = str(der_decode(data[oid_end : value_end]))
+			fields.append((der_decode_oid(data[oid_start : oid_end]), value))
+		return SubjIssuer(fields)
+
 	def duplicate_list(self):
 		have = set()
 		duplicate = set()
-		for key in self._fields.keys():
+		for (key, value) in self._fields:
 			if key in have:
 				duplicate.add(key)
 			have.add(key)
@@ -0,0 +1,82 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import collections
+
+from .X509Certificate import X509Certificate
+from .PEMEncoder import pem_readfile_all
+
+class TrustStore(object):
+	"""Set of certificates indexed by the hash of their subject name and by
+	their SubjectKeyIdentifier, so that the issuer candidates of a
+	certificate are found by dictionary lookups instead of by scanning all
+	certificates. Used for the trust anchors as well as for the untrusted
+	intermediates that a peer sends."""
+	def __init__(self, certificates = None):
+		self._certificates = { }
+		self._by_subject = collections.defaultdict(list)
+		self._by_ski = collections.defaultdict(list)
+		for certificate in (certificates or [ ]):
+			self.add(certificate)
+
+	def add(self, certificate):
+		if certificate.derhash in self._certificates:
+			return self
+		self._certificates[certificate.derhash] = certificate
+		self._by_subject[certificate.subject_hash].append(certificate)
+		ski = certificate.subject_key_identifier
+		if ski is not None:
+			self._by_ski[ski].append(certificate)
+		return self
+
+	def add_der(self, derdata):
+		return self.add(X509Certificate.fromderobj(derdata))
+
+	def add_pem_file(self, filename):
+		"""Adds all certificates of a PEM file, e.g., of a CA bundle."""
+		for derdata in pem_readfile_all(filename, "CERTIFICATE"):
+			self.add_der(derdata)
+		return self
+
+	def find_issuers(self, certificate):
+		"""Returns the certificates whose subject is the issuer of the given
+		certificate. If the certificate carries an AuthorityKeyIdentifier,
+		only certificates with that SubjectKeyIdentifier are returned unless
+		none is known, in which case the name match decides."""
+		issuer_hash = certificate.issuer_hash
+		akid = certificate.authority_key_identifier
+		if akid is not None:
+			candidates = [ candidate for candidate in self._by_ski.get(akid, [ ]) if candidate.subject_hash == issuer_hash ]
+			if len(candidates) > 0:
+				return candidates
+		return list(self._by_subject.get(issuer_hash, [ ]))
+
+	def __contains__(self, certificate):
+		return certificate.derhash in self._certificates
+
+	def __iter__(self):
+		return iter(self._certificates.values())
+
+	def __len__(self):
+		return len(self._certificates)
+
+	def __str__(self):
+		return "TrustStore<%d certificates>" % (len(self))
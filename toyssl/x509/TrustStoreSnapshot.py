@@ -0,0 +1,176 @@
+#	toyssl - Python toy SSL implementation
+#	Copyright (C) 2015-2019 Johannes Bauer
+#
+#	This file is part of toyssl.
+#
+#	toyssl is free software; you can redistribute it and/or modify
+#	it under the terms of the GNU General Public License as published by
+#	the Free Software Foundation; this program is ONLY licensed under
+#	version 3 of the License, later versions are explicitly excluded.
+#
+#	toyssl is distributed in the hope that it will be useful,
+#	but WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#	GNU General Public License for more details.
+#
+#	You should have received a copy of the GNU General Public License
+#	along with toyssl; if not, write to the Free Software
+#	Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#	Johannes Bauer <JohannesBauer@gmx.de>
+
+import os
+import mmap
+import struct
+import collections
+
+from .X509Certificate import X509Certificate
+from .PublicKey import _RSAPublicKey, _ECCPublicKey
+
+class TrustStoreSnapshot(object):
+	"""Read-only trust store that is loaded from a binary snapshot file which
+	has been written once from the parsed certificates by write(). The file
+	is mapped into memory and only the fixed size index records are read
+	when it is opened; a certificate is only parsed when it is returned
+	as an issuer candidate, with its public key taken from the precomputed
+	integers of the snapshot. Offers the same lookup interface as a
+	TrustStore and can therefore be used by a ChainVerifier.
+
+	The file consists of a header, one index record per certificate and a
+	data area with the DER blobs, SubjectKeyIdentifiers and public keys that
+	the index records reference by offset and length."""
+	_MAGIC = b"TOYSSL-TS"
+	_VERSION = 1
+	_HEADER = struct.Struct(">9sHI")
+	_RECORD = struct.Struct(">32s32sIIIIII")
+	_KEY_HEADER = struct.Struct(">BHH")
+	_KEYTYPE_RSA = 1
+	_KEYTYPE_ECC = 2
+	_ECC_COORDINATE_LENGTHS = {
+		"prime256v1":	32,
+		"secp384r1":	48,
+	}
+
+	_Entry = collections.namedtuple("Entry", [ "derhash", "subject_hash", "der_offset", "der_length", "ski_offset", "ski_length", "key_offset", "key_length" ])
+
+	def __init__(self, filename):
+		self._file = open(filename, "rb")
+		self._map = mmap.mmap(self._file.fileno(), 0, access = mmap.ACCESS_READ)
+		(magic, version, count) = self._HEADER.unpack_from(self._map, 0)
+		if (magic != self._MAGIC) or (version != self._VERSION):
+			raise Exception("%s is not a version %d trust store snapshot." % (filename, self._VERSION))
+		index_end = self._HEADER.size + (count * self._RECORD.size)
+		if index_end > len(self._map):
+			raise Exception("Truncated trust store snapshot %s." % (filename))
+
+		self._entries = [ ]
+		self._certificates = [ None ] * count
+		self._by_derhash = { }
+		self._by_subject = collections.defaultdict(list)
+		self._by_ski = collections.defaultdict(list)
+		for (index, record) in enumerate(self._RECORD.iter_unpack(self._map[self._HEADER.size : index_end])):
+			entry = self._Entry(*record)
+			if max(entry.der_offset + entry.der_length, entry.ski_offset + entry.ski_length, entry.key_offset + entry.key_length) > len(self._map):
+				raise Exception("Trust store snapshot %s references data beyond its end." % (filename))
+			self._entries.append(entry)
+			self._by_derhash[entry.derhash.hex()] = index
+			self._by_subject[entry.subject_hash.hex()].append(index)
+			if entry.ski_length > 0:
+				self._by_ski[self._map[entry.ski_offset : entry.ski_offset + entry.ski_length].hex()].append(index)
+
+	@staticmethod
+	def _encode_publickey(publickey):
+		if publickey.keytype == "rsa":
+			n = publickey.n.to_bytes((publickey.n.bit_length() + 7) // 8, "big")
+			e = publickey.e.to_bytes((publickey.e.bit_length() + 7) // 8, "big")
+			return TrustStoreSnapshot._KEY_HEADER.pack(TrustStoreSnapshot._KEYTYPE_RSA, len(n), len(e)) + n + e
+		elif (publickey.keytype == "ecc") and (publickey.curveid in TrustStoreSnapshot._ECC_COORDINATE_LENGTHS):
+			curveid = publickey.curveid.encode("ascii")
+			coordlen = TrustStoreSnapshot._ECC_COORDINATE_LENGTHS[publickey.curveid]
+			point = b"\x04" + publickey.x.to_bytes(coordlen, "big") + publickey.y.to_bytes(coordlen, "big")
+			return TrustStoreSnapshot._KEY_HEADER.pack(TrustStoreSnapshot._KEYTYPE_ECC, len(curveid), len(point)) + curveid + point
+		return b""
+
+	def _decode_publickey(self, entry):
+		if entry.key_length == 0:
+			return None
+		data = self._map[entry.key_offset : entry.key_offset + entry.key_length]
+		(keytype, length1, length2) = self._KEY_HEADER.unpack_from(data, 0)
+		field1 = data[self._KEY_HEADER.size : self._KEY_HEADER.size + length1]
+		field2 = data[self._KEY_HEADER.size + length1 : self._KEY_HEADER.size + length1 + length2]
+		if keytype == self._KEYTYPE_RSA:
+			return _RSAPublicKey(int.from_bytes(field1, "big"), int.from_bytes(field2, "big"))
+		elif keytype == self._KEYTYPE_ECC:
+			return _ECCPublicKey(field1.decode("ascii"), field2)
+		return None
+
+	@staticmethod
+	def write(filename, certificates):
+		"""Writes a snapshot of the given X509Certificates, e.g., of all
+		certificates of a TrustStore. Certificates whose public key cannot be
+		decoded are included, but their key is not precomputed."""
+		certificates = list(certificates)
+		data = bytearray()
+		records = [ ]
+		data_offset = TrustStoreSnapshot._HEADER.size + (len(certificates) * TrustStoreSnapshot._RECORD.size)
+
+		def append(blob):
+			offset = data_offset + len(data)
+			data.extend(blob)
+			return (offset, len(blob))
+
+		for certificate in certificates:
+			try:
+				key = TrustStoreSnapshot._encode_publickey(certificate.publickey)
+			except Exception:
+				key = b""
+			ski = certificate.subject_key_identifier
+			(der_offset, der_length) = append(certificate.derobj)
+			(ski_offset, ski_length) = append(bytes.fromhex(ski) if (ski is not None) else b"")
+			(key_offset, key_length) = append(key)
+			records.append(TrustStoreSnapshot._RECORD.pack(bytes.fromhex(certificate.derhash), bytes.fromhex(certificate.subject_hash), der_offset, der_length, ski_offset, ski_length, key_offset, key_length))
+
+		tmpfilename = filename + ".tmp"
+		with open(tmpfilename, "wb") as f:
+			f.write(TrustStoreSnapshot._HEADER.pack(TrustStoreSnapshot._MAGIC, TrustStoreSnapshot._VERSION, len(certificates)))
+			for record in records:
+				f.write(record)
+			f.write(data)
+		os.replace(tmpfilename, filename)
+
+	def _get(self, index):
+		certificate = self._certificates[index]
+		if certificate is None:
+			entry = self._entries[index]
+			derobj = self._map[entry.der_offset : entry.der_offset + entry.der_length]
+			certificate = X509Certificate.fromderobj(derobj, derhash = entry.derhash.hex(), publickey = self._decode_publickey(entry))
+			self._certificates[index] = certificate
+		return certificate
+
+	def find_issuers(self, certificate):
+		"""See TrustStore.find_issuers(); only the returned candidates are
+		parsed."""
+		issuer_hash = certificate.issuer_hash
+		akid = certificate.authority_key_identifier
+		if akid is not None:
+			candidates = [ index for index in self._by_ski.get(akid, [ ]) if self._entries[index].subject_hash.hex() == issuer_hash ]
+			if len(candidates) > 0:
+				return [ self._get(index) for index in candidates ]
+		return [ self._get(index) for index in self._by_subject.get(issuer_hash, [ ]) ]
+
+	def close(self):
+		self._map.close()
+		self._file.close()
+
+	def __contains__(self, certificate):
+		return certificate.derhash in self._by_derhash
+
+	def __iter__(self):
+		for index in range(len(self._entries)):
+			yield self._get(index)
+
+	def __len__(self):
+		return len(self._entries)
+
+	def __str__(self):
+		return "TrustStoreSnapshot<%d certificates, %d parsed>" % (len(self), sum(1 for certificate in self._certificates if certificate is not None))
@@ -24,120 +24,235 @@ import hashlib
 
 import pyasn1.codec.der.decoder
 from .X509ASN1Model import ASN1Certificate
-from .DERDecoder import DERAssigner, der_decode, asn1_bitstring_to_bytes
-from .ASN1Handler import ASN1Handler, asn1_decode_date
+from .DERDecoder import der_decode
+from .DERScanner import DERScanner, DERTag, der_expect, der_decode_integer, der_decode_oid, der_decode_time, der_split_spki
+from .ASN1PrettyPrinter import ASN1PrettyPrinter
 from .PublicKey import PublicKey
 from .SubjIssuer import SubjIssuer
 from .X509Extension import X509Extension
 
-_x509_v1_assigner = DERAssigner({
-	0: ("header", {
-		0: "serial",
-		1: "signature_alg",
-		2: "issuer",
-		3: "validity",
-		4: "subject",
-		5: "public_key",
-	}),
-	1: "signature_alg",
-	2: "signature",
-})
-
-_x509_v3_assigner = DERAssigner({
-	0: ("header", {
-		0: "x509_version",
-		1: "serial",
-		2: "signature_alg",
-		3: "issuer",
-		4: "validity",
-		5: "subject",
-		6: "public_key",
-		7: "extensions",
-	}),
-	1: "signature_alg",
-	2: "signature",
-})
-
 class _BaseX509Certificate(object):
-	def __init__(self, derobj, asn1):
+	"""The DER data is walked exactly once by a DERScanner in fromderobj(),
+	which only records the offsets of the fields. All derived values are
+	decoded from these raw slices on first access and memoized; pyasn1 is
+	only used for the full dumps ('asn1', 'decoded') and for the signature
+	algorithm identifiers."""
+	def __init__(self, derobj, scanner, derhash = None, publickey = None):
 		self._derobj = derobj
-		self._asn1 = asn1
-		self._derhash = hashlib.sha256(self._derobj).hexdigest()
-		(self._decoded, tail) = pyasn1.codec.der.decoder.decode(self._derobj, asn1Spec = ASN1Certificate())
-		if len(tail) > 0:
-			raise Exception("Trailing data when trying to parse X.509 certificate")
+		self._scanner = scanner
+		self._derhash = derhash
+		self._asn1 = None
+		self._decoded = None
+		self._subject = None
+		self._issuer = None
+		self._publickey = publickey
+		self._valid_from = None
+		self._valid_to = None
+		self._key_identifier = None
+		self._extensions = None
+		self._decoded_extensions = { }
+
+	@property
+	def asn1(self):
+		if self._asn1 is not None:
+			return self._asn1
+		self._asn1 = der_decode(self._derobj)
+		return self._asn1
 
 	@property
 	def decoded(self):
+		if self._decoded is not None:
+			return self._decoded
+		(decoded, tail) = pyasn1.codec.der.decoder.decode(self._derobj, asn1Spec = ASN1Certificate())
+		if len(tail) > 0:
+			raise Exception("Trailing data when trying to parse X.509 certificate")
+		self._decoded = decoded
 		return self._decoded
 
+	@property
+	def derobj(self):
+		return self._derobj
+
 	@property
 	def derhash(self):
+		if self._derhash is not None:
+			return self._derhash
+		self._derhash = hashlib.sha256(self._derobj).hexdigest()
 		return self._derhash
 
 	@property
 	def shortderhash(self):
-		return self._derhash[:8]
+		return self.derhash[:8]
+
+	@property
+	def raw_tbs(self):
+		"""DER encoding of the TBSCertificate, i.e., the signed data."""
+		return self._scanner.tlv("tbs_certificate")
+
+	@property
+	def raw_serial(self):
+		return self._scanner.tlv("serial")
+
+	@property
+	def raw_issuer(self):
+		return self._scanner.tlv("issuer")
+
+	@property
+	def raw_subject(self):
+		return self._scanner.tlv("subject")
+
+	@property
+	def raw_validity(self):
+		return self._scanner.tlv("validity")
+
+	@property
+	def raw_spki(self):
+		return self._scanner.tlv("subject_public_key_info")
+
+	@property
+	def raw_signature_alg(self):
+		return self._scanner.tlv("signature_algorithm")
+
+	@property
+	def raw_signature(self):
+		"""Content of the signature BIT STRING, without the unused bits
+		octet."""
+		return self._scanner.value("signature")[1:]
+
+	@property
+	def serial(self):
+		return der_decode_integer(self._scanner.value("serial"))
 
 	@property
 	def valid_from(self):
-		return asn1_decode_date(self._mydecoded["header"]["validity"][0])
+		if self._valid_from is not None:
+			return self._valid_from
+		self._valid_from = der_decode_time(self._scanner.tag("not_before"), self._scanner.value("not_before"))
+		return self._valid_from
 
 	@property
 	def valid_to(self):
-		return asn1_decode_date(self._mydecoded["header"]["validity"][1])
+		if self._valid_to is not None:
+			return self._valid_to
+		self._valid_to = der_decode_time(self._scanner.tag("not_after"), self._scanner.value("not_after"))
+		return self._valid_to
 
 	@property
 	def publickey(self):
-		return PublicKey.from_asn1(self._mydecoded["header"]["public_key"])
+		if self._publickey is not None:
+			return self._publickey
+		self._publickey = PublicKey.from_der(self.raw_spki)
+		return self._publickey
 
 	@property
 	def subject(self):
-		return SubjIssuer.from_asn1(self._mydecoded["header"]["subject"])
+		if self._subject is not None:
+			return self._subject
+		self._subject = SubjIssuer.from_der(self.raw_subject)
+		return self._subject
 
 	@property
 	def issuer(self):
-		return SubjIssuer.from_asn1(self._mydecoded["header"]["issuer"])
+		if self._issuer is not None:
+			return self._issuer
+		self._issuer = SubjIssuer.from_der(self.raw_issuer)
+		return self._issuer
 
 	@property
 	def extensions(self):
-		return self._mydecoded["header"].get("extensions")
+		"""List of (OID, critical, value) tuples or None if the certificate
+		has no extensions field."""
+		if self._extensions is not None:
+			return self._extensions
+		if not self._scanner.has("extensions"):
+			return None
+		self._extensions = list(self._scanner.extensions())
+		return self._extensions
 
 	def decode_extensions(self):
 		if self.extensions is not None:
-			for extension in self.extensions:
-				oid = str(extension[0])
-				data = extension[1].asOctets()
-				yield X509Extension.decode(oid, data)
+			for (oid, critical, data) in self.extensions:
+				yield X509Extension.decode(oid, bytes(data))
+
+	def get_extension(self, oid):
+		"""Returns the decoded extension with the given OID or None if it is
+		not present."""
+		if oid in self._decoded_extensions:
+			return self._decoded_extensions[oid]
+		extension = None
+		for (ext_oid, critical, data) in (self.extensions or [ ]):
+			if ext_oid == oid:
+				extension = X509Extension.decode(oid, bytes(data))
+				break
+		self._decoded_extensions[oid] = extension
+		return extension
+
+	@property
+	def subject_key_identifier(self):
+		extension = self.get_extension("2.5.29.14")
+		return None if (extension is None) else extension.keyid
+
+	@property
+	def authority_key_identifier(self):
+		extension = self.get_extension("2.5.29.35")
+		return None if (extension is None) else extension.keyid
+
+	@property
+	def is_ca(self):
+		"""True if the basicConstraints extension marks this as a CA
+		certificate."""
+		extension = self.get_extension("2.5.29.19")
+		return (extension is not None) and extension.ca
+
+	@property
+	def subject_hash(self):
+		"""Hex SHA-256 of the DER encoded subject name."""
+		return hashlib.sha256(self.raw_subject).hexdigest()
+
+	@property
+	def issuer_hash(self):
+		"""Hex SHA-256 of the DER encoded issuer name."""
+		return hashlib.sha256(self.raw_issuer).hexdigest()
+
+	@property
+	def spki_sha256(self):
+		"""SHA-256 over the complete DER encoded SubjectPublicKeyInfo, as used
+		for public key pinning (RFC 7469)."""
+		return hashlib.sha256(self.raw_spki).digest()
+
+	@property
+	def signature_alg_oid(self):
+		"""OID of the outer signature algorithm, decoded without pyasn1."""
+		data = self.raw_signature_alg
+		(pos, end) = der_expect(data, 0, len(data), DERTag.SEQUENCE, "AlgorithmIdentifier")
+		(pos, end) = der_expect(data, pos, end, DERTag.OBJECT_IDENTIFIER, "algorithm")
+		return der_decode_oid(data[pos : end])
 
 	@property
 	def key_identifier(self):
 		"""Returns the key identifier which is calculated from the actually
 		present public key within the certificate, NOT the one possibly present
 		in a X.509 extension field."""
-		pubkey_bitstring = self._mydecoded["header"]["public_key"][1]
-		pubkey_bytes = asn1_bitstring_to_bytes(pubkey_bitstring)
-		key_id = hashlib.sha1(pubkey_bytes).hexdigest()
-		return key_id
+		if self._key_identifier is not None:
+			return self._key_identifier
+		(oid, param_tag, param_value, pubkey_bytes) = der_split_spki(self.raw_spki)
+		self._key_identifier = hashlib.sha1(pubkey_bytes).hexdigest()
+		return self._key_identifier
 
 	@property
 	def signature_algs(self):
 		"""Returns the header and footer signature algorithm fields. They must
 		be identical as a requirement of RFC 3280 5.1.2.2"""
-		return (self._mydecoded["header"]["signature_alg"], self._mydecoded["signature_alg"])
+		return (der_decode(self._scanner.tlv("tbs_signature_algorithm")), der_decode(self._scanner.tlv("signature_algorithm")))
 
 	def dump_asn1(self):
-		ASN1Handler(self._asn1).dump()
+		ASN1PrettyPrinter(self.asn1).dump()
 
 	@property
 	def signature_alg(self):
-		return self._mydecoded["signature_alg"]
+		return der_decode(self._scanner.tlv("signature_algorithm"))
 
 class _X509CertificateVersion1(_BaseX509Certificate):
-	def __init__(self, derobj, asn1):
-		_BaseX509Certificate.__init__(self, derobj, asn1)
-		self._mydecoded = _x509_v1_assigner.assign(self._asn1)
-
 	@property
 	def version(self):
 		return 1
@@ -146,10 +261,6 @@ class _X509CertificateVersion1(_BaseX509Certificate):
 		return "X509CrtVersion1<Subj=[%s], Issuer=[%s], Hash=%s>" % (self.subject, self.issuer, self.shortderhash)
 
 class _X509CertificateVersion3(_BaseX509Certificate):
-	def __init__(self, derobj, asn1):
-		_BaseX509Certificate.__init__(self, derobj, asn1)
-		self._mydecoded = _x509_v3_assigner.assign(self._asn1)
-
 	@property
 	def version(self):
 		return 3
@@ -159,19 +270,24 @@ class _X509CertificateVersion3(_BaseX509Certificate):
 
 class X509Certificate(object):
 	@staticmethod
-	def fromderobj(derobj):
-		asn1 = der_decode(derobj)
+	def fromderobj(derobj, derhash = None, publickey = None):
+		"""Parses a DER encoded certificate. 'derhash' is the hex SHA-256 of
+		derobj and 'publickey' the decoded public key if the caller already
+		has them."""
+		scanner = DERScanner(derobj)
 
-		if len(asn1[0]) > 6:
+		if scanner.has("version"):
 			# Version in header field
-			version = int(asn1[0][0])
+			version = scanner.value("version")
+			(pos, end) = der_expect(version, 0, len(version), DERTag.INTEGER, "version")
+			version = der_decode_integer(version[pos : end])
 			if version == 2:
-				x509 = _X509CertificateVersion3(derobj, asn1)
+				x509 = _X509CertificateVersion3(derobj, scanner, derhash, publickey)
 			else:
 				raise Exception(NotImplemented)
 		else:
 			# Old v1 type (version == 0)
-			x509 = _X509CertificateVersion1(derobj, asn1)
+			x509 = _X509CertificateVersion1(derobj, scanner, derhash, publickey)
 		return x509
 
 	@staticmethod
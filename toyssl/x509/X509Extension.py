@@ -20,12 +20,17 @@
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
 from .DERDecoder import der_decode
+from .DERScanner import DERTag, der_expect, der_children, der_decode_integer
 
 class X509BaseExtension(object):
 	def __init__(self, oid, data):
 		self._oid = oid
 		self._data = data
 
+	@property
+	def oid(self):
+		return self._oid
+
 	def __str__(self):
 		return "X509BaseExtension<%s = %s>" % (self._oid, self._data)
 
@@ -34,22 +39,63 @@ class X509ExtensionSubjectKeyIdentifier(X509BaseExtension):
 		X509BaseExtension.__init__(self, oid, data)
 		self._keyid = "".join("%02x" % (c) for c in der_decode(data).asOctets())
 
+	@property
+	def keyid(self):
+		return self._keyid
+
 	def __str__(self):
 		return "X509ExtensionSubjectKeyIdentifier<%s>" % (self._keyid)
 
 class X509ExtensionAuthorityKeyIdentifier(X509BaseExtension):
+	_KEYID_TAG = DERTag.context(0, constructed = False)
+
 	def __init__(self, oid, data):
 		X509BaseExtension.__init__(self, oid, data)
-		self._keyid = "".join("%02x" % (c) for c in data)
+		# AuthorityKeyIdentifier ::= SEQUENCE { keyIdentifier [0] IMPLICIT
+		# OCTET STRING OPTIONAL, authorityCertIssuer [1], serial [2] }
+		self._keyid = None
+		(pos, end) = der_expect(data, 0, len(data), DERTag.SEQUENCE, "AuthorityKeyIdentifier")
+		for (tag, start, stop) in der_children(data, pos, end):
+			if tag == self._KEYID_TAG:
+				self._keyid = "".join("%02x" % (c) for c in data[start : stop])
+
+	@property
+	def keyid(self):
+		"""Hex key identifier of the issuing key or None if the extension only
+		references the issuer by name and serial."""
+		return self._keyid
 
 	def __str__(self):
 		return "X509ExtensionAuthorityKeyIdentifier<%s>" % (self._keyid)
 
+class X509ExtensionBasicConstraints(X509BaseExtension):
+	def __init__(self, oid, data):
+		X509BaseExtension.__init__(self, oid, data)
+		self._ca = False
+		self._pathlen = None
+		(pos, end) = der_expect(data, 0, len(data), DERTag.SEQUENCE, "BasicConstraints")
+		for (tag, start, stop) in der_children(data, pos, end):
+			if tag == DERTag.BOOLEAN:
+				self._ca = (stop > start) and (data[start] != 0)
+			elif tag == DERTag.INTEGER:
+				self._pathlen = der_decode_integer(data[start : stop])
+
+	@property
+	def ca(self):
+		return self._ca
+
+	@property
+	def pathlen(self):
+		return self._pathlen
+
+	def __str__(self):
+		return "X509ExtensionBasicConstraints<CA=%s, pathlen=%s>" % (self._ca, self._pathlen)
+
 class X509Extension(object):
 	_KNOWN_OIDS = {
 		"2.5.29.14":	X509ExtensionSubjectKeyIdentifier,
 		"2.5.29.35":	X509ExtensionAuthorityKeyIdentifier,
-#		"2.5.29.19":	X509ExtensionBasicConstraints,
+		"2.5.29.19":	X509ExtensionBasicConstraints,
 	}
 
 	@staticmethod
@@ -58,4 +104,3 @@ class X509Extension(object):
 			return X509Extension._KNOWN_OIDS[oid](oid, data)
 		else:
 			return X509BaseExtension(oid, data)
-
@@ -22,3 +22,12 @@
 from .X509Certificate import X509Certificate
 from .CertificateChecker import CertificateChecker
 from .ASN1PrettyPrinter import ASN1PrettyPrinter
+from .CredentialStore import CredentialStore, Credentials
+from .SNICredentialStore import SNICredentialStore
+from .CertificateCache import CertificateCache, certificate_cache
+from .TrustStore import TrustStore
+from .ChainVerifier import ChainVerifier, ChainVerificationResult
+from .TrustStoreSnapshot import TrustStoreSnapshot
+from .SignatureVerifier import SignatureVerifier, signature_verifier
+from .SPKIPins import SPKIPins
+from .CertificateReader import CertificateReader